@@ -0,0 +1,62 @@
+"""Compares the time and peak memory of `decode_predictions` with the previous
+list-based decoding of a scoring response.
+
+Usage: python benchmarks/bench_decode_predictions.py [n_rows]
+"""
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from mlflow_watsonml.scoring import decode_predictions
+
+
+def make_predictions(n_rows: int, n_fields: int = 8):
+    rng = np.random.default_rng(0)
+    fields = [f"f{idx}" for idx in range(n_fields)]
+
+    # a JSON decoded response holds Python floats
+    return [{"fields": fields, "values": rng.random((n_rows, n_fields)).tolist()}]
+
+
+def list_based(predictions):
+    # the decoding `predict` used before `decode_predictions`
+    fields = predictions[0]["fields"]
+
+    frames = []
+    for prediction in predictions:
+        frames.extend(prediction["values"])
+
+    return pd.DataFrame(frames, columns=fields)
+
+
+def measure(func, predictions):
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    result = func(predictions)
+
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    del result
+    return seconds, peak
+
+
+if __name__ == "__main__":
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    predictions = make_predictions(n_rows)
+
+    for name, func in [
+        ("list based", list_based),
+        ("decode_predictions (pandas)", decode_predictions),
+        (
+            "decode_predictions (numpy)",
+            lambda p: decode_predictions(p, output_format="numpy"),
+        ),
+    ]:
+        seconds, peak = measure(func, predictions)
+        print(f"{name:<30} {seconds:8.3f} s  peak {peak / 2**20:8.1f} MiB")
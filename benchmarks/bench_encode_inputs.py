@@ -0,0 +1,67 @@
+"""Compares `encode_inputs` with row-by-row conversion of a DataFrame into a
+scoring payload.
+
+Usage: python benchmarks/bench_encode_inputs.py [n_rows]
+"""
+import json
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from mlflow_watsonml.scoring import encode_inputs, iter_json_payload
+
+
+def make_frame(n_rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+
+    frame = pd.DataFrame(
+        {
+            "int": rng.integers(0, 100, n_rows),
+            "float": rng.random(n_rows),
+            "category": pd.Categorical(rng.choice(["a", "b", "c"], n_rows)),
+            "timestamp": pd.date_range("2023-01-01", periods=n_rows, freq="s"),
+            "text": rng.choice(["x", "y", None], n_rows),
+        }
+    )
+    frame.loc[frame.index[::10], "float"] = np.nan
+
+    return frame
+
+
+def row_by_row(frame: pd.DataFrame) -> str:
+    # what callers had to do before: convert every row in Python
+    values = []
+    for row in frame.itertuples(index=False):
+        values.append(
+            [
+                None if (isinstance(value, float) and np.isnan(value)) else value
+                for value in row
+            ]
+        )
+
+    payload = {"input_data": [{"fields": list(frame.columns), "values": values}]}
+    return json.dumps(payload, default=str)
+
+
+def vectorized(frame: pd.DataFrame) -> str:
+    return json.dumps({"input_data": [encode_inputs(frame)]})
+
+
+def streamed(frame: pd.DataFrame) -> int:
+    payload = {"input_data": [encode_inputs(frame, tolist=False)]}
+    return sum(len(part) for part in iter_json_payload(payload))
+
+
+if __name__ == "__main__":
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    frame = make_frame(n_rows)
+
+    for name, func in [
+        ("row by row", row_by_row),
+        ("encode_inputs", vectorized),
+        ("encode_inputs + iter_json_payload", streamed),
+    ]:
+        seconds = min(timeit.repeat(lambda: func(frame), number=1, repeat=3))
+        print(f"{name:<36} {seconds:8.3f} s for {n_rows} rows")
@@ -0,0 +1,430 @@
+# The scorers stored in WML are serialized from their source code, so this module
+# must only depend on the standard library. `store.py` embeds its source in the
+# scorers, which load it with `exec`.
+import base64
+import contextlib
+import hashlib
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+import uuid
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+# name of the file holding the path of the artifact relative to its entry
+PATH_FILE = ".artifact_path"
+# name of the file whose modification time records the last use of an entry
+LAST_USED_FILE = ".last_used"
+# directory of the partially downloaded entries
+STAGING_DIR = ".staging"
+
+
+def get_cache_key(uri: str, checksum: str) -> str:
+    """Returns the cache key of an artifact
+
+    Parameters
+    ----------
+    uri : str
+        artifact URI
+    checksum : str
+        checksum of the artifact content
+
+    Returns
+    -------
+    str
+        hex digest of the URI and the checksum
+    """
+    return hashlib.sha256(f"{uri}\0{checksum}".encode("utf-8")).hexdigest()[:32]
+
+
+def get_size(path: str) -> int:
+    """Returns the size of a file or the total size of the files in a directory
+
+    Parameters
+    ----------
+    path : str
+        file or directory path
+
+    Returns
+    -------
+    int
+        size in bytes
+    """
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+
+    size = 0
+    for dir_path, _, file_names in os.walk(path):
+        for file_name in file_names:
+            file_path = os.path.join(dir_path, file_name)
+            if not os.path.islink(file_path):
+                size += os.path.getsize(file_path)
+
+    return size
+
+
+class ArtifactCache:
+    def __init__(self, root: str, max_bytes: Optional[int] = None):
+        """Local cache of downloaded artifacts shared by the processes of a host.
+        Entries are keyed by the artifact URI and a checksum of its content, so
+        different models and different versions of a model never collide.
+
+        A download is staged in a private directory and renamed into place once
+        it is complete, under a per-entry file lock, so that concurrent processes
+        download an artifact only once and never read a partial one. Least
+        recently used entries are evicted when the cache grows over `max_bytes`,
+        except the entries read through `open` by any process.
+
+        Parameters
+        ----------
+        root : str
+            cache directory
+        max_bytes : Optional[int], optional
+            maximum total size of the cached artifacts, by default None (unbounded)
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.join(self.root, STAGING_DIR), exist_ok=True)
+
+    @contextlib.contextmanager
+    def _file_lock(
+        self, key: str, blocking: bool = True, shared: bool = False
+    ) -> Iterator[bool]:
+        # shared locks are held by the readers of an entry, exclusive locks by its
+        # download and its eviction
+        with open(os.path.join(self.root, f"{key}.lock"), "a") as f:
+            if fcntl is None:
+                yield True
+                return
+
+            flags = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+            if not blocking:
+                flags |= fcntl.LOCK_NB
+
+            try:
+                fcntl.flock(f, flags)
+            except BlockingIOError as _:
+                yield False
+                return
+
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _entry_path(self, key: str) -> Optional[str]:
+        entry_dir = os.path.join(self.root, key)
+
+        try:
+            with open(
+                os.path.join(entry_dir, PATH_FILE), "r", encoding="utf-8"
+            ) as f:
+                relative_path = f.read()
+
+            # record the use of the entry for the LRU eviction
+            os.utime(os.path.join(entry_dir, LAST_USED_FILE))
+        except FileNotFoundError as _:
+            return None
+
+        return os.path.join(entry_dir, relative_path)
+
+    def _remove_entry(self, key: str) -> bool:
+        # the caller holds the exclusive lock of the entry. It is renamed first so
+        # that it disappears at once.
+        trash_dir = self._staging_dir(key)
+        try:
+            os.rename(os.path.join(self.root, key), trash_dir)
+        except FileNotFoundError as _:
+            return False
+
+        shutil.rmtree(trash_dir, ignore_errors=True)
+
+        return True
+
+    def _staging_dir(self, key: str) -> str:
+        return os.path.join(self.root, STAGING_DIR, f"{key}-{uuid.uuid4().hex}")
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, uri: str, checksum: str, download: Callable[[str], str]) -> str:
+        """Returns the local path of an artifact, downloading it on a miss
+
+        Parameters
+        ----------
+        uri : str
+            artifact URI
+        checksum : str
+            checksum of the artifact content
+        download : Callable[[str], str]
+            downloads the artifact into the given directory and returns its
+            local path
+
+        Returns
+        -------
+        str
+            local path of the artifact, which may be evicted by another process
+            unless it is read through `open`
+        """
+        key = get_cache_key(uri=uri, checksum=checksum)
+
+        path = self._entry_path(key)
+        if path is not None:
+            self._count("hits")
+            return path
+
+        with self._file_lock(key):
+            # another process may have downloaded the artifact while we waited
+            path = self._entry_path(key)
+            if path is not None:
+                self._count("hits")
+                return path
+
+            self._count("misses")
+
+            # an entry without its marker files is incomplete, e.g. copied by hand
+            # or partially removed, and would fail the rename below
+            self._remove_entry(key)
+
+            staging_dir = self._staging_dir(key)
+            os.makedirs(staging_dir)
+
+            try:
+                artifact_path = os.path.abspath(download(staging_dir))
+
+                if os.path.commonpath([artifact_path, staging_dir]) != staging_dir:
+                    # the artifact is already local, copy it into the entry
+                    target = os.path.join(staging_dir, os.path.basename(artifact_path))
+                    if os.path.isdir(artifact_path):
+                        shutil.copytree(artifact_path, target)
+                    else:
+                        shutil.copy2(artifact_path, target)
+                    artifact_path = target
+
+                relative_path = os.path.relpath(artifact_path, staging_dir)
+                with open(
+                    os.path.join(staging_dir, PATH_FILE), "w", encoding="utf-8"
+                ) as f:
+                    f.write(relative_path)
+                open(os.path.join(staging_dir, LAST_USED_FILE), "w").close()
+
+                os.rename(staging_dir, os.path.join(self.root, key))
+            except BaseException as _:
+                shutil.rmtree(staging_dir, ignore_errors=True)
+                raise
+
+        self.evict(keep=key)
+
+        return self._entry_path(key)
+
+    @contextlib.contextmanager
+    def open(
+        self, uri: str, checksum: str, download: Callable[[str], str]
+    ) -> Iterator[str]:
+        """Returns the local path of an artifact like `get`, and keeps the entry
+        from being evicted until the context exits, e.g. while a model is loaded
+
+        Parameters
+        ----------
+        uri : str
+            artifact URI
+        checksum : str
+            checksum of the artifact content
+        download : Callable[[str], str]
+            downloads the artifact into the given directory and returns its
+            local path
+
+        Yields
+        ------
+        str
+            local path of the artifact
+        """
+        key = get_cache_key(uri=uri, checksum=checksum)
+
+        while True:
+            self.get(uri=uri, checksum=checksum, download=download)
+
+            with self._file_lock(key, shared=True):
+                # the entry may have been evicted before the lock was taken
+                path = self._entry_path(key)
+
+                if path is not None:
+                    yield path
+                    return
+
+    def entries(self) -> List[Tuple[str, float, int]]:
+        """Lists the complete entries of the cache
+
+        Returns
+        -------
+        List[Tuple[str, float, int]]
+            key, last use timestamp and size in bytes of each entry, least recently
+            used first
+        """
+        entries = []
+
+        for key in os.listdir(self.root):
+            entry_dir = os.path.join(self.root, key)
+
+            if key.startswith(".") or not os.path.isdir(entry_dir):
+                continue
+
+            try:
+                last_used = os.path.getmtime(os.path.join(entry_dir, LAST_USED_FILE))
+                entries.append((key, last_used, get_size(entry_dir)))
+            except FileNotFoundError as _:
+                # the entry is being evicted
+                continue
+
+        return sorted(entries, key=lambda entry: entry[1])
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """Evicts least recently used entries until the cache fits in `max_bytes`.
+        Entries being downloaded or read are skipped.
+
+        Parameters
+        ----------
+        keep : Optional[str], optional
+            key of an entry that must not be evicted, by default None
+        """
+        if self.max_bytes is None:
+            return
+
+        entries = self.entries()
+        total_bytes = sum(size for _, _, size in entries)
+
+        for key, _, size in entries:
+            if total_bytes <= self.max_bytes:
+                break
+
+            if key == keep:
+                continue
+
+            with self._file_lock(key, blocking=False) as locked:
+                # the entry may be evicted by another process in the meantime
+                if not locked or not self._remove_entry(key):
+                    continue
+
+            total_bytes -= size
+            self._count("evictions")
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the hit/miss/eviction counters of this process and the current
+        number and total size of the entries
+
+        Returns
+        -------
+        Dict[str, int]
+            cache statistics
+        """
+        entries = self.entries()
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(entries),
+            "size_bytes": sum(size for _, _, size in entries),
+        }
+
+
+def default_cache_dir() -> str:
+    """Returns the default cache directory
+
+    Returns
+    -------
+    str
+        directory in the system temporary directory
+    """
+    return os.path.join(tempfile.gettempdir(), "mlflow_watsonml_artifacts")
+
+
+def export_environment(variables: Optional[Dict[str, str]]) -> None:
+    """Sets environment variables in the scorer process, e.g. the MLflow artifact
+    store configuration embedded in "deploy" environment mode
+
+    Parameters
+    ----------
+    variables : Optional[Dict[str, str]]
+        environment variables, None values are skipped
+    """
+    for key, val in (variables or {}).items():
+        if val is not None:
+            os.environ[key] = val
+
+
+def extract_bundle(bundle: str, dst_path: str) -> str:
+    """Extracts a model bundled in a scorer
+
+    Parameters
+    ----------
+    bundle : str
+        base64 encoded gzipped tar archive of the `model` directory
+    dst_path : str
+        directory to extract the model into
+
+    Returns
+    -------
+    str
+        local path of the model
+    """
+    with tarfile.open(fileobj=io.BytesIO(base64.b64decode(bundle)), mode="r:gz") as tar:
+        if hasattr(tarfile, "data_filter"):
+            tar.extractall(dst_path, filter="data")
+        else:
+            tar.extractall(dst_path)
+
+    return os.path.join(dst_path, "model")
+
+
+@contextlib.contextmanager
+def load_artifact(cache_args: Dict, uri: str) -> Iterator[str]:
+    """Returns the local path of the model of a scorer, which isn't evicted from
+    the artifact cache until the context exits. The model is extracted from its
+    bundle, or downloaded from the MLflow artifact store, once per host into the
+    artifact cache.
+
+    Parameters
+    ----------
+    cache_args : Dict
+        artifact cache arguments of the scorer, see
+        `store.get_artifact_cache_args`
+    uri : str
+        model URI
+
+    Yields
+    ------
+    str
+        local path of the model
+    """
+
+    def download(dst_path: str) -> str:
+        if cache_args["bundle"]:
+            return extract_bundle(bundle=cache_args["bundle"], dst_path=dst_path)
+
+        import mlflow
+
+        return mlflow.artifacts.download_artifacts(artifact_uri=uri, dst_path=dst_path)
+
+    cache = ArtifactCache(
+        root=cache_args["dir"] or default_cache_dir(),
+        max_bytes=cache_args["max_bytes"] or None,
+    )
+
+    with cache.open(
+        uri=uri, checksum=cache_args["checksum"], download=download
+    ) as path:
+        yield path
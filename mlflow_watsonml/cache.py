@@ -0,0 +1,96 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    def __init__(self, ttl: float, clock: Callable[[], float] = time.monotonic):
+        """Thread-safe key-value cache whose entries expire `ttl` seconds after
+        they were written
+
+        Parameters
+        ----------
+        ttl : float
+            time to live of an entry in seconds. A non-positive `ttl` disables caching.
+        clock : Callable[[], float], optional
+            monotonic clock used to timestamp entries, by default `time.monotonic`
+        """
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._entries: Dict[Hashable, tuple] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Returns the cached value for `key`, or None if it is missing or expired
+
+        Parameters
+        ----------
+        key : Hashable
+            cache key
+
+        Returns
+        -------
+        Optional[Any]
+            cached value
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None:
+                value, expires_at = entry
+
+                if self._clock() < expires_at:
+                    self.hits += 1
+                    return value
+
+                del self._entries[key]
+
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Caches `value` under `key`
+
+        Parameters
+        ----------
+        key : Hashable
+            cache key
+        value : Any
+            value to cache
+        """
+        if self.ttl <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (value, self._clock() + self.ttl)
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drops the entry for `key`, or every entry if `key` is None
+
+        Parameters
+        ----------
+        key : Optional[Hashable], optional
+            cache key, by default None
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        """Returns hit/miss counters and the current number of entries
+
+        Returns
+        -------
+        Dict[str, int]
+            cache statistics
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+            }
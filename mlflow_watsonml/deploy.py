@@ -1,15 +1,36 @@
-from typing import Dict, List, Optional, Union
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
 
 import mlflow
 import numpy as np
 import pandas as pd
+import requests
 from ibm_watson_machine_learning.client import APIClient
 from mlflow.deployments import BaseDeploymentClient
 from mlflow.exceptions import MlflowException
+from mlflow.models import ModelSignature
 from mlflow.protos.databricks_pb2 import ENDPOINT_NOT_FOUND, INVALID_PARAMETER_VALUE
+from mlflow.types import Schema
 
+from mlflow_watsonml.cache import TTLCache
 from mlflow_watsonml.config import Config
 from mlflow_watsonml.logging import LOGGER
+from mlflow_watsonml.pipeline import Pipeline
+from mlflow_watsonml.poller import DeploymentHandle, DeploymentPoller
+from mlflow_watsonml.predictor import (
+    AsyncTransport,
+    WatsonMLPredictor,
+    get_scoring_url,
+)
+from mlflow_watsonml.scoring import (
+    decode_predictions,
+    encode_inputs,
+    score_in_chunks,
+)
 from mlflow_watsonml.utils import *
 from mlflow_watsonml.wml import *
 
@@ -31,7 +52,14 @@ def run_local(name, model_uri, flavor=None, config=None):
 
 
 class WatsonMLDeploymentClient(BaseDeploymentClient):
-    def __init__(self, target_uri: str = "watsonml", config: Optional[Dict] = None):
+    def __init__(
+        self,
+        target_uri: str = "watsonml",
+        config: Optional[Dict] = None,
+        space_cache_ttl: float = 300.0,
+        deployment_cache_ttl: float = 60.0,
+        max_inflight_requests: int = 64,
+    ):
         """Initialize a WML `APIClient`. The method has an optional parameter called
         `config` which should have the WML credentials. If `config` is `None`, then
         the plugin will try to search for WML credentials in `.env` file or the
@@ -48,9 +76,32 @@ class WatsonMLDeploymentClient(BaseDeploymentClient):
             Target URI for mlflow deployment, by default "watsonml"
         config : Optional[Dict], optional
             WML Credentials, by default None
+        space_cache_ttl : float, optional
+            seconds for which a resolved deployment space id is reused, by default 300.
+            Set it to 0 to resolve the space on every call.
+        deployment_cache_ttl : float, optional
+            seconds after which the per-space index of deployments by name is
+            revalidated against WML, by default 60. Set it to 0 to list the
+            deployments on every call.
+        max_inflight_requests : int, optional
+            maximum number of concurrent `apredict` / `apredict_many` scoring
+            requests, by default 64
         """
         super().__init__(target_uri)
 
+        self._space_cache = TTLCache(ttl=space_cache_ttl)
+        self._deployment_cache = TTLCache(ttl=deployment_cache_ttl)
+
+        self._async_transport = AsyncTransport(max_inflight=max_inflight_requests)
+        self._async_predictors: Dict[Tuple[str, str], WatsonMLPredictor] = dict()
+        self._pending_resolutions: Dict[Tuple[str, str], asyncio.Future] = dict()
+        self._active_space_id: Optional[str] = None
+        # the default space of the shared WML client is switched by the calls that
+        # change a space, lookups and predictions pass the space id instead
+        self._space_lock = threading.RLock()
+        # refreshes the deployments created or updated with "asynchronous"
+        self._deployment_poller = DeploymentPoller()
+
         self.wml_config = Config(config=config)
         self.connect(wml_credentials=self.wml_config["wml_credentials"])
 
@@ -74,6 +125,272 @@ class WatsonMLDeploymentClient(BaseDeploymentClient):
             )
 
         self._wml_client = client
+        self._active_space_id = None
+
+    def _resolve_space_id(self, endpoint: str) -> Optional[str]:
+        """Returns the space id of a deployment space, reusing cached lookups
+
+        Parameters
+        ----------
+        endpoint : str
+            deployment space name
+
+        Returns
+        -------
+        Optional[str]
+            space id, None if the space does not exist
+        """
+        space_uid = self._space_cache.get(endpoint)
+
+        if space_uid is None:
+            space_uid = get_space_id_from_space_name(
+                client=self._wml_client,
+                space_name=endpoint,
+            )
+
+            if space_uid is not None:
+                self._space_cache.set(endpoint, space_uid)
+
+        return space_uid
+
+    def _get_space_id(self, endpoint: str) -> str:
+        """Returns the space id of a deployment space without changing the default
+        space of the WML client
+
+        Parameters
+        ----------
+        endpoint : str
+            deployment space name
+
+        Returns
+        -------
+        str
+            space id
+
+        Raises
+        ------
+        MlflowException
+            if the deployment space does not exist
+        """
+        space_uid = self._resolve_space_id(endpoint=endpoint)
+
+        if space_uid is None:
+            raise MlflowException(
+                f"Endpoint {endpoint} not found.",
+                error_code=ENDPOINT_NOT_FOUND,
+            )
+
+        return space_uid
+
+    def get_cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """Returns hit/miss counters of the plugin's lookup caches
+
+        Returns
+        -------
+        Dict[str, Dict[str, int]]
+            cache statistics keyed by cache name
+        """
+        return {
+            "spaces": self._space_cache.stats(),
+            "deployments": self._deployment_cache.stats(),
+        }
+
+    def _get_deployment_index(
+        self, client: APIClient, space_uid: str, refresh: bool = False
+    ) -> Dict[str, Dict]:
+        """Returns the deployments of a deployment space indexed by name
+
+        Parameters
+        ----------
+        client : APIClient
+            WML client
+        space_uid : str
+            space id of the deployment space
+        refresh : bool, optional
+            whether to list the deployments again instead of using the cached index,
+            by default False
+
+        Returns
+        -------
+        Dict[str, Dict]
+            deployment details dictionaries keyed by deployment name
+        """
+        index = None if refresh else self._deployment_cache.get(space_uid)
+
+        if index is None:
+            # listed by space id, so that lookups don't wait for `_space_lock`
+            deployments = list_space_deployments(client=client, space_id=space_uid)
+            index = self._index_deployments(deployments, space_uid=space_uid)
+
+        return index
+
+    def _index_deployments(
+        self, deployments: List[Dict], space_uid: str
+    ) -> Dict[str, Dict]:
+        """Indexes the deployments of a deployment space by name and caches the index
+
+        Parameters
+        ----------
+        deployments : List[Dict]
+            list of deployment details dictionary
+        space_uid : str
+            space id of the deployment space
+
+        Returns
+        -------
+        Dict[str, Dict]
+            deployment details dictionaries keyed by deployment name
+        """
+        index = dict()
+
+        # keep the first deployment for duplicate names, like `utils.get_deployment`
+        for deployment in deployments:
+            index.setdefault(deployment["name"], deployment)
+
+        self._deployment_cache.set(space_uid, index)
+
+        return index
+
+    def _cache_deployment(
+        self, space_uid: str, name: str, deployment_details: Optional[Dict]
+    ) -> None:
+        """Adds or replaces a deployment in the cached index of a space, and drops
+        its async predictor which holds the previous details
+
+        Parameters
+        ----------
+        space_uid : str
+            space id of the deployment space
+        name : str
+            name of the deployment
+        deployment_details : Optional[Dict]
+            deployment details dictionary, None if WML didn't return any
+        """
+        self._drop_async_predictors(space_uid=space_uid, name=name)
+
+        index = self._deployment_cache.get(space_uid)
+
+        if index is None:
+            return
+
+        if deployment_details is not None and "metadata" in deployment_details:
+            deployment_details["name"] = name
+            index[name] = deployment_details
+        else:
+            # partial details can't be served to `get_deployment`, relist on next use
+            self._deployment_cache.invalidate(space_uid)
+
+    def _uncache_deployment(self, space_uid: str, name: str) -> None:
+        """Removes a deployment and its async predictor from the caches of a space
+
+        Parameters
+        ----------
+        space_uid : str
+            space id of the deployment space
+        name : str
+            name of the deployment
+        """
+        self._drop_async_predictors(space_uid=space_uid, name=name)
+
+        index = self._deployment_cache.get(space_uid)
+
+        if index is not None:
+            index.pop(name, None)
+
+    def _drop_async_predictors(self, space_uid: str, name: str) -> None:
+        """Closes and removes the async predictors of a deployment
+
+        Parameters
+        ----------
+        space_uid : str
+            space id of the deployment space
+        name : str
+            name of the deployment
+        """
+        for key, predictor in list(self._async_predictors.items()):
+            if predictor.space_id == space_uid and predictor.deployment_name == name:
+                self._async_predictors.pop(key, None)
+                predictor.close()
+
+    def _watch_deployment(
+        self,
+        client: APIClient,
+        space_uid: str,
+        name: str,
+        deployment_id: str,
+        deployment_details: Dict,
+        environment_variables: Optional[Dict] = None,
+    ) -> DeploymentHandle:
+        """Returns a handle on a deployment being created or updated, refreshed by
+        the shared poller. The deployment is cached again once it is ready.
+
+        Parameters
+        ----------
+        client : APIClient
+            WML client
+        space_uid : str
+            space id of the deployment space
+        name : str
+            name of the deployment
+        deployment_id : str
+            id of the deployment
+        deployment_details : Dict
+            deployment details dictionary returned by the create or update request
+        environment_variables : Optional[Dict], optional
+            `custom` block patched once the deployment is ready, since WML doesn't
+            patch it with the asset, by default None
+
+        Returns
+        -------
+        DeploymentHandle
+            handle of the deployment
+        """
+
+        def on_ready(details):
+            if environment_variables is not None:
+                details = patch_deployment_custom(
+                    client=client,
+                    space_id=space_uid,
+                    deployment_id=deployment_id,
+                    environment_variables=environment_variables,
+                )
+
+            self._cache_deployment(
+                space_uid=space_uid, name=name, deployment_details=details
+            )
+
+            return details
+
+        handle = DeploymentHandle(
+            name=name,
+            deployment_id=deployment_id,
+            deployment_details=deployment_details,
+            on_ready=on_ready,
+        )
+
+        # polls don't switch the default space, so they don't wait for `_space_lock`
+        return self._deployment_poller.watch(
+            handle=handle,
+            fetch=functools.partial(
+                poll_deployment,
+                client=client,
+                space_id=space_uid,
+                deployment_id=deployment_id,
+            ),
+        )
+
+    def _set_default_space(self, space_uid: str) -> None:
+        """Sets the default space of the shared WML client, the caller holds
+        `_space_lock`
+
+        Parameters
+        ----------
+        space_uid : str
+            space id of the deployment space
+        """
+        if space_uid != self._active_space_id:
+            self._wml_client.set.default_space(space_uid=space_uid)
+            self._active_space_id = space_uid
 
     def get_wml_client(self, endpoint: str) -> APIClient:
         """Returns WML API client
@@ -91,21 +408,15 @@ class WatsonMLDeploymentClient(BaseDeploymentClient):
         client = self._wml_client
 
         try:
-            space_uid = get_space_id_from_space_name(
-                client=client,
-                space_name=endpoint,
-            )
+            space_uid = self._get_space_id(endpoint=endpoint)
 
-            if space_uid is None:
-                raise MlflowException(
-                    f"Endpoint {endpoint} not found.",
-                    error_code=ENDPOINT_NOT_FOUND,
-                )
-            client.set.default_space(space_uid=space_uid)
+            with self._space_lock:
+                if space_uid != self._active_space_id:
+                    self._set_default_space(space_uid=space_uid)
 
-            LOGGER.info(
-                f"Set deployment space to {endpoint} with space id - {space_uid}"
-            )
+                    LOGGER.info(
+                        f"Set deployment space to {endpoint} with space id - {space_uid}"
+                    )
 
         except Exception as e:
             LOGGER.exception(e)
@@ -113,6 +424,127 @@ class WatsonMLDeploymentClient(BaseDeploymentClient):
 
         return client
 
+    def _get_software_spec_id(
+        self,
+        client: APIClient,
+        name: str,
+        model_uri: str,
+        flavor: str,
+        config: Dict,
+        rewrite: bool,
+        software_specs: Optional[Dict[str, str]] = None,
+    ) -> str:
+        """Returns the software specification of a deployment: the one named in
+        `config`, the WML runtime of a natively stored flavor, or else a custom
+        software specification with the conda environment of the model
+
+        Parameters
+        ----------
+        client : APIClient
+            WML client
+        name : str
+            name of the deployment
+        model_uri : str
+            URI of the model
+        flavor : str
+            flavor of the deployed model
+        config : Dict
+            deployment configuration, see `create_deployment`
+        rewrite : bool
+            whether to rewrite an existing custom software specification
+        software_specs : Optional[Dict[str, str]], optional
+            custom software specification ids shared by a batch of deployments,
+            keyed by environment hash, by default None
+
+        Returns
+        -------
+        str
+            software specification id
+        """
+        # converted sklearn models are scored with onnxruntime
+        to_onnx = flavor == "sklearn" and get_config_flag(
+            config, "sklearn_to_onnx", False
+        )
+        native = flavor in NATIVE_MODEL_TYPES and not to_onnx
+        runtime_name = DEFAULT_BASE_SOFTWARE_SPEC
+
+        if native and "software_spec_name" not in config.keys():
+            _, runtime_name = get_native_model_type(
+                flavor=flavor,
+                version=get_logged_library_version(model_uri=model_uri, flavor=flavor),
+                config=config,
+            )
+
+        if "software_spec_name" in config.keys():
+            software_spec_name = config["software_spec_name"]
+        elif native and not ("conda_yaml" in config or config.get("custom_packages")):
+            # native models run on the runtime of their library version as it is
+            software_spec_name = runtime_name
+        else:
+            if "conda_yaml" in config.keys():
+                conda_yaml = config["conda_yaml"]
+            else:
+                conda_yaml = mlflow.pyfunc.get_model_dependencies(
+                    model_uri=model_uri, format="conda"
+                )  # other option is to have a default conda_yaml for each flavor
+
+            custom_packages: List[str] = config.get("custom_packages")
+
+            return create_custom_software_spec(
+                client=client,
+                name=f"{name}_sw_spec",
+                custom_packages=custom_packages,
+                conda_yaml=conda_yaml,
+                rewrite=rewrite,
+                extra_pip_requirements=["onnxruntime"] if to_onnx else None,
+                base_software_spec_name=runtime_name,
+                software_specs=software_specs,
+            )
+
+        software_spec_id = client.software_specifications.get_id_by_name(
+            software_spec_name
+        )
+
+        if software_spec_id == "Not Found":
+            raise MlflowException(
+                f"Software Specification {software_spec_name} not found.",
+                error_code=INVALID_PARAMETER_VALUE,
+            )
+
+        return software_spec_id
+
+    def _get_hardware_spec_id(self, client: APIClient, config: Dict) -> Optional[str]:
+        """Returns the hardware specification of a deployment
+
+        Parameters
+        ----------
+        client : APIClient
+            WML client
+        config : Dict
+            deployment configuration
+
+        Returns
+        -------
+        Optional[str]
+            hardware specification id, None for the default one
+        """
+        hardware_spec_name = config.get("hardware_spec_name", "XS")
+
+        if hardware_spec_name is None:
+            return None
+
+        hardware_spec_id = client.hardware_specifications.get_id_by_name(
+            hardware_spec_name
+        )
+
+        if hardware_spec_id == "Not Found":
+            LOGGER.warn(
+                f"Hardware Specification - {hardware_spec_name} not found. Using default."
+            )
+            return None
+
+        return hardware_spec_id
+
     def create_deployment(
         self,
         name: str,
@@ -127,6 +559,10 @@ class WatsonMLDeploymentClient(BaseDeploymentClient):
         without due to conflict with an existing deployment), raises a
         :py:class:`mlflow.exceptions.MlflowException`.
 
+        The name check, the software specification, the MLflow configuration and the
+        hardware specification lookup run concurrently, the model is stored once the
+        software specification is ready, see `mlflow_watsonml.pipeline.Pipeline`.
+
         Parameters
         ----------
         name : str
@@ -134,103 +570,345 @@ class WatsonMLDeploymentClient(BaseDeploymentClient):
         model_uri : str
             URI (local or remote) of the model
         flavor : str
-            flavor of the deployed model
+            flavor of the deployed model. "sklearn", "xgboost", "lightgbm",
+            "tensorflow" and "pytorch" models are stored as native WML models and
+            run on the WML runtime of their logged library version, pytorch models
+            are exported to ONNX
         config : Dict
             configuration parameters for wml deployment.
             possible optional configuration keys are -
             - "software_spec_name" : name of the software specification to reuse
-            - "conda_yaml" : filepath of conda.yaml file
+            - "conda_yaml" : filepath of conda.yaml file. Native models run on their
+              WML runtime unless "conda_yaml" or "custom_packages" is given
             - "custom_packages": a list of str - zip file paths of the packages
-            - "rewrite_software_spec": bool whether to rewrite the software spec
+            - "model_type" : WML model type of a native model, by default the one of
+              its WML runtime
+            - "rewrite_software_spec": bool whether to rebuild the software spec even if
+              a deployment with the same environment already created one
             - "hardware_spec_name" : name of the hardware specification to use (Default: XS)
+            - "environment_mode" : "request" (Default) to send the MLflow artifact store
+              configuration with every scoring request, or "deploy" to embed it in the
+              scorer once so that scoring requests carry only the input data
+            - "onnx_max_batch_size" : maximum number of rows the ONNX scorer runs in a
+              single batch (Default: 1024)
+            - "onnx_session_options" : onnxruntime session options of the ONNX scorer,
+              e.g. {"intra_op_num_threads": 2, "graph_optimization_level": "all"}
+            - "artifact_cache_dir" : directory of the model artifact cache shared by
+              the scorers of a WML runtime (Default: in its temporary directory)
+            - "artifact_cache_max_bytes" : maximum total size of the cached model
+              artifacts, least recently used ones are evicted (Default: 0, unbounded)
+            - "artifact_packaging" : "download" to fetch the model from the MLflow
+              artifact store at scorer start, "bundle" to embed it in the stored
+              scorer, or "auto" (Default) to bundle models up to
+              "artifact_bundle_max_bytes" (Default: 32MiB)
+            - "sklearn_to_onnx" : convert a sklearn model to ONNX with the input type
+              of its signature and deploy it with the ONNX scorer (Default: False).
+              The conversion is checked on the input example of the model, or on a
+              random sample, and the parity and latency reports are returned as the
+              "sklearn_onnx" key of the deployment details. See
+              `mlflow_watsonml.store.convert_sklearn_model` for its options.
+            - "asynchronous" : return as soon as WML accepted the deployment instead
+              of waiting for it to be ready (Default: False). The model is still
+              stored before returning, and the details have a
+              `mlflow_watsonml.poller.DeploymentHandle` under "handle" whose
+              `status()`, `wait(timeout)` and `result()` follow the deployment.
         endpoint : str
             deployment space name
 
         Returns
         -------
         Dict
-            deployment details dictionary
+            deployment details dictionary, with the wall-clock seconds of each stage
+            of the deployment under "stage_timings"
         """
-        client = self.get_wml_client(endpoint=endpoint)
+        with self._space_lock:
+            client = self.get_wml_client(endpoint=endpoint)
+
+            return self._create_deployment(
+                client=client,
+                space_uid=self._active_space_id,
+                name=name,
+                model_uri=model_uri,
+                flavor=flavor,
+                config=config,
+            )
+
+    def _create_deployment(
+        self,
+        client: APIClient,
+        space_uid: str,
+        name: str,
+        model_uri: str,
+        flavor: str,
+        config: Optional[Dict],
+        deployment_index: Optional[Dict[str, Dict]] = None,
+        software_specs: Optional[Dict[str, str]] = None,
+        hardware_specs: Optional[Dict[str, Optional[str]]] = None,
+    ) -> Dict:
+        """Runs the stages of `create_deployment` in the deployment space set as the
+        default space of `client`. The caller holds `_space_lock`, which the stages
+        don't take since they run on other threads.
+
+        Parameters
+        ----------
+        client : APIClient
+            WML client
+        space_uid : str
+            space id of the deployment space
+        name : str
+            name of the deployment
+        model_uri : str
+            URI (local or remote) of the model
+        flavor : str
+            flavor of the deployed model
+        config : Optional[Dict]
+            deployment configuration, see `create_deployment`
+        deployment_index : Optional[Dict[str, Dict]], optional
+            deployments of the space indexed by name, listed again if None,
+            by default None
+        software_specs : Optional[Dict[str, str]], optional
+            custom software specification ids shared by a batch of deployments,
+            keyed by environment hash, by default None
+        hardware_specs : Optional[Dict[str, Optional[str]]], optional
+            hardware specification ids shared by a batch of deployments, keyed by
+            name, by default None
 
+        Returns
+        -------
+        Dict
+            deployment details dictionary, see `create_deployment`
+        """
         if config is None:
             config = dict()
 
-        # check if a deployment by that name exists
-        if deployment_exists(client=client, name=name):
-            raise MlflowException(
-                f"Deployment {name} already exists. Use `update_deployment()` or use a different name",
-                error_code=INVALID_PARAMETER_VALUE,
-            )
-
-        if "software_spec_name" in config.keys():
-            software_spec_id = client.software_specifications.get_id_by_name(
-                config["software_spec_name"]
+        environment_mode = get_environment_mode(config)
+        to_onnx = flavor == "sklearn" and get_config_flag(
+            config, "sklearn_to_onnx", False
+        )
+        asynchronous = get_config_flag(config, "asynchronous", False)
+
+        def check_name(results):
+            # the stages run on other threads while this one holds `_space_lock`
+            index = (
+                deployment_index
+                if deployment_index is not None
+                else self._index_deployments(
+                    list_deployments(client=client), space_uid=space_uid
+                )
             )
 
-            if software_spec_id == "Not Found":
+            if name in index:
                 raise MlflowException(
-                    f"Software Specification {config['software_spec_name']} not found.",
+                    f"Deployment {name} already exists. Use `update_deployment()` or use a different name",
                     error_code=INVALID_PARAMETER_VALUE,
                 )
 
-        else:
-            if "conda_yaml" in config.keys():
-                conda_yaml = config["conda_yaml"]
-            else:
-                conda_yaml = mlflow.pyfunc.get_model_dependencies(
-                    model_uri=model_uri, format="conda"
-                )  # other option is to have a default conda_yaml for each flavor
-
-            custom_packages: List[str] = config.get("custom_packages")
-            rewrite: bool = config.get("rewrite_software_spec", False)
+        def store_artifact(results):
+            # the credentials are only embedded in the scorer in "deploy" mode,
+            # "request" mode sends them with each scoring request
+            return store_or_update_artifact(
+                client=client,
+                model_uri=model_uri,
+                artifact_name=f"{name}_v1",
+                flavor=flavor,
+                software_spec_id=results["software_spec"],
+                environment_variables=results["mlflow_config"]
+                if environment_mode == "deploy"
+                else None,
+                scorer_config=config,
+            )
 
-            software_spec_id = create_custom_software_spec(
+        def create(results):
+            artifact_id, revision_id = results["artifact"]
+            deployment_props = dict(
                 client=client,
-                name=f"{name}_sw_spec",
-                custom_packages=custom_packages,
-                conda_yaml=conda_yaml,
-                rewrite=rewrite,
+                name=name,
+                artifact_id=artifact_id,
+                revision_id=revision_id,
+                batch=config.get("batch", False),
+                environment_variables=results["mlflow_config"]
+                if environment_mode == "request"
+                else None,
+                hardware_spec_id=results["hardware_spec"],
             )
 
-        artifact_name = f"{name}_v1"
-        environment_variables = get_mlflow_config()
+            if asynchronous:
+                return submit_deployment(space_id=space_uid, **deployment_props)
 
-        artifact_id, revision_id = store_or_update_artifact(
-            client=client,
-            model_uri=model_uri,
-            artifact_name=artifact_name,
-            flavor=flavor,
-            software_spec_id=software_spec_id,
-            environment_variables=environment_variables,
-        )
+            return deploy(**deployment_props)
 
-        batch = config.get("batch", False)
+        def get_hardware_spec(results):
+            hardware_spec_name = config.get("hardware_spec_name", "XS")
 
-        hardware_spec_name = config.get("hardware_spec_name", "XS")
-        if hardware_spec_name is not None:
-            hardware_spec_id = client.hardware_specifications.get_id_by_name(
-                hardware_spec_name
-            )
-            if hardware_spec_id == "Not Found":
-                LOGGER.warn(
-                    f"Hardware Specification - {hardware_spec_name} not found. Using default."
+            if hardware_specs is None:
+                return self._get_hardware_spec_id(client=client, config=config)
+
+            if hardware_spec_name not in hardware_specs:
+                hardware_specs[hardware_spec_name] = self._get_hardware_spec_id(
+                    client=client, config=config
                 )
-                hardware_spec_id = None
-        else:
-            hardware_spec_id = None
 
-        deployment_details = deploy(
+            return hardware_specs[hardware_spec_name]
+
+        pipeline = Pipeline()
+        pipeline.add("check_name", check_name)
+        # nothing is stored or rewritten in WML for a name that is already taken
+        pipeline.add(
+            "software_spec",
+            lambda results: self._get_software_spec_id(
+                client=client,
+                name=name,
+                model_uri=model_uri,
+                flavor=flavor,
+                config=config,
+                rewrite=config.get("rewrite_software_spec", False),
+                software_specs=software_specs,
+            ),
+            requires=("check_name",),
+        )
+        pipeline.add("mlflow_config", lambda results: get_mlflow_config())
+        pipeline.add("hardware_spec", get_hardware_spec, requires=("check_name",))
+        pipeline.add(
+            "artifact",
+            store_artifact,
+            requires=("check_name", "software_spec", "mlflow_config"),
+        )
+        pipeline.add(
+            "deploy",
+            create,
+            requires=("artifact", "hardware_spec", "mlflow_config"),
+        )
+
+        results, timings = pipeline.run()
+        deployment_details = results["deploy"]
+
+        if to_onnx:
+            artifact_id, _ = results["artifact"]
+            deployment_details["sklearn_onnx"] = get_artifact_custom(
+                client=client, artifact_id=artifact_id
+            ).get("sklearn_onnx", {})
+
+        self._cache_deployment(
+            space_uid=space_uid, name=name, deployment_details=deployment_details
+        )
+
+        if not asynchronous:
+            return {**deployment_details, "stage_timings": timings}
+
+        handle = self._watch_deployment(
             client=client,
+            space_uid=space_uid,
             name=name,
-            artifact_id=artifact_id,
-            revision_id=revision_id,
-            batch=batch,
-            environment_variables=environment_variables,
-            hardware_spec_id=hardware_spec_id,
+            deployment_id=client.deployments.get_id(deployment_details),
+            deployment_details=deployment_details,
         )
 
-        return deployment_details
+        return {**deployment_details, "stage_timings": timings, "handle": handle}
+
+    def create_deployments(
+        self,
+        deployments: List[Tuple[str, str, str, Optional[Dict], str]],
+        max_workers: int = 4,
+    ) -> List[Dict]:
+        """Deploy many models, see `create_deployment`. The deployments are
+        grouped by deployment space, and the deployments of a space are created
+        concurrently once its deployments are listed. The deployments of a batch
+        share their software specifications when they have the same environment,
+        and the hardware specification lookups. A failed deployment doesn't stop
+        the others.
+
+        Parameters
+        ----------
+        deployments : List[Tuple[str, str, str, Optional[Dict], str]]
+            `name`, `model_uri`, `flavor`, `config` and `endpoint` of each
+            deployment, as passed to `create_deployment`
+        max_workers : int, optional
+            maximum number of deployments created at the same time, by default 4
+
+        Returns
+        -------
+        List[Dict]
+            result of each deployment in the order of `deployments`, with its
+            "name", "endpoint", "deployment" details dictionary or None, "error"
+            raised by its creation or None, and wall-clock "seconds"
+        """
+        results: List[Dict] = [
+            {
+                "name": name,
+                "endpoint": endpoint,
+                "deployment": None,
+                "error": None,
+                "seconds": 0.0,
+            }
+            for name, _, _, _, endpoint in deployments
+        ]
+        endpoints: Dict[str, List[int]] = dict()
+        hardware_specs: Dict[str, Optional[str]] = dict()
+
+        for idx, (name, _, _, _, endpoint) in enumerate(deployments):
+            names = [deployments[other][0] for other in endpoints.get(endpoint, [])]
+
+            if name in names:
+                results[idx]["error"] = MlflowException(
+                    f"Deployment {name} is listed more than once for {endpoint}",
+                    error_code=INVALID_PARAMETER_VALUE,
+                )
+                continue
+
+            endpoints.setdefault(endpoint, []).append(idx)
+
+        def create(idx, client, space_uid, deployment_index, software_specs):
+            name, model_uri, flavor, config, _ = deployments[idx]
+            start = time.perf_counter()
+
+            try:
+                results[idx]["deployment"] = self._create_deployment(
+                    client=client,
+                    space_uid=space_uid,
+                    name=name,
+                    model_uri=model_uri,
+                    flavor=flavor,
+                    config=config,
+                    deployment_index=deployment_index,
+                    software_specs=software_specs,
+                    hardware_specs=hardware_specs,
+                )
+            except Exception as e:
+                LOGGER.exception(e)
+                results[idx]["error"] = e
+            finally:
+                results[idx]["seconds"] = time.perf_counter() - start
+
+        for endpoint, indices in endpoints.items():
+            # the shared client has a single default space, so the spaces are
+            # deployed to one after the other
+            with self._space_lock:
+                try:
+                    client = self.get_wml_client(endpoint=endpoint)
+                    space_uid = self._active_space_id
+                    deployment_index = self._get_deployment_index(
+                        client=client, space_uid=space_uid, refresh=True
+                    )
+                except Exception as e:
+                    for idx in indices:
+                        results[idx]["error"] = e
+                    continue
+
+                # software specifications belong to a space
+                software_specs: Dict[str, str] = dict()
+
+                with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                    for idx in indices:
+                        pool.submit(
+                            create,
+                            idx,
+                            client,
+                            space_uid,
+                            deployment_index,
+                            software_specs,
+                        )
+
+        return results
 
     def update_deployment(
         self,
@@ -256,78 +934,143 @@ class WatsonMLDeploymentClient(BaseDeploymentClient):
             ``model_uri`` must also be specified.
         config : Optional[Dict], optional
             dict containing updated WML-specific configuration for the
+            deployment, see `create_deployment`. The `custom` block of the deployment
+            is only changed if "environment_mode" is given. With "asynchronous", the
+            details have a `mlflow_watsonml.poller.DeploymentHandle` under "handle"
+            which is done once WML finished updating the deployment.
         endpoint : str
             deployment space name
 
         Returns
         -------
         Dict
-            deployment details dictionary
+            deployment details dictionary, with the wall-clock seconds of each stage
+            of the deployment under "stage_timings"
         """
-        client = self.get_wml_client(endpoint=endpoint)
-
         if config is None:
             config = dict()
 
-        # check if a deployment by that name exists
-        if not deployment_exists(client=client, name=name):
-            raise MlflowException(
-                f"Deployment {name} doesn't exist. Use `create_deployment()`",
-                error_code=INVALID_PARAMETER_VALUE,
-            )
-
-        current_deployment = self.get_deployment(name=name, endpoint=endpoint)
-        artifact_id = current_deployment["entity"]["asset"]["id"]
-        artifact_rev = int(current_deployment["entity"]["asset"]["rev"])
-
-        new_artifact_name = f"{name}_v{artifact_rev+1}"
+        environment_mode = get_environment_mode(config)
+        to_onnx = flavor == "sklearn" and get_config_flag(
+            config, "sklearn_to_onnx", False
+        )
+        asynchronous = get_config_flag(config, "asynchronous", False)
 
-        if "software_spec_name" in config.keys():
-            software_spec_id = client.software_specifications.get_id_by_name(
-                config["software_spec_name"]
+        def get_current_deployment(results):
+            # the stages run on other threads while this one holds `_space_lock`
+            deployment_index = self._index_deployments(
+                list_deployments(client=client), space_uid=space_uid
             )
 
-            if software_spec_id == "Not Found":
+            if name not in deployment_index:
                 raise MlflowException(
-                    f"Software Specification {config['software_spec_name']} not found.",
+                    f"Deployment {name} doesn't exist. Use `create_deployment()`",
                     error_code=INVALID_PARAMETER_VALUE,
                 )
 
-        else:
-            if "conda_yaml" in config.keys():
-                conda_yaml = config["conda_yaml"]
+            return deployment_index[name]
+
+        def store_artifact(results):
+            current_deployment = results["current_deployment"]
+            artifact_rev = int(current_deployment["entity"]["asset"]["rev"])
+
+            if "environment_mode" in config.keys():
+                embed_environment = environment_mode == "deploy"
             else:
-                conda_yaml = mlflow.pyfunc.get_model_dependencies(
-                    model_uri=model_uri, format="conda"
-                )  # other option is to have a default conda_yaml for each flavor
+                # keep the mode of the deployment, only "request" has a custom block
+                embed_environment = not current_deployment["entity"].get("custom")
 
-            custom_packages: List[str] = config.get("custom_packages")
+            return store_or_update_artifact(
+                client=client,
+                model_uri=model_uri,
+                artifact_name=f"{name}_v{artifact_rev+1}",
+                flavor=flavor,
+                software_spec_id=results["software_spec"],
+                environment_variables=results["mlflow_config"]
+                if embed_environment
+                else None,
+                scorer_config=config,
+            )
+
+        def get_custom(results):
+            # the `custom` block is only changed if "environment_mode" is given
+            if "environment_mode" not in config.keys():
+                return None
+
+            return results["mlflow_config"] if environment_mode == "request" else {}
+
+        def update(results):
+            artifact_id, revision_id = results["artifact"]
 
-            software_spec_id = create_custom_software_spec(
+            # WML accepts the update before it is done, "asynchronous" polls it and
+            # patches the `custom` block once the new asset runs
+            return update_deployment(
                 client=client,
-                name=f"{name}_sw_spec",
-                custom_packages=custom_packages,
-                conda_yaml=conda_yaml,
-                rewrite=True,
+                name=name,
+                artifact_id=artifact_id,
+                revision_id=revision_id,
+                deployment_id=client.deployments.get_id(results["current_deployment"]),
+                environment_variables=None if asynchronous else get_custom(results),
+                poller=self._deployment_poller,
             )
-        environment_variables = get_mlflow_config()
-        artifact_id, revision_id = store_or_update_artifact(
-            client=client,
-            model_uri=model_uri,
-            artifact_name=new_artifact_name,
-            flavor=flavor,
-            software_spec_id=software_spec_id,
-            environment_variables=environment_variables,
-        )
 
-        deployment_details = update_deployment(
+        with self._space_lock:
+            client = self.get_wml_client(endpoint=endpoint)
+            space_uid = self._active_space_id
+
+            pipeline = Pipeline()
+            pipeline.add("current_deployment", get_current_deployment)
+            # nothing is stored or rewritten in WML for a missing deployment
+            pipeline.add(
+                "software_spec",
+                lambda results: self._get_software_spec_id(
+                    client=client,
+                    name=name,
+                    model_uri=model_uri,
+                    flavor=flavor,
+                    config=config,
+                    rewrite=config.get("rewrite_software_spec", False),
+                ),
+                requires=("current_deployment",),
+            )
+            pipeline.add("mlflow_config", lambda results: get_mlflow_config())
+            pipeline.add(
+                "artifact",
+                store_artifact,
+                requires=("current_deployment", "software_spec", "mlflow_config"),
+            )
+            pipeline.add(
+                "update",
+                update,
+                requires=("current_deployment", "artifact", "mlflow_config"),
+            )
+
+            results, timings = pipeline.run()
+            deployment_details = results["update"]
+
+            if to_onnx:
+                artifact_id, _ = results["artifact"]
+                deployment_details["sklearn_onnx"] = get_artifact_custom(
+                    client=client, artifact_id=artifact_id
+                ).get("sklearn_onnx", {})
+
+            self._cache_deployment(
+                space_uid=space_uid, name=name, deployment_details=deployment_details
+            )
+
+        if not asynchronous:
+            return {**deployment_details, "stage_timings": timings}
+
+        handle = self._watch_deployment(
             client=client,
+            space_uid=space_uid,
             name=name,
-            artifact_id=artifact_id,
-            revision_id=revision_id,
+            deployment_id=client.deployments.get_id(results["current_deployment"]),
+            deployment_details=deployment_details,
+            environment_variables=get_custom(results),
         )
 
-        return deployment_details
+        return {**deployment_details, "stage_timings": timings, "handle": handle}
 
     def delete_deployment(
         self, name: str, config: Optional[Dict] = None, endpoint: Optional[str] = None
@@ -347,10 +1090,20 @@ class WatsonMLDeploymentClient(BaseDeploymentClient):
         if config is None:
             config = dict()
 
-        client = self.get_wml_client(endpoint=endpoint)
+        with self._space_lock:
+            client = self.get_wml_client(endpoint=endpoint)
+            space_uid = self._active_space_id
+            deployment_index = self._get_deployment_index(
+                client=client, space_uid=space_uid, refresh=True
+            )
 
-        if deployment_exists(client=client, name=name):
-            delete_deployment(client=client, name=name)
+            if name in deployment_index:
+                delete_deployment(
+                    client=client,
+                    name=name,
+                    deployment_details=deployment_index[name],
+                )
+                self._uncache_deployment(space_uid=space_uid, name=name)
 
     def list_deployments(self, endpoint: str):
         """List deployments. This method returns an unpaginated list of all deployments
@@ -367,7 +1120,13 @@ class WatsonMLDeploymentClient(BaseDeploymentClient):
             contain a 'name' key containing the deployment name. The other fields of
             the returned dictionary and their types follow WML deployment details convention.
         """
-        return list_deployments(client=self.get_wml_client(endpoint=endpoint))
+        client = self._wml_client
+        space_uid = self._get_space_id(endpoint=endpoint)
+
+        deployments = list_space_deployments(client=client, space_id=space_uid)
+        self._index_deployments(deployments, space_uid=space_uid)
+
+        return deployments
 
     def get_deployment(self, name: str, endpoint: str):
         """Returns a dictionary describing the specified deployment, throwing a
@@ -389,13 +1148,40 @@ class WatsonMLDeploymentClient(BaseDeploymentClient):
             A dict corresponding to the retrieved deployment. The dict is guaranteed to
             contain a 'name' key corresponding to the deployment name.
         """
-        return get_deployment(client=self.get_wml_client(endpoint=endpoint), name=name)
+        client = self._wml_client
+        space_uid = self._get_space_id(endpoint=endpoint)
+
+        deployment_index = self._get_deployment_index(
+            client=client, space_uid=space_uid
+        )
+
+        if name not in deployment_index:
+            # the index may predate the deployment, revalidate before failing
+            deployment_index = self._get_deployment_index(
+                client=client, space_uid=space_uid, refresh=True
+            )
+
+        try:
+            return deployment_index[name]
+
+        except KeyError as _:
+            message = f"no deployment by the name {name} exists"
+            LOGGER.exception(message)
+            raise MlflowException(
+                message=message,
+                error_code=ENDPOINT_NOT_FOUND,
+            )
 
     def predict(
         self,
         deployment_name: str,
         inputs: Union[pd.DataFrame, np.ndarray, List[Any], Dict[str, Any]],
         endpoint: str,
+        chunk_rows: Optional[int] = None,
+        chunk_bytes: Optional[int] = None,
+        max_workers: int = 4,
+        output_format: str = "pandas",
+        output_schema: Optional[Union[Schema, ModelSignature, Dict[str, Any]]] = None,
     ) -> Union[np.ndarray, pd.DataFrame, pd.Series, List]:
         """Compute predictions on inputs using the specified deployment
 
@@ -411,48 +1197,318 @@ class WatsonMLDeploymentClient(BaseDeploymentClient):
             Input data (or arguments) to pass to the deployment for inference,
         endpoint : str
             deployment space name
+        chunk_rows : Optional[int], optional
+            maximum number of rows per scoring request. If `chunk_rows` or
+            `chunk_bytes` is set, the inputs are split into chunks that are scored
+            concurrently and merged back in row order, by default None
+        chunk_bytes : Optional[int], optional
+            approximate maximum JSON size of a scoring request in bytes,
+            by default None
+        max_workers : int, optional
+            maximum number of chunks scored concurrently, by default 4
+        output_format : str, optional
+            one of "pandas", "numpy" or "arrow", by default "pandas"
+        output_schema : Optional[Union[Schema, ModelSignature, Dict[str, Any]]], optional
+            output schema of the model, an MLflow model signature or a mapping of
+            field name to dtype used to type the predictions, by default None
 
         Returns
         -------
         pd.DataFrame
-            Model predictions as pandas.DataFrame
+            Model predictions as pandas.DataFrame, or in `output_format` if given.
+            Predictions without `fields` are returned as is.
+
+        Raises
+        ------
+        ChunkedScoringError
+            if any chunk of a chunked prediction fails
         """
-        client = self.get_wml_client(endpoint=endpoint)
+        client = self._wml_client
 
         deployment_details = self.get_deployment(
             name=deployment_name, endpoint=endpoint
         )
 
-        scoring_payload = {
-            client.deployments.ScoringMetaNames.INPUT_DATA: [{"values": inputs}]
-        }
-
-        if "custom" in deployment_details["entity"].keys():
-            scoring_payload[
-                client.deployments.ScoringMetaNames.ENVIRONMENT_VARIABLES
-            ] = deployment_details["entity"]["custom"]
+        # scoring ignores the default space but the WML client needs one, it is only
+        # set once so that predictions don't wait for deployments holding the lock
+        if self._active_space_id is None:
+            with self._space_lock:
+                if self._active_space_id is None:
+                    self._set_default_space(
+                        space_uid=self._get_space_id(endpoint=endpoint)
+                    )
 
         deployment_id = client.deployments.get_id(deployment_details=deployment_details)
 
-        predictions = client.deployments.score(
-            deployment_id=deployment_id, meta_props=scoring_payload
-        )["predictions"]
+        def score(data):
+            scoring_payload = {
+                client.deployments.ScoringMetaNames.INPUT_DATA: [encode_inputs(data)]
+            }
+
+            if deployment_details["entity"].get("custom"):
+                scoring_payload[
+                    client.deployments.ScoringMetaNames.ENVIRONMENT_VARIABLES
+                ] = deployment_details["entity"]["custom"]
+
+            predictions = client.deployments.score(
+                deployment_id=deployment_id, meta_props=scoring_payload
+            )["predictions"]
+
+            return decode_predictions(
+                predictions, output_format=output_format, schema=output_schema
+            )
+
+        if chunk_rows is None and chunk_bytes is None:
+            return score(inputs)
 
-        if (
-            len(predictions) > 0
-            and isinstance(predictions[0], dict)
-            and "fields" in predictions[0].keys()
-        ):
-            fields = predictions[0]["fields"]
+        return score_in_chunks(
+            score,
+            inputs,
+            chunk_rows=chunk_rows,
+            chunk_bytes=chunk_bytes,
+            max_workers=max_workers,
+        )
 
-            frames = []
-            for prediction in predictions:
-                frames.extend(prediction["values"])
+    def get_predictor(
+        self,
+        deployment_name: str,
+        endpoint: str,
+        session: Optional[requests.Session] = None,
+        output_format: str = "pandas",
+        output_schema: Optional[Union[Schema, ModelSignature, Dict[str, Any]]] = None,
+    ) -> WatsonMLPredictor:
+        """Returns a scoring handle for repeated predictions against a deployment.
+        The deployment is resolved once; the handle scores over its own HTTP session
+        without going through `get_wml_client` or `get_deployment` again, and does not
+        depend on the default space of the shared WML client.
 
-            ans = pd.DataFrame(frames, columns=fields)
-            return ans
+        Parameters
+        ----------
+        deployment_name : str
+            Name of deployment to predict against
+        endpoint : str
+            deployment space name
+        session : Optional[requests.Session], optional
+            HTTP session for the predictor, by default a new session
+        output_format : str, optional
+            one of "pandas", "numpy" or "arrow", by default "pandas"
+        output_schema : Optional[Union[Schema, ModelSignature, Dict[str, Any]]], optional
+            output schema used to type the predictions, by default None
 
-        return predictions  # ans
+        Returns
+        -------
+        WatsonMLPredictor
+            scoring handle of the deployment
+        """
+        deployment_details = self.get_deployment(
+            name=deployment_name, endpoint=endpoint
+        )
+
+        return self._build_predictor(
+            deployment_name=deployment_name,
+            space_id=self._get_space_id(endpoint=endpoint),
+            deployment_details=deployment_details,
+            session=session,
+            output_format=output_format,
+            output_schema=output_schema,
+        )
+
+    def _build_predictor(
+        self,
+        deployment_name: str,
+        space_id: str,
+        deployment_details: Dict,
+        session: Optional[requests.Session] = None,
+        transport: Optional[AsyncTransport] = None,
+        output_format: str = "pandas",
+        output_schema: Optional[Union[Schema, ModelSignature, Dict[str, Any]]] = None,
+    ) -> WatsonMLPredictor:
+        client = self._wml_client
+
+        return WatsonMLPredictor(
+            deployment_name=deployment_name,
+            space_id=space_id,
+            deployment_id=client.deployments.get_id(
+                deployment_details=deployment_details
+            ),
+            scoring_url=get_scoring_url(
+                client=client, deployment_details=deployment_details
+            ),
+            get_headers=client._get_headers,
+            version=getattr(client, "version_param", None),
+            environment_variables=deployment_details["entity"].get("custom"),
+            input_data_key=client.deployments.ScoringMetaNames.INPUT_DATA,
+            environment_variables_key=client.deployments.ScoringMetaNames.ENVIRONMENT_VARIABLES,
+            session=session,
+            transport=transport,
+            output_format=output_format,
+            output_schema=output_schema,
+        )
+
+    def _resolve_deployment(self, name: str, endpoint: str) -> Tuple[str, Dict]:
+        deployment_details = self.get_deployment(name=name, endpoint=endpoint)
+
+        return self._get_space_id(endpoint=endpoint), deployment_details
+
+    async def _aresolve_deployment(self, name: str, endpoint: str) -> Tuple[str, Dict]:
+        """Returns the space id and details of a deployment. Cached deployments are
+        returned without leaving the event loop; on a cache miss the synchronous
+        lookup runs once in the default executor and concurrent callers for the same
+        deployment await that single lookup.
+
+        Parameters
+        ----------
+        name : str
+            name of the deployment
+        endpoint : str
+            deployment space name
+
+        Returns
+        -------
+        Tuple[str, Dict]
+            space id, deployment details dictionary
+        """
+        space_uid = self._space_cache.get(endpoint)
+
+        if space_uid is not None:
+            index = self._deployment_cache.get(space_uid)
+
+            if index is not None and name in index:
+                return space_uid, index[name]
+
+        loop = asyncio.get_running_loop()
+        key = (endpoint, name)
+        pending = self._pending_resolutions.get(key)
+
+        if pending is None or pending.get_loop() is not loop:
+            pending = loop.run_in_executor(
+                None,
+                functools.partial(
+                    self._resolve_deployment, name=name, endpoint=endpoint
+                ),
+            )
+            self._pending_resolutions[key] = pending
+
+            def discard(future):
+                if self._pending_resolutions.get(key) is future:
+                    del self._pending_resolutions[key]
+
+            pending.add_done_callback(discard)
+
+        return await asyncio.shield(pending)
+
+    async def aget_deployment(self, name: str, endpoint: str) -> Dict:
+        """Async variant of `get_deployment`
+
+        Parameters
+        ----------
+        name : str
+            name of the deployment to fetch
+        endpoint : str
+            deployment space name
+
+        Returns
+        -------
+        Dict
+            A dict corresponding to the retrieved deployment. The dict is guaranteed to
+            contain a 'name' key corresponding to the deployment name.
+        """
+        _, deployment_details = await self._aresolve_deployment(
+            name=name, endpoint=endpoint
+        )
+
+        return deployment_details
+
+    async def _aget_predictor(
+        self, deployment_name: str, endpoint: str
+    ) -> WatsonMLPredictor:
+        space_uid, deployment_details = await self._aresolve_deployment(
+            name=deployment_name, endpoint=endpoint
+        )
+        deployment_id = self._wml_client.deployments.get_id(
+            deployment_details=deployment_details
+        )
+
+        predictor = self._async_predictors.get((space_uid, deployment_id))
+
+        if predictor is None:
+            # all async predictors share one connection pool and in-flight bound
+            predictor = self._build_predictor(
+                deployment_name=deployment_name,
+                space_id=space_uid,
+                deployment_details=deployment_details,
+                transport=self._async_transport,
+            )
+            self._async_predictors[(space_uid, deployment_id)] = predictor
+
+        return predictor
+
+    async def apredict(
+        self,
+        deployment_name: str,
+        inputs: Union[pd.DataFrame, np.ndarray, List[Any], Dict[str, Any]],
+        endpoint: str,
+    ) -> Union[pd.DataFrame, List]:
+        """Async variant of `predict`. Requests from all coroutines share one
+        connection pool, and at most `max_inflight_requests` of them are in flight
+        at a time.
+
+        Parameters
+        ----------
+        deployment_name : str
+            Name of deployment to predict against
+        inputs : Union[pd.DataFrame, np.ndarray, List[Any], Dict[str, Any]]
+            Input data (or arguments) to pass to the deployment for inference
+        endpoint : str
+            deployment space name
+
+        Returns
+        -------
+        Union[pd.DataFrame, List]
+            Model predictions, a DataFrame if the deployment returns `fields`
+        """
+        predictor = await self._aget_predictor(
+            deployment_name=deployment_name, endpoint=endpoint
+        )
+
+        return await predictor.apredict(inputs)
+
+    async def apredict_many(
+        self,
+        deployment_name: str,
+        inputs: List[Union[pd.DataFrame, np.ndarray, List[Any], Dict[str, Any]]],
+        endpoint: str,
+    ) -> List[Union[pd.DataFrame, List]]:
+        """Async variant of `WatsonMLPredictor.predict_many`: scores several inputs
+        with a single request
+
+        Parameters
+        ----------
+        deployment_name : str
+            Name of deployment to predict against
+        inputs : List[Union[pd.DataFrame, np.ndarray, List[Any], Dict[str, Any]]]
+            list of input data to pass to the deployment for inference
+        endpoint : str
+            deployment space name
+
+        Returns
+        -------
+        List[Union[pd.DataFrame, List]]
+            Model predictions for each input, in the order of `inputs`
+        """
+        predictor = await self._aget_predictor(
+            deployment_name=deployment_name, endpoint=endpoint
+        )
+
+        return await predictor.apredict_many(inputs)
+
+    async def aclose(self) -> None:
+        """Closes the HTTP sessions used by the async scoring methods"""
+        for predictor in self._async_predictors.values():
+            predictor.close()
+
+        self._async_predictors.clear()
+        await self._async_transport.close()
 
     def explain(self, deployment_name=None, df=None, endpoint=None):
         raise NotImplementedError()
@@ -489,6 +1545,8 @@ class WatsonMLDeploymentClient(BaseDeploymentClient):
             meta_props=metadata, background_mode=False
         )
 
+        self._space_cache.invalidate(name)
+
         return endpoint_details
 
     def update_endpoint(self, endpoint, config=None):
@@ -516,11 +1574,17 @@ class WatsonMLDeploymentClient(BaseDeploymentClient):
         """
         client = self._wml_client
 
-        endpoint_id = get_space_id_from_space_name(client=client, space_name=endpoint)
+        endpoint_id = self._resolve_space_id(endpoint=endpoint)
 
         if endpoint_id is not None:
             client.spaces.delete(space_id=endpoint_id)
 
+            with self._space_lock:
+                if endpoint_id == self._active_space_id:
+                    self._active_space_id = None
+
+        self._space_cache.invalidate(endpoint)
+
     def list_endpoints(self):
         """
         List endpoints in the specified target. This method is expected to return an
@@ -544,9 +1608,7 @@ class WatsonMLDeploymentClient(BaseDeploymentClient):
 
     def get_endpoint(self, endpoint):
         client = self._wml_client
-        deployment_space_id = get_space_id_from_space_name(
-            client=client, space_name=endpoint
-        )
+        deployment_space_id = self._resolve_space_id(endpoint=endpoint)
         endpoint_details = client.spaces.get_details(space_id=deployment_space_id)
         return endpoint_details
 
@@ -0,0 +1,119 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from mlflow.exceptions import MlflowException
+from mlflow.protos.databricks_pb2 import INVALID_PARAMETER_VALUE
+
+
+class Pipeline:
+    def __init__(self, max_workers: int = 4):
+        """Runs stages that depend on the results of other stages. A stage starts
+        as soon as the stages it requires are done, so that independent stages run
+        concurrently on a thread pool.
+
+        Parameters
+        ----------
+        max_workers : int, optional
+            maximum number of stages running at the same time, by default 4
+        """
+        self.max_workers = max_workers
+        self._stages: Dict[str, Tuple[Callable[[Dict[str, Any]], Any], Tuple]] = {}
+
+    def add(
+        self,
+        name: str,
+        func: Callable[[Dict[str, Any]], Any],
+        requires: Sequence[str] = (),
+    ) -> None:
+        """Adds a stage to the pipeline
+
+        Parameters
+        ----------
+        name : str
+            unique name of the stage, its result is stored under it
+        func : Callable[[Dict[str, Any]], Any]
+            runs the stage, called with the results of the stages done so far
+        requires : Sequence[str], optional
+            names of the stages that must be done before this one, by default ()
+        """
+        if name in self._stages:
+            raise MlflowException(
+                f"Pipeline stage {name} already exists",
+                error_code=INVALID_PARAMETER_VALUE,
+            )
+
+        self._stages[name] = (func, tuple(requires))
+
+    def _check(self) -> None:
+        # stages can only require stages added before them, so there's no cycle
+        seen = set()
+
+        for name, (_, requires) in self._stages.items():
+            missing = [required for required in requires if required not in seen]
+
+            if len(missing) > 0:
+                raise MlflowException(
+                    f"Pipeline stage {name} requires unknown stages {missing}",
+                    error_code=INVALID_PARAMETER_VALUE,
+                )
+
+            seen.add(name)
+
+    def run(self) -> Tuple[Dict[str, Any], Dict[str, float]]:
+        """Runs all the stages. If a stage fails, the stages that haven't started
+        are skipped and the error of the first failed stage is raised once the
+        running ones are done.
+
+        Returns
+        -------
+        Tuple[Dict[str, Any], Dict[str, float]]
+            results and wall-clock seconds of each stage, keyed by stage name. The
+            timings also have the "total" seconds of the pipeline.
+        """
+        self._check()
+
+        results: Dict[str, Any] = {}
+        timings: Dict[str, float] = {}
+        pending = dict(self._stages)
+        running: Dict[Future, str] = {}
+        errors: List[BaseException] = []
+        start = time.perf_counter()
+
+        def timed(name: str, func: Callable[[Dict[str, Any]], Any], done: Dict):
+            stage_start = time.perf_counter()
+
+            try:
+                return func(done)
+            finally:
+                timings[name] = time.perf_counter() - stage_start
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while len(pending) > 0 or len(running) > 0:
+                if len(errors) == 0:
+                    for name, (func, requires) in list(pending.items()):
+                        if all(required in results for required in requires):
+                            del pending[name]
+                            # stages see a snapshot of the results they may use
+                            future = pool.submit(timed, name, func, dict(results))
+                            running[future] = name
+
+                if len(running) == 0:
+                    break
+
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    name = running.pop(future)
+
+                    try:
+                        results[name] = future.result()
+                    except BaseException as e:
+                        errors.append(e)
+
+        timings["total"] = time.perf_counter() - start
+
+        if len(errors) > 0:
+            raise errors[0]
+
+        return results, timings
@@ -0,0 +1,330 @@
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from mlflow.exceptions import MlflowException
+from mlflow.protos.databricks_pb2 import DEADLINE_EXCEEDED, INTERNAL_ERROR
+
+LOGGER = logging.getLogger(__name__)
+
+# states reported by WML while a deployment is being created or updated
+IN_PROGRESS_STATES = (
+    "initializing",
+    "updating",
+    "DEPLOY_IN_PROGRESS",
+    "UPDATE_IN_PROGRESS",
+)
+READY_STATES = ("ready", "DEPLOY_SUCCESS", "UPDATE_SUCCESS")
+
+
+def get_deployment_state(deployment_details: Dict) -> Optional[str]:
+    """Returns the state of a deployment
+
+    Parameters
+    ----------
+    deployment_details : Dict
+        deployment details dictionary
+
+    Returns
+    -------
+    Optional[str]
+        state of the deployment, None if the details don't have one
+    """
+    return deployment_details.get("entity", {}).get("status", {}).get("state")
+
+
+class DeploymentHandle:
+    def __init__(
+        self,
+        name: str,
+        deployment_id: str,
+        deployment_details: Dict,
+        on_ready: Optional[Callable[[Dict], Optional[Dict]]] = None,
+    ):
+        """Deployment being created or updated by WML, whose state is refreshed by a
+        `DeploymentPoller`
+
+        Parameters
+        ----------
+        name : str
+            name of the deployment
+        deployment_id : str
+            id of the deployment
+        deployment_details : Dict
+            deployment details dictionary returned by the create or update request
+        on_ready : Optional[Callable[[Dict], Optional[Dict]]], optional
+            called on the poller thread with the details of the ready deployment,
+            before `result` returns. It may return newer details, and its errors
+            are raised by `result`, by default None
+        """
+        self.name = name
+        self.deployment_id = deployment_id
+        self._details = deployment_details
+        self._on_ready = on_ready
+        self._error: Optional[BaseException] = None
+        self._done = threading.Event()
+
+    def __repr__(self) -> str:
+        return f"DeploymentHandle(name={self.name!r}, status={self.status()!r})"
+
+    def status(self) -> Optional[str]:
+        """Returns the last polled state of the deployment
+
+        Returns
+        -------
+        Optional[str]
+            state of the deployment, e.g. "initializing", "ready" or "failed"
+        """
+        return get_deployment_state(self._details)
+
+    def done(self) -> bool:
+        """Returns whether the deployment is ready or failed
+
+        Returns
+        -------
+        bool
+            whether `result` returns without waiting
+        """
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Waits until the deployment is ready or failed
+
+        Parameters
+        ----------
+        timeout : Optional[float], optional
+            maximum seconds to wait, by default None to wait without limit
+
+        Returns
+        -------
+        bool
+            whether the deployment is ready or failed
+        """
+        return self._done.wait(timeout)
+
+    def result(self, timeout: Optional[float] = None) -> Dict:
+        """Waits until the deployment is ready and returns its details
+
+        Parameters
+        ----------
+        timeout : Optional[float], optional
+            maximum seconds to wait, by default None to wait without limit
+
+        Returns
+        -------
+        Dict
+            deployment details dictionary
+
+        Raises
+        ------
+        MlflowException
+            if the deployment failed or isn't ready after `timeout` seconds
+        """
+        if not self.wait(timeout):
+            raise MlflowException(
+                f"Deployment {self.name} is not ready after {timeout} seconds, "
+                f"its state is {self.status()}",
+                error_code=DEADLINE_EXCEEDED,
+            )
+
+        if self._error is not None:
+            raise self._error
+
+        return self._details
+
+    def _update(self, deployment_details: Dict) -> bool:
+        """Records the polled details of the deployment
+
+        Parameters
+        ----------
+        deployment_details : Dict
+            deployment details dictionary
+
+        Returns
+        -------
+        bool
+            whether the deployment is ready or failed
+        """
+        deployment_details["name"] = self.name
+        self._details = deployment_details
+        state = self.status()
+
+        if state is None or state in IN_PROGRESS_STATES:
+            return False
+
+        if state in READY_STATES:
+            if self._on_ready is not None:
+                try:
+                    self._details = self._on_ready(deployment_details) or self._details
+                except Exception as e:
+                    LOGGER.exception(e)
+                    self._error = e
+        else:
+            failure = deployment_details["entity"]["status"].get("failure", {})
+            self._error = MlflowException(
+                f"Deployment {self.name} failed with state {state}: {failure}",
+                error_code=INTERNAL_ERROR,
+            )
+
+        self._done.set()
+
+        return True
+
+    def _fail(self, error: BaseException) -> None:
+        """Ends the handle with an error raised by `result`
+
+        Parameters
+        ----------
+        error : BaseException
+            error of the deployment
+        """
+        self._error = error
+        self._done.set()
+
+
+class DeploymentPoller:
+    def __init__(
+        self,
+        initial_interval: float = 2.0,
+        max_interval: float = 30.0,
+        multiplier: float = 2.0,
+        max_errors: int = 3,
+    ):
+        """Single background thread refreshing the state of any number of
+        `DeploymentHandle`. Each deployment is polled with an exponential backoff
+        and a random jitter, so that deployments submitted together don't poll WML
+        in bursts. The thread stops when no deployment is left to poll.
+
+        Parameters
+        ----------
+        initial_interval : float, optional
+            seconds before the first poll of a deployment, by default 2
+        max_interval : float, optional
+            maximum seconds between two polls of a deployment, by default 30
+        multiplier : float, optional
+            growth of the interval after each poll, by default 2
+        max_errors : int, optional
+            number of consecutive failed polls after which the handle fails,
+            by default 3
+        """
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.multiplier = multiplier
+        self.max_errors = max_errors
+
+        self._queue: List = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def _delay(self, attempt: int) -> float:
+        """Returns the seconds before the next poll of a deployment
+
+        Parameters
+        ----------
+        attempt : int
+            number of polls of the deployment so far
+
+        Returns
+        -------
+        float
+            delay drawn between half and all of the backoff interval
+        """
+        # the exponent is bounded so that long running deployments don't overflow
+        interval = min(
+            self.max_interval,
+            self.initial_interval * self.multiplier ** min(attempt, 32),
+        )
+
+        return random.uniform(interval / 2, interval)
+
+    def _schedule(
+        self,
+        handle: DeploymentHandle,
+        fetch: Callable[[], Dict],
+        attempt: int,
+        errors: int,
+    ) -> None:
+        # the caller holds `_condition`
+        due = time.monotonic() + self._delay(attempt)
+        heapq.heappush(
+            self._queue, (due, next(self._counter), handle, fetch, attempt, errors)
+        )
+
+    def watch(
+        self, handle: DeploymentHandle, fetch: Callable[[], Dict]
+    ) -> DeploymentHandle:
+        """Polls a deployment until it is ready or failed
+
+        Parameters
+        ----------
+        handle : DeploymentHandle
+            handle of the deployment
+        fetch : Callable[[], Dict]
+            returns the current details of the deployment
+
+        Returns
+        -------
+        DeploymentHandle
+            `handle`
+        """
+        with self._condition:
+            self._schedule(handle=handle, fetch=fetch, attempt=0, errors=0)
+
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="mlflow-watsonml-poller", daemon=True
+                )
+                self._thread.start()
+
+            self._condition.notify()
+
+        return handle
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while True:
+                    if len(self._queue) == 0:
+                        self._thread = None
+                        return
+
+                    wait_for = self._queue[0][0] - time.monotonic()
+
+                    if wait_for <= 0:
+                        break
+
+                    self._condition.wait(timeout=wait_for)
+
+                _, _, handle, fetch, attempt, errors = heapq.heappop(self._queue)
+
+            if handle.done():
+                continue
+
+            # WML is polled outside of the lock so that `watch` never waits on it
+            try:
+                done = handle._update(fetch())
+                errors = 0
+            except Exception as e:
+                errors += 1
+                done = errors >= self.max_errors
+
+                if done:
+                    handle._fail(
+                        MlflowException(
+                            f"Polling deployment {handle.name} failed: {e}",
+                            error_code=INTERNAL_ERROR,
+                        )
+                    )
+                else:
+                    LOGGER.warning(f"Polling deployment {handle.name} failed: {e}")
+
+            if not done:
+                with self._condition:
+                    self._schedule(
+                        handle=handle, fetch=fetch, attempt=attempt + 1, errors=errors
+                    )
@@ -0,0 +1,475 @@
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import requests
+from ibm_watson_machine_learning.client import APIClient
+from mlflow.exceptions import MlflowException
+from mlflow.models import ModelSignature
+from mlflow.types import Schema
+
+from mlflow_watsonml.scoring import (
+    STREAM_BATCH_ROWS,
+    decode_predictions,
+    encode_inputs,
+    iter_json_payload,
+    score_in_chunks,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+
+def get_scoring_url(client: APIClient, deployment_details: Dict) -> str:
+    """Returns the online scoring URL of a deployment
+
+    Parameters
+    ----------
+    client : APIClient
+        WML client
+    deployment_details : Dict
+        deployment details dictionary
+
+    Returns
+    -------
+    str
+        scoring URL
+    """
+    try:
+        return client.deployments.get_scoring_href(deployment_details)
+    except Exception as _:
+        deployment_id = client.deployments.get_id(deployment_details)
+        return (
+            f"{client.wml_credentials['url']}/ml/v4/deployments/"
+            f"{deployment_id}/predictions"
+        )
+
+
+class AsyncTransport:
+    def __init__(
+        self,
+        max_inflight: int = 64,
+        session_factory: Optional[Callable[[], Any]] = None,
+    ):
+        """`aiohttp` session shared by async scoring calls, with a bound on the
+        number of requests in flight. The session and the semaphore are created
+        lazily in the running event loop.
+
+        Parameters
+        ----------
+        max_inflight : int, optional
+            maximum number of concurrent scoring requests, by default 64
+        session_factory : Optional[Callable[[], Any]], optional
+            creates the HTTP session, by default an `aiohttp.ClientSession` whose
+            connection pool is sized to `max_inflight`
+        """
+        self.max_inflight = max_inflight
+        self._session_factory = session_factory
+        self._session = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _create_session(self) -> Any:
+        if self._session_factory is not None:
+            return self._session_factory()
+
+        try:
+            import aiohttp
+        except ImportError as e:
+            raise MlflowException(
+                "Async scoring requires aiohttp. "
+                "Install it with `pip install mlflow-watsonml[async]`."
+            ) from e
+
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_inflight)
+        )
+
+    async def _ensure_session(self) -> None:
+        loop = asyncio.get_running_loop()
+
+        if self._loop is not loop:
+            previous_session, previous_loop = self._session, self._loop
+
+            self._session = self._create_session()
+            self._semaphore = asyncio.Semaphore(self.max_inflight)
+            self._loop = loop
+
+            if previous_session is not None:
+                await self._close_session(previous_session, previous_loop)
+
+    @staticmethod
+    async def _close_session(
+        session: Any, loop: Optional[asyncio.AbstractEventLoop]
+    ) -> None:
+        """Closes the session of an event loop the transport no longer uses
+
+        Parameters
+        ----------
+        session : Any
+            HTTP session
+        loop : Optional[asyncio.AbstractEventLoop]
+            event loop of the session
+        """
+        if loop is not None and loop.is_running():
+            # the loop runs in another thread, the session is closed there
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+            return
+
+        try:
+            await session.close()
+        except Exception as e:
+            # the connections of a closed loop can't be closed from another one,
+            # detaching them keeps the session from leaking as unclosed
+            LOGGER.debug(f"Failed to close the HTTP session of a previous loop: {e}")
+
+            if hasattr(session, "detach"):
+                session.detach()
+
+    async def post_json(
+        self, url: str, payload: Dict, params: Dict, headers: Dict
+    ) -> Tuple[int, Any]:
+        """Posts a JSON payload and returns the response status and body
+
+        Parameters
+        ----------
+        url : str
+            request URL
+        payload : Dict
+            JSON payload
+        params : Dict
+            query parameters
+        headers : Dict
+            request headers
+
+        Returns
+        -------
+        Tuple[int, Any]
+            response status, decoded JSON body if the request succeeded else the text
+        """
+        await self._ensure_session()
+
+        async with self._semaphore:
+            async with self._session.post(
+                url, json=payload, params=params, headers=headers
+            ) as response:
+                if response.status != 200:
+                    return response.status, await response.text()
+
+                return response.status, await response.json(content_type=None)
+
+    async def close(self) -> None:
+        """Closes the HTTP session"""
+        if self._session is not None:
+            await self._session.close()
+
+        self._session = None
+        self._semaphore = None
+        self._loop = None
+
+
+class WatsonMLPredictor:
+    def __init__(
+        self,
+        deployment_name: str,
+        space_id: str,
+        deployment_id: str,
+        scoring_url: str,
+        get_headers: Callable[[], Dict],
+        version: Optional[str] = None,
+        environment_variables: Optional[Dict] = None,
+        input_data_key: str = "input_data",
+        environment_variables_key: str = "environment_variables",
+        session: Optional[requests.Session] = None,
+        transport: Optional[AsyncTransport] = None,
+        output_format: str = "pandas",
+        output_schema: Optional[Union[Schema, ModelSignature, Dict[str, Any]]] = None,
+    ):
+        """Scoring handle pinned to a single WML online deployment. Use
+        `WatsonMLDeploymentClient.get_predictor` to build one.
+
+        Parameters
+        ----------
+        deployment_name : str
+            name of the deployment
+        space_id : str
+            id of the deployment space
+        deployment_id : str
+            id of the deployment
+        scoring_url : str
+            online scoring URL of the deployment
+        get_headers : Callable[[], Dict]
+            returns the authorization headers of a request
+        version : Optional[str], optional
+            WML API version date, by default None
+        environment_variables : Optional[Dict], optional
+            `custom` block of the deployment sent with every request, by default None
+        input_data_key : str, optional
+            scoring payload key of the input data, by default "input_data"
+        environment_variables_key : str, optional
+            scoring payload key of the environment variables,
+            by default "environment_variables"
+        session : Optional[requests.Session], optional
+            HTTP session to score with, by default a new session
+        transport : Optional[AsyncTransport], optional
+            transport of `apredict` and `apredict_many`, by default a new transport
+        output_format : str, optional
+            one of "pandas", "numpy" or "arrow", by default "pandas"
+        output_schema : Optional[Union[Schema, ModelSignature, Dict[str, Any]]], optional
+            output schema used to type the predictions, by default None
+        """
+        self.deployment_name = deployment_name
+        self.space_id = space_id
+        self.deployment_id = deployment_id
+        self.scoring_url = scoring_url
+        self.environment_variables = environment_variables
+        self.output_format = output_format
+        self.output_schema = output_schema
+
+        self._get_headers = get_headers
+        self._input_data_key = input_data_key
+        self._environment_variables_key = environment_variables_key
+        self._session = session if session is not None else requests.Session()
+        self._transport = transport if transport is not None else AsyncTransport()
+
+        self._params = {"space_id": space_id}
+        if version is not None:
+            self._params["version"] = version
+
+    def __enter__(self) -> "WatsonMLPredictor":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Closes the HTTP session of the predictor"""
+        self._session.close()
+
+    async def aclose(self) -> None:
+        """Closes the HTTP sessions of the predictor"""
+        self.close()
+        await self._transport.close()
+
+    def _decode(self, predictions: List[Any]) -> Any:
+        return decode_predictions(
+            predictions, output_format=self.output_format, schema=self.output_schema
+        )
+
+    def _scoring_payload(self, input_data: List[Dict], tolist: bool = True) -> Dict:
+        if tolist:
+            input_data = [
+                {
+                    key: value.tolist() if isinstance(value, np.ndarray) else value
+                    for key, value in entry.items()
+                }
+                for entry in input_data
+            ]
+
+        scoring_payload = {self._input_data_key: input_data}
+
+        if self.environment_variables:
+            scoring_payload[self._environment_variables_key] = (
+                self.environment_variables
+            )
+
+        return scoring_payload
+
+    def _score(self, input_data: List[Dict]) -> List[Any]:
+        """Sends a single scoring request
+
+        Parameters
+        ----------
+        input_data : List[Dict]
+            `input_data` entries of the scoring payload, as returned by
+            `encode_inputs(..., tolist=False)`. Payloads of more than
+            `STREAM_BATCH_ROWS` rows are streamed instead of serialized at once.
+
+        Returns
+        -------
+        List[Any]
+            `predictions` of the scoring response
+        """
+        streamable = all(
+            isinstance(entry["values"], (list, np.ndarray)) for entry in input_data
+        )
+
+        if (
+            streamable
+            and sum(len(entry["values"]) for entry in input_data) > STREAM_BATCH_ROWS
+        ):
+            response = self._session.post(
+                self.scoring_url,
+                data=iter_json_payload(
+                    self._scoring_payload(input_data=input_data, tolist=False),
+                    input_data_key=self._input_data_key,
+                ),
+                params=self._params,
+                headers={**self._get_headers(), "Content-Type": "application/json"},
+            )
+        else:
+            response = self._session.post(
+                self.scoring_url,
+                json=self._scoring_payload(input_data=input_data),
+                params=self._params,
+                headers=self._get_headers(),
+            )
+
+        if response.status_code != 200:
+            raise MlflowException(
+                f"Scoring deployment {self.deployment_name} failed with status "
+                f"{response.status_code}: {response.text}"
+            )
+
+        return response.json()["predictions"]
+
+    async def _ascore(self, input_data: List[Dict]) -> List[Any]:
+        """Sends a single scoring request without blocking the event loop
+
+        Parameters
+        ----------
+        input_data : List[Dict]
+            `input_data` entries of the scoring payload
+
+        Returns
+        -------
+        List[Any]
+            `predictions` of the scoring response
+        """
+        status, body = await self._transport.post_json(
+            self.scoring_url,
+            payload=self._scoring_payload(input_data=input_data),
+            params=self._params,
+            headers=self._get_headers(),
+        )
+
+        if status != 200:
+            raise MlflowException(
+                f"Scoring deployment {self.deployment_name} failed with status "
+                f"{status}: {body}"
+            )
+
+        return body["predictions"]
+
+    def predict(
+        self,
+        inputs: Union[pd.DataFrame, np.ndarray, List[Any], Dict[str, Any]],
+        chunk_rows: Optional[int] = None,
+        chunk_bytes: Optional[int] = None,
+        max_workers: int = 4,
+    ) -> Any:
+        """Compute predictions on inputs
+
+        Parameters
+        ----------
+        inputs : Union[pd.DataFrame, np.ndarray, List[Any], Dict[str, Any]]
+            Input data (or arguments) to pass to the deployment for inference
+        chunk_rows : Optional[int], optional
+            maximum number of rows per scoring request, by default None
+        chunk_bytes : Optional[int], optional
+            approximate maximum JSON size of a scoring request in bytes,
+            by default None
+        max_workers : int, optional
+            maximum number of chunks scored concurrently, by default 4
+
+        Returns
+        -------
+        Any
+            Model predictions in `output_format` if the deployment returns `fields`,
+            else the raw predictions
+        """
+
+        def score(data):
+            return self._decode(
+                self._score(input_data=[encode_inputs(data, tolist=False)])
+            )
+
+        if chunk_rows is None and chunk_bytes is None:
+            return score(inputs)
+
+        return score_in_chunks(
+            score,
+            inputs,
+            chunk_rows=chunk_rows,
+            chunk_bytes=chunk_bytes,
+            max_workers=max_workers,
+        )
+
+    def predict_many(
+        self,
+        inputs: List[Union[pd.DataFrame, np.ndarray, List[Any], Dict[str, Any]]],
+    ) -> List[Any]:
+        """Compute predictions on several inputs with a single scoring request.
+        Each input is sent as its own `input_data` entry.
+
+        Parameters
+        ----------
+        inputs : List[Union[pd.DataFrame, np.ndarray, List[Any], Dict[str, Any]]]
+            list of input data to pass to the deployment for inference
+
+        Returns
+        -------
+        List[Any]
+            Model predictions for each input, in the order of `inputs`
+        """
+        predictions = self._score(
+            input_data=[encode_inputs(data, tolist=False) for data in inputs]
+        )
+
+        if len(predictions) != len(inputs):
+            raise MlflowException(
+                f"Deployment {self.deployment_name} returned {len(predictions)} "
+                f"predictions for {len(inputs)} inputs"
+            )
+
+        return [self._decode([prediction]) for prediction in predictions]
+
+    async def apredict(
+        self,
+        inputs: Union[pd.DataFrame, np.ndarray, List[Any], Dict[str, Any]],
+    ) -> Any:
+        """Async variant of `predict`
+
+        Parameters
+        ----------
+        inputs : Union[pd.DataFrame, np.ndarray, List[Any], Dict[str, Any]]
+            Input data (or arguments) to pass to the deployment for inference
+
+        Returns
+        -------
+        Any
+            Model predictions in `output_format` if the deployment returns `fields`,
+            else the raw predictions
+        """
+        predictions = await self._ascore(input_data=[encode_inputs(inputs)])
+
+        return self._decode(predictions)
+
+    async def apredict_many(
+        self,
+        inputs: List[Union[pd.DataFrame, np.ndarray, List[Any], Dict[str, Any]]],
+    ) -> List[Any]:
+        """Async variant of `predict_many`
+
+        Parameters
+        ----------
+        inputs : List[Union[pd.DataFrame, np.ndarray, List[Any], Dict[str, Any]]]
+            list of input data to pass to the deployment for inference
+
+        Returns
+        -------
+        List[Any]
+            Model predictions for each input, in the order of `inputs`
+        """
+        predictions = await self._ascore(
+            input_data=[encode_inputs(data) for data in inputs]
+        )
+
+        if len(predictions) != len(inputs):
+            raise MlflowException(
+                f"Deployment {self.deployment_name} returned {len(predictions)} "
+                f"predictions for {len(inputs)} inputs"
+            )
+
+        return [self._decode([prediction]) for prediction in predictions]
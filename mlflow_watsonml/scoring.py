@@ -0,0 +1,718 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from mlflow.exceptions import MlflowException
+from mlflow.models import ModelSignature
+from mlflow.protos.databricks_pb2 import INVALID_PARAMETER_VALUE
+from mlflow.types import Schema
+
+# number of rows serialized to estimate the JSON size of a row
+ROW_SIZE_SAMPLE = 100
+
+# number of rows serialized at a time when streaming a scoring payload
+STREAM_BATCH_ROWS = 10000
+
+OUTPUT_FORMATS = ("pandas", "numpy", "arrow")
+
+
+class ChunkedScoringError(MlflowException):
+    def __init__(self, errors: Dict[Tuple[int, int], Exception]):
+        """Raised when one or more chunks of a chunked prediction fail
+
+        Parameters
+        ----------
+        errors : Dict[Tuple[int, int], Exception]
+            exception of each failed chunk keyed by its [start, stop) row range
+        """
+        self.errors = errors
+
+        details = "; ".join(
+            f"rows {start}-{stop - 1}: {error}"
+            for (start, stop), error in sorted(errors.items())
+        )
+        super().__init__(f"{len(errors)} chunk(s) failed to score - {details}")
+
+
+def _encode_column(values: Union[pd.Series, np.ndarray]) -> np.ndarray:
+    """Converts a column into an array of JSON serializable Python values.
+    Missing values (NaN, NaT, NA) become None, datetimes become ISO 8601 strings,
+    timedeltas become seconds and categoricals are encoded through their categories.
+
+    Parameters
+    ----------
+    values : Union[pd.Series, np.ndarray]
+        column values
+
+    Returns
+    -------
+    np.ndarray
+        one dimensional array of the encoded column
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    dtype = series.dtype
+
+    if isinstance(dtype, pd.CategoricalDtype):
+        # encode each category once and gather them by code, -1 marks a missing value
+        codes = series.cat.codes.to_numpy()
+        categories = _encode_column(series.cat.categories.to_series()).astype(object)
+
+        encoded = np.full(len(codes), None, dtype=object)
+        present = codes >= 0
+        encoded[present] = categories[codes[present]]
+        return encoded
+
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        if getattr(dtype, "tz", None) is not None:
+            series = series.dt.tz_convert("UTC").dt.tz_localize(None)
+            suffix = "Z"
+        else:
+            suffix = ""
+
+        array = series.to_numpy(dtype="datetime64[ns]")
+        encoded = np.datetime_as_string(array, unit="auto").astype(object)
+        if suffix:
+            encoded = encoded + suffix
+        encoded[np.isnat(array)] = None
+        return encoded
+
+    if pd.api.types.is_timedelta64_dtype(dtype):
+        return _encode_column(series.dt.total_seconds())
+
+    if isinstance(dtype, np.dtype) and dtype.kind in "biu":
+        return series.to_numpy()
+
+    if isinstance(dtype, np.dtype) and dtype.kind == "f":
+        array = series.to_numpy()
+        missing = np.isnan(array)
+
+        if not missing.any():
+            return array
+
+        encoded = array.astype(object)
+        encoded[missing] = None
+        return encoded
+
+    # object, string and pandas nullable extension dtypes
+    encoded = series.to_numpy(dtype=object)
+    encoded[pd.isna(encoded)] = None
+    return encoded
+
+
+def _stack_columns(columns: List[np.ndarray]) -> np.ndarray:
+    """Stacks encoded columns into a two dimensional array of rows. Homogeneous
+    numeric columns keep their dtype, anything else is stacked as objects so
+    integers are not upcast to floats.
+    """
+    if len(columns) == 0:
+        return np.empty((0, 0), dtype=object)
+
+    dtypes = {column.dtype for column in columns}
+
+    if len(dtypes) == 1 and dtypes.pop().kind in "biuf":
+        return np.column_stack(columns)
+
+    rows = np.empty((len(columns[0]), len(columns)), dtype=object)
+    for idx, column in enumerate(columns):
+        rows[:, idx] = column
+
+    return rows
+
+
+def encode_rows(inputs: Any) -> Tuple[Optional[List[str]], Any]:
+    """Converts a prediction input into WML `fields` and a two dimensional array of
+    JSON serializable rows, one column at a time
+
+    Parameters
+    ----------
+    inputs : Any
+        prediction input. DataFrames, Series, ndarrays (including structured and
+        record arrays) and dicts of equally long columns are encoded; any other
+        input is returned as is.
+
+    Returns
+    -------
+    Tuple[Optional[List[str]], Any]
+        field names (None when the input has no column names), rows
+    """
+    if isinstance(inputs, pd.DataFrame):
+        fields = [str(column) for column in inputs.columns]
+        dtypes = set(inputs.dtypes)
+
+        if len(dtypes) == 1 and dtypes.pop().kind in "biu":
+            return fields, inputs.to_numpy()
+
+        columns = [_encode_column(inputs.iloc[:, idx]) for idx in range(len(fields))]
+        return fields, _stack_columns(columns)
+
+    if isinstance(inputs, pd.Series):
+        return None, _encode_column(inputs)
+
+    if isinstance(inputs, np.ndarray):
+        if inputs.dtype.names is not None:
+            fields = list(inputs.dtype.names)
+            columns = [_encode_column(inputs[field].ravel()) for field in fields]
+            return fields, _stack_columns(columns)
+
+        if inputs.dtype.kind in "biu":
+            return None, inputs
+
+        flat = _encode_column(inputs.ravel())
+        return None, flat.reshape(inputs.shape)
+
+    if isinstance(inputs, dict) and count_rows(inputs) is not None:
+        columns = [np.asarray(column) for column in inputs.values()]
+
+        if all(column.ndim == 1 for column in columns):
+            fields = [str(key) for key in inputs.keys()]
+            return fields, _stack_columns([_encode_column(c) for c in columns])
+
+    return None, inputs
+
+
+def encode_inputs(inputs: Any, tolist: bool = True) -> Dict[str, Any]:
+    """Converts a prediction input into a WML `input_data` entry
+
+    Parameters
+    ----------
+    inputs : Any
+        prediction input, see `encode_rows`
+    tolist : bool, optional
+        whether to convert the rows into nested lists, by default True. Keep the
+        array form for `iter_json_payload`.
+
+    Returns
+    -------
+    Dict[str, Any]
+        `input_data` entry with `values` and, for named columns, `fields`
+    """
+    fields, rows = encode_rows(inputs)
+
+    entry = dict()
+    if fields is not None:
+        entry["fields"] = fields
+
+    if tolist and isinstance(rows, np.ndarray):
+        rows = rows.tolist()
+
+    entry["values"] = rows
+
+    return entry
+
+
+def iter_json_payload(
+    scoring_payload: Dict[str, Any],
+    input_data_key: str = "input_data",
+    batch_rows: int = STREAM_BATCH_ROWS,
+) -> Iterator[bytes]:
+    """Serializes a scoring payload incrementally so the JSON document of a large
+    input is never held in memory at once. The `values` of the `input_data`
+    entries may be lists or arrays returned by `encode_rows`.
+
+    Parameters
+    ----------
+    scoring_payload : Dict[str, Any]
+        scoring payload
+    input_data_key : str, optional
+        scoring payload key of the input data, by default "input_data"
+    batch_rows : int, optional
+        number of rows serialized at a time, by default STREAM_BATCH_ROWS
+
+    Yields
+    ------
+    Iterator[bytes]
+        consecutive parts of the JSON document
+    """
+    yield b"{"
+
+    for key_idx, (key, value) in enumerate(scoring_payload.items()):
+        prefix = "," if key_idx > 0 else ""
+
+        if key != input_data_key:
+            yield f"{prefix}{json.dumps(key)}:{json.dumps(value)}".encode()
+            continue
+
+        yield f"{prefix}{json.dumps(key)}:[".encode()
+
+        for entry_idx, entry in enumerate(value):
+            yield b"," if entry_idx > 0 else b""
+            yield b"{"
+
+            for field_idx, (field, field_value) in enumerate(entry.items()):
+                yield b"," if field_idx > 0 else b""
+
+                if field != "values":
+                    yield f"{json.dumps(field)}:{json.dumps(field_value)}".encode()
+                    continue
+
+                yield b'"values":['
+
+                for start in range(0, len(field_value), batch_rows):
+                    batch = field_value[start : start + batch_rows]
+                    if isinstance(batch, np.ndarray):
+                        batch = batch.tolist()
+
+                    yield b"," if start > 0 else b""
+                    yield json.dumps(batch)[1:-1].encode()
+
+                yield b"]"
+
+            yield b"}"
+
+        yield b"]"
+
+    yield b"}"
+
+
+def _schema_dtypes(
+    schema: Optional[Union[Schema, ModelSignature, Dict[str, Any]]],
+    fields: List[str],
+) -> Optional[List[Optional[np.dtype]]]:
+    """Returns the numpy dtype of each field according to an output schema
+
+    Parameters
+    ----------
+    schema : Optional[Union[Schema, ModelSignature, Dict[str, Any]]]
+        MLflow output schema, model signature or mapping of field name to dtype
+    fields : List[str]
+        field names of the predictions
+
+    Returns
+    -------
+    Optional[List[Optional[np.dtype]]]
+        dtype of each field, None for fields the schema doesn't describe
+    """
+    if schema is None:
+        return None
+
+    if isinstance(schema, ModelSignature):
+        schema = schema.outputs
+
+        if schema is None:
+            return None
+
+    if isinstance(schema, Schema):
+        numpy_types = schema.numpy_types()
+
+        if schema.has_input_names():
+            schema = dict(zip(schema.input_names(), numpy_types))
+        else:
+            # unnamed columns are matched by position
+            return [
+                np.dtype(numpy_types[idx]) if idx < len(numpy_types) else None
+                for idx in range(len(fields))
+            ]
+
+    return [
+        np.dtype(schema[field]) if schema.get(field) is not None else None
+        for field in fields
+    ]
+
+
+def _numeric_matrix(rows: List[List[Any]]) -> Optional[np.ndarray]:
+    """Converts rows into a two dimensional numeric array in a single pass, without
+    intermediate Python objects. Only rows whose values all share one numeric type
+    qualify, so integer columns are never upcast to floats.
+    """
+    if len(rows) == 0 or not isinstance(rows[0], (list, tuple)) or len(rows[0]) == 0:
+        return None
+
+    value_types = {type(value) for value in rows[0]}
+
+    if len(value_types) != 1 or value_types.pop() not in (int, float, bool):
+        return None
+
+    try:
+        matrix = np.asarray(rows)
+    except ValueError:
+        # ragged rows
+        return None
+
+    if matrix.ndim != 2 or matrix.dtype.kind not in "biuf":
+        return None
+
+    return matrix
+
+
+def _decode_column(values: Tuple[Any, ...], dtype: Optional[np.dtype]) -> np.ndarray:
+    """Converts the values of a single field into a one dimensional typed array"""
+    column = None
+
+    for candidate in (dtype, None) if dtype is not None else (None,):
+        try:
+            column = np.asarray(values, dtype=candidate)
+            dtype = candidate
+            break
+        except (TypeError, ValueError):
+            # values the schema dtype can't hold (e.g. missing integers)
+            # or sequences of different lengths
+            continue
+
+    if column is None or column.ndim != 1:
+        # the field holds sequences (e.g. class probabilities), keep one per row
+        column = np.empty(len(values), dtype=object)
+        for idx, value in enumerate(values):
+            column[idx] = value
+        return column
+
+    if dtype is None and column.dtype.kind == "O":
+        # e.g. numbers with missing values
+        column = pd.Series(column, copy=False).infer_objects().to_numpy()
+
+    elif column.dtype.kind in "US":
+        # numpy stringifies numbers mixed with strings, keep the original values
+        column = np.array(values, dtype=object)
+
+    return column
+
+
+def decode_predictions(
+    predictions: List[Any],
+    output_format: str = "pandas",
+    schema: Optional[Union[Schema, ModelSignature, Dict[str, Any]]] = None,
+) -> Any:
+    """Converts the `predictions` of a WML scoring response into the plugin's
+    output format. The rows are decoded straight into typed numpy columns, using
+    `schema` for the dtypes when given and inferring them otherwise.
+
+    Parameters
+    ----------
+    predictions : List[Any]
+        `predictions` list of a WML scoring response
+    output_format : str, optional
+        one of "pandas", "numpy" or "arrow", by default "pandas". Predictions
+        without `fields` are always returned as is.
+    schema : Optional[Union[Schema, ModelSignature, Dict[str, Any]]], optional
+        output schema of the model, an MLflow model signature, or a mapping of field
+        name to dtype, by default None
+
+    Returns
+    -------
+    Any
+        a DataFrame, ndarray or Arrow table if the predictions carry `fields`,
+        else the raw predictions
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise MlflowException(
+            f"Invalid output format {output_format}. "
+            f"Valid formats are {', '.join(OUTPUT_FORMATS)}",
+            error_code=INVALID_PARAMETER_VALUE,
+        )
+
+    if not (
+        len(predictions) > 0
+        and isinstance(predictions[0], dict)
+        and "fields" in predictions[0].keys()
+    ):
+        return predictions
+
+    fields = predictions[0]["fields"]
+
+    if len(predictions) == 1:
+        rows = predictions[0]["values"]
+    else:
+        rows = []
+        for prediction in predictions:
+            rows.extend(prediction["values"])
+
+    dtypes = _schema_dtypes(schema=schema, fields=fields)
+
+    matrix = _numeric_matrix(rows) if dtypes is None else None
+
+    if matrix is not None and matrix.shape[1] == len(fields):
+        if output_format == "pandas":
+            return pd.DataFrame(matrix, columns=fields, copy=False)
+
+        if output_format == "numpy":
+            return matrix
+
+        columns = [matrix[:, idx] for idx in range(len(fields))]
+
+    else:
+        transposed = list(zip(*rows)) if len(rows) > 0 else [()] * len(fields)
+        columns = [
+            _decode_column(values, dtypes[idx] if dtypes is not None else None)
+            for idx, values in enumerate(transposed)
+        ]
+
+        if output_format == "pandas":
+            frame = pd.DataFrame(
+                {idx: column for idx, column in enumerate(columns)}, copy=False
+            )
+            frame.columns = fields
+            return frame
+
+        if output_format == "numpy":
+            if len({column.dtype for column in columns}) == 1:
+                return np.column_stack(columns)
+
+            try:
+                return np.rec.fromarrays(columns, names=fields)
+            except ValueError:
+                # field names that can't name a record, e.g. duplicates
+                return _stack_columns(
+                    [column.astype(object) for column in columns]
+                )
+
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise MlflowException(
+            "The arrow output format requires pyarrow. "
+            "Install it with `pip install pyarrow`."
+        ) from e
+
+    return pa.Table.from_arrays(
+        [pa.array(column) for column in columns], names=[str(f) for f in fields]
+    )
+
+
+def count_rows(inputs: Any) -> Optional[int]:
+    """Returns the number of rows of a prediction input
+
+    Parameters
+    ----------
+    inputs : Any
+        prediction input
+
+    Returns
+    -------
+    Optional[int]
+        number of rows, None if the input can't be split into rows
+    """
+    if isinstance(inputs, (pd.DataFrame, np.ndarray, list)):
+        return len(inputs)
+
+    if isinstance(inputs, dict) and len(inputs) > 0:
+        lengths = set()
+
+        for column in inputs.values():
+            if not isinstance(column, (list, np.ndarray, pd.Series)):
+                return None
+            lengths.add(len(column))
+
+        if len(lengths) == 1:
+            return lengths.pop()
+
+    return None
+
+
+def slice_rows(inputs: Any, start: int, stop: int) -> Any:
+    """Returns the rows [start, stop) of a prediction input
+
+    Parameters
+    ----------
+    inputs : Any
+        prediction input accepted by `count_rows`
+    start : int
+        first row
+    stop : int
+        row after the last row
+
+    Returns
+    -------
+    Any
+        rows of the input, of the same type as the input
+    """
+    if isinstance(inputs, pd.DataFrame):
+        return inputs.iloc[start:stop]
+
+    if isinstance(inputs, dict):
+        return {key: column[start:stop] for key, column in inputs.items()}
+
+    return inputs[start:stop]
+
+
+def estimate_row_size(inputs: Any) -> int:
+    """Estimates the JSON size of a row of a prediction input in bytes
+
+    Parameters
+    ----------
+    inputs : Any
+        prediction input accepted by `count_rows`
+
+    Returns
+    -------
+    int
+        average size of a row in bytes
+    """
+    n_rows = count_rows(inputs)
+    sample_rows = min(n_rows, ROW_SIZE_SAMPLE)
+
+    if sample_rows == 0:
+        return 1
+
+    sample = slice_rows(inputs, 0, sample_rows)
+
+    if isinstance(sample, pd.DataFrame):
+        encoded = sample.to_json(orient="values")
+    elif isinstance(sample, np.ndarray):
+        encoded = json.dumps(sample.tolist(), default=str)
+    elif isinstance(sample, dict):
+        encoded = json.dumps(
+            {key: list(np.asarray(column).tolist()) for key, column in sample.items()},
+            default=str,
+        )
+    else:
+        encoded = json.dumps(sample, default=str)
+
+    return max(1, len(encoded) // sample_rows)
+
+
+def get_chunk_bounds(
+    inputs: Any,
+    chunk_rows: Optional[int] = None,
+    chunk_bytes: Optional[int] = None,
+) -> List[Tuple[int, int]]:
+    """Splits a prediction input into [start, stop) row ranges that satisfy both
+    the row and the byte limit
+
+    Parameters
+    ----------
+    inputs : Any
+        prediction input
+    chunk_rows : Optional[int], optional
+        maximum number of rows per chunk, by default None
+    chunk_bytes : Optional[int], optional
+        approximate maximum JSON size of a chunk in bytes, by default None
+
+    Returns
+    -------
+    List[Tuple[int, int]]
+        row range of each chunk
+    """
+    n_rows = count_rows(inputs)
+
+    if n_rows is None:
+        raise MlflowException(
+            f"Inputs of type {type(inputs).__name__} can't be split into chunks"
+        )
+
+    rows_per_chunk = n_rows
+
+    if chunk_rows is not None:
+        rows_per_chunk = min(rows_per_chunk, chunk_rows)
+
+    if chunk_bytes is not None:
+        rows_per_chunk = min(rows_per_chunk, chunk_bytes // estimate_row_size(inputs))
+
+    rows_per_chunk = max(1, rows_per_chunk)
+
+    return [
+        (start, min(start + rows_per_chunk, n_rows))
+        for start in range(0, n_rows, rows_per_chunk)
+    ]
+
+
+def merge_predictions(results: List[Any]) -> Any:
+    """Merges the decoded predictions of consecutive chunks into the shape a single
+    prediction on the whole input returns
+
+    Parameters
+    ----------
+    results : List[Any]
+        decoded predictions of each chunk, in row order
+
+    Returns
+    -------
+    Any
+        merged predictions
+    """
+    if all(isinstance(result, pd.DataFrame) for result in results):
+        return pd.concat(results, ignore_index=True)
+
+    if all(isinstance(result, np.ndarray) for result in results):
+        return np.concatenate(results)
+
+    if all(type(result).__name__ == "Table" for result in results):
+        import pyarrow as pa
+
+        return pa.concat_tables(results)
+
+    merged: List = []
+
+    for result in results:
+        if len(merged) == 0:
+            merged = [
+                dict(prediction) if isinstance(prediction, dict) else prediction
+                for prediction in result
+            ]
+            continue
+
+        if (
+            len(merged) == len(result)
+            and all(
+                isinstance(prediction, dict) and "values" in prediction
+                for prediction in merged + list(result)
+            )
+        ):
+            # one prediction object per `input_data` entry, concatenate their values
+            for prediction, chunk_prediction in zip(merged, result):
+                prediction["values"] = list(prediction["values"]) + list(
+                    chunk_prediction["values"]
+                )
+        else:
+            merged.extend(result)
+
+    return merged
+
+
+def score_in_chunks(
+    score: Callable[[Any], Union[pd.DataFrame, List]],
+    inputs: Any,
+    chunk_rows: Optional[int] = None,
+    chunk_bytes: Optional[int] = None,
+    max_workers: int = 4,
+) -> Union[pd.DataFrame, List]:
+    """Scores a prediction input chunk by chunk on a thread pool and merges the
+    predictions back in row order
+
+    Parameters
+    ----------
+    score : Callable[[Any], Union[pd.DataFrame, List]]
+        scores a chunk and returns its decoded predictions
+    inputs : Any
+        prediction input
+    chunk_rows : Optional[int], optional
+        maximum number of rows per chunk, by default None
+    chunk_bytes : Optional[int], optional
+        approximate maximum JSON size of a chunk in bytes, by default None
+    max_workers : int, optional
+        maximum number of chunks scored concurrently, by default 4
+
+    Returns
+    -------
+    Union[pd.DataFrame, List]
+        merged predictions
+
+    Raises
+    ------
+    ChunkedScoringError
+        if any chunk fails, after all chunks have been attempted
+    """
+    bounds = get_chunk_bounds(inputs, chunk_rows=chunk_rows, chunk_bytes=chunk_bytes)
+
+    if len(bounds) <= 1:
+        return score(inputs)
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(bounds))) as pool:
+        futures = [
+            pool.submit(score, slice_rows(inputs, start, stop))
+            for start, stop in bounds
+        ]
+
+    results = []
+    errors = {}
+
+    for bound, future in zip(bounds, futures):
+        try:
+            results.append(future.result())
+        except Exception as e:
+            errors[bound] = e
+
+    if errors:
+        raise ChunkedScoringError(errors)
+
+    return merge_predictions(results)
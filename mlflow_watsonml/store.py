@@ -1,11 +1,33 @@
+import base64
+import hashlib
+import inspect
+import io
 import logging
 import os
+import tarfile
+import tempfile
+import time
 from types import FunctionType
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import mlflow
+import numpy as np
+import pandas as pd
 from ibm_watson_machine_learning.client import APIClient
 from mlflow.exceptions import MlflowException
+from mlflow.models import Model, ModelSignature
+from mlflow.protos.databricks_pb2 import INVALID_PARAMETER_VALUE
+from mlflow.utils.uri import append_to_uri_path
+
+from mlflow_watsonml import artifact_cache
+from mlflow_watsonml.utils import (
+    DEFAULT_ARTIFACT_BUNDLE_MAX_BYTES,
+    get_artifact_packaging,
+    get_config_flag,
+    get_native_model_type,
+    get_onnx_session_options,
+    get_options_hash,
+)
 
 LOGGER = logging.getLogger(__name__)
 
@@ -25,7 +47,7 @@ def store_or_update_model(
     client : APIClient
         WML client
     model_object : Any
-        model object
+        model object, or path of a model archive uploaded as a stream
     model_name : str
         name of the model
     model_type : str
@@ -97,6 +119,7 @@ def store_or_update_function(
     function_name: str,
     software_spec_uid: str,
     function_id: Optional[str] = None,
+    custom: Optional[Dict] = None,
 ) -> Tuple[str, str]:
     """Store or update a python function in WML repository
 
@@ -113,6 +136,8 @@ def store_or_update_function(
     function_id: str, optional
         asset id of the function to be updated
         by default None
+    custom : Optional[Dict], optional
+        custom metadata of the function, by default None
 
     Returns
     -------
@@ -125,6 +150,8 @@ def store_or_update_function(
                 client.repository.FunctionMetaNames.NAME: function_name,
                 client.repository.FunctionMetaNames.SOFTWARE_SPEC_ID: software_spec_uid,
             }
+            if custom is not None:
+                metaprops[client.repository.FunctionMetaNames.CUSTOM] = custom
             function_details = client.repository.store_function(
                 function=deployable_function,
                 meta_props=metaprops,
@@ -139,6 +166,8 @@ def store_or_update_function(
             metaprops = {
                 client.repository.FunctionMetaNames.NAME: function_name,
             }
+            if custom is not None:
+                metaprops[client.repository.FunctionMetaNames.CUSTOM] = custom
             function_details = client.repository.update_function(
                 function_uid=function_id,
                 changes=metaprops,
@@ -166,14 +195,270 @@ def store_or_update_function(
     return (function_id, rev_id)
 
 
+def get_scorer_environment(environment_variables: Optional[Dict]) -> Dict:
+    """Returns the environment variables embedded in a scorer. Its arguments are
+    serialized as default values by the WML client, which can't be None.
+
+    Parameters
+    ----------
+    environment_variables : Optional[Dict]
+        environment variables, e.g. the MLflow artifact store configuration
+
+    Returns
+    -------
+    Dict
+        environment variables without the unset ones
+    """
+    return {
+        key: val
+        for key, val in (environment_variables or {}).items()
+        if val is not None
+    }
+
+
+def get_model_checksum(model_uri: str) -> str:
+    """Returns a checksum of a logged model. The `MLmodel` file records the uuid
+    and the creation time of a model, so its digest identifies the model content.
+
+    Parameters
+    ----------
+    model_uri : str
+        model URI
+
+    Returns
+    -------
+    str
+        sha256 hex digest of the `MLmodel` file
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        mlmodel_file = mlflow.artifacts.download_artifacts(
+            artifact_uri=append_to_uri_path(model_uri, "MLmodel"), dst_path=tmp_dir
+        )
+
+        with open(mlmodel_file, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+
+def bundle_model(model_path: str) -> str:
+    """Packs a local model directory for embedding in a scorer
+
+    Parameters
+    ----------
+    model_path : str
+        local model directory
+
+    Returns
+    -------
+    str
+        base64 encoded gzipped tarball of the directory, with the directory
+        at its root as "model"
+    """
+    buffer = io.BytesIO()
+
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+        tar.add(model_path, arcname="model")
+
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def get_model_size(model_uri: str) -> Optional[int]:
+    """Returns the total size of the files of a logged model from the MLflow
+    artifact store listing, without downloading it
+
+    Parameters
+    ----------
+    model_uri : str
+        model URI
+
+    Returns
+    -------
+    Optional[int]
+        size in bytes, None if the artifact store doesn't report it
+    """
+    model_size = 0
+    artifact_uris = [model_uri]
+
+    try:
+        while len(artifact_uris) > 0:
+            artifact_uri = artifact_uris.pop()
+
+            for file_info in mlflow.artifacts.list_artifacts(artifact_uri=artifact_uri):
+                if file_info.is_dir:
+                    artifact_uris.append(
+                        f"{artifact_uri.rstrip('/')}/{os.path.basename(file_info.path)}"
+                    )
+                elif file_info.file_size is None:
+                    return None
+                else:
+                    model_size += file_info.file_size
+
+    except Exception as e:
+        LOGGER.warning(f"Could not list the artifacts of {model_uri}: {e}")
+        return None
+
+    return model_size
+
+
+def get_artifact_cache_args(
+    model_uri: str,
+    scorer_config: Dict,
+    model_path: Optional[str] = None,
+    checksum: Optional[str] = None,
+) -> Dict:
+    """Returns the `artifact_cache` argument of the scorers. The source of the
+    `artifact_cache` module is embedded since the scorers are serialized from their
+    own source.
+
+    Parameters
+    ----------
+    model_uri : str
+        model URI
+    scorer_config : Dict
+        deployment configuration. The scorers read -
+        - "artifact_cache_dir" : directory of the artifact cache on the WML runtime
+          (Default: `mlflow_watsonml_artifacts` in its temporary directory)
+        - "artifact_cache_max_bytes" : maximum total size of the cached artifacts,
+          0 for unbounded (Default: 0)
+        - "artifact_packaging" : "download" to download the model from the MLflow
+          artifact store when the scorer starts, "bundle" to embed the model in the
+          scorer, or "auto" (Default) to bundle models up to
+          "artifact_bundle_max_bytes" (Default: 32MiB)
+    model_path : Optional[str], optional
+        local copy of the model, by default the model is downloaded if it may be
+        bundled
+    checksum : Optional[str], optional
+        checksum of the model content, by default the one of the logged model
+
+    Returns
+    -------
+    Dict
+        "source", "checksum", "dir" and "max_bytes" of the artifact cache, and the
+        "bundle" of the model or "" if the scorer downloads it
+    """
+    artifact_packaging = get_artifact_packaging(scorer_config)
+    bundle_max_bytes = int(
+        scorer_config.get(
+            "artifact_bundle_max_bytes", DEFAULT_ARTIFACT_BUNDLE_MAX_BYTES
+        )
+    )
+
+    bundle = ""
+
+    if artifact_packaging == "auto" and model_path is None:
+        # the listed file sizes avoid downloading a model too large to be bundled
+        model_size = get_model_size(model_uri=model_uri)
+
+        if model_size is not None and model_size > bundle_max_bytes:
+            LOGGER.info(f"Not bundling model {model_uri} ({model_size} bytes)")
+            artifact_packaging = "download"
+
+    if artifact_packaging != "download":
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            if model_path is None:
+                model_path = mlflow.artifacts.download_artifacts(
+                    artifact_uri=model_uri, dst_path=tmp_dir
+                )
+
+            model_size = artifact_cache.get_size(model_path)
+
+            if artifact_packaging == "bundle" or model_size <= bundle_max_bytes:
+                LOGGER.info(f"Bundling model {model_uri} ({model_size} bytes)")
+                bundle = bundle_model(model_path=model_path)
+
+    return {
+        "source": inspect.getsource(artifact_cache),
+        "checksum": checksum
+        if checksum is not None
+        else get_model_checksum(model_uri=model_uri),
+        "dir": str(scorer_config.get("artifact_cache_dir", "")),
+        "max_bytes": int(scorer_config.get("artifact_cache_max_bytes", 0)),
+        "bundle": bundle,
+    }
+
+
+def _describe_onnx_tensor(value_info: Any) -> Dict:
+    import onnx  # type: ignore
+
+    tensor_type = value_info.type.tensor_type
+    elem_type = onnx.TensorProto.DataType.Name(tensor_type.elem_type)
+
+    return {
+        "name": value_info.name,
+        # same type names as `onnxruntime.NodeArg.type`
+        "type": f"tensor({elem_type.lower()})",
+        # fixed dimensions are int, symbolic ones are str and unknown ones are ""
+        # (None isn't a valid default value of a scorer argument)
+        "shape": [
+            dim.dim_value if dim.HasField("dim_value") else dim.dim_param
+            for dim in tensor_type.shape.dim
+        ],
+    }
+
+
+def inspect_onnx_model(model_uri: str, model_path: Optional[str] = None) -> Dict:
+    """Validates an ONNX model and describes its graph
+
+    Parameters
+    ----------
+    model_uri : str
+        model URI
+    model_path : Optional[str], optional
+        local copy of the model, by default the model is downloaded
+
+    Returns
+    -------
+    Dict
+        "inputs" and "outputs" of the graph, each a list of dictionaries with the
+        "name", "type" and "shape" of a tensor
+    """
+    import onnx  # type: ignore
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if model_path is None:
+            model_path = mlflow.artifacts.download_artifacts(
+                artifact_uri=model_uri, dst_path=tmp_dir
+            )
+        model_file = os.path.join(model_path, "model.onnx")
+
+        try:
+            onnx.checker.check_model(model_file)
+        except Exception as e:
+            raise MlflowException(
+                f"Invalid ONNX model {model_uri}: {e}",
+                error_code=INVALID_PARAMETER_VALUE,
+            ) from e
+
+        # the graph is described without loading the external tensor data
+        model = onnx.load(model_file, load_external_data=False)
+
+    initializers = {initializer.name for initializer in model.graph.initializer}
+
+    return {
+        "inputs": [
+            _describe_onnx_tensor(value_info)
+            for value_info in model.graph.input
+            if value_info.name not in initializers
+        ],
+        "outputs": [
+            _describe_onnx_tensor(value_info) for value_info in model.graph.output
+        ],
+    }
+
+
 def store_onnx_artifact(
     client: APIClient,
     model_uri: str,
     artifact_name: str,
     software_spec_id: str,
     artifact_id: Optional[str] = None,
+    environment_variables: Optional[Dict] = None,
+    scorer_config: Optional[Dict] = None,
+    model_path: Optional[str] = None,
+    custom: Optional[Dict] = None,
 ) -> Tuple[str, str]:
-    """store onnx artifact in WML
+    """store onnx artifact in WML. The model is validated and its graph is
+    described once here, the description is stored as the `custom` metadata of the
+    function and used by the scorer.
 
     Parameters
     ----------
@@ -187,44 +472,277 @@ def store_onnx_artifact(
         id of software specification
     artifact_id : Optional[str], optional
         artifact id of the stored model, by default None
+    environment_variables : Optional[Dict], optional
+        environment variables set when the scorer is initialized, by default None
+    scorer_config : Optional[Dict], optional
+        deployment configuration. The scorer reads -
+        - "onnx_max_batch_size" : maximum number of rows of the `input_data` entries
+          stacked into a single `InferenceSession.run` call (Default: 1024)
+        - "onnx_session_options" : onnxruntime session options -
+          "intra_op_num_threads", "inter_op_num_threads", "graph_optimization_level"
+          (one of "disable", "basic", "extended", "all") and "execution_mode"
+          ("sequential" or "parallel"). The optimized graph is saved next to the
+          downloaded model and reused by later cold starts.
+        - "onnx_validate_model" : also run `onnx.checker.check_model` in the scorer
+          on the downloaded model before creating the session (Default: False)
+        - "artifact_cache_dir", "artifact_cache_max_bytes", "artifact_packaging" and
+          "artifact_bundle_max_bytes" : see `get_artifact_cache_args`
+    model_path : Optional[str], optional
+        local directory of a `model.onnx` that isn't in the MLflow artifact store,
+        e.g. a converted model. It is always bundled in the scorer,
+        by default the model at `model_uri` is deployed
+    custom : Optional[Dict], optional
+        additional `custom` metadata of the function, by default None
 
     Returns
     -------
     Tuple[str, str]
         model id, revision id
     """
+    if scorer_config is None:
+        scorer_config = dict()
+
+    if custom is None:
+        custom = dict()
+
+    environment_variables = get_scorer_environment(environment_variables)
+
+    max_batch_size = int(scorer_config.get("onnx_max_batch_size", 1024))
+    session_options = get_onnx_session_options(scorer_config)
+    validate_model = get_config_flag(scorer_config, "onnx_validate_model", False)
+    if model_path is not None:
+        graph_metadata = inspect_onnx_model(model_uri=model_uri, model_path=model_path)
+
+        # the scorer can't download a model that isn't in the artifact store
+        with open(os.path.join(model_path, "model.onnx"), "rb") as f:
+            cache_args = get_artifact_cache_args(
+                model_uri=model_uri,
+                scorer_config={**scorer_config, "artifact_packaging": "bundle"},
+                model_path=model_path,
+                checksum=hashlib.sha256(f.read()).hexdigest(),
+            )
+    else:
+        # the model is downloaded once to validate and possibly bundle it
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            model_path = mlflow.artifacts.download_artifacts(
+                artifact_uri=model_uri, dst_path=tmp_dir
+            )
+            graph_metadata = inspect_onnx_model(
+                model_uri=model_uri, model_path=model_path
+            )
+            cache_args = get_artifact_cache_args(
+                model_uri=model_uri, scorer_config=scorer_config, model_path=model_path
+            )
+    optimized_model_name = f"model.{get_options_hash(session_options)}.optimized.onnx"
 
     # the args have to be passed as default value in the scorer
-    def deployable_onnx_scorer(artifact_uri=model_uri):
+    def deployable_onnx_scorer(
+        artifact_uri=model_uri,
+        config=environment_variables,
+        max_batch_size=max_batch_size,
+        session_options=session_options,
+        optimized_model_name=optimized_model_name,
+        validate_model=validate_model,
+        graph_metadata=graph_metadata,
+        artifact_cache=cache_args,
+    ):
         import os
-        import tempfile
+        import threading
+
+        import numpy as np
+        from onnxruntime import (  # type: ignore
+            ExecutionMode,
+            GraphOptimizationLevel,
+            InferenceSession,
+            SessionOptions,
+        )
 
-        import mlflow
-        import onnx  # type: ignore
-        from onnxruntime import InferenceSession  # type: ignore
+        # numpy dtypes of the onnx tensor element types
+        tensor_dtypes = {
+            "tensor(float)": np.float32,
+            "tensor(double)": np.float64,
+            "tensor(float16)": np.float16,
+            "tensor(int64)": np.int64,
+            "tensor(int32)": np.int32,
+            "tensor(int16)": np.int16,
+            "tensor(int8)": np.int8,
+            "tensor(uint64)": np.uint64,
+            "tensor(uint32)": np.uint32,
+            "tensor(uint16)": np.uint16,
+            "tensor(uint8)": np.uint8,
+            "tensor(bool)": np.bool_,
+            "tensor(string)": np.object_,
+        }
 
-        def score(payload: dict):
-            artifact_dir = os.path.join(tempfile.gettempdir(), "artifacts")
+        # the helpers shared by the scorers are loaded from their source
+        cache_module = {}
+        exec(artifact_cache["source"], cache_module)
+        cache_module["export_environment"](config)
 
-            # `download_artifacts` returns the local path if it's already been downloaded
-            artifact_file = mlflow.artifacts.download_artifacts(
-                artifact_uri=artifact_uri, dst_path=artifact_dir
+        # the model is loaded on the first request and shared by all later requests
+        state = {}
+        lock = threading.Lock()
+
+        def create_session(model_file, optimized_model_file):
+            options = SessionOptions()
+
+            for key in ("intra_op_num_threads", "inter_op_num_threads"):
+                if key in session_options:
+                    setattr(options, key, session_options[key])
+
+            if "execution_mode" in session_options:
+                options.execution_mode = getattr(
+                    ExecutionMode, session_options["execution_mode"]
+                )
+
+            optimization_level = session_options.get(
+                "graph_optimization_level", "ORT_ENABLE_ALL"
             )
-            model_file = os.path.join(artifact_file, "model.onnx")
-            onnx.checker.check_model(model_file)  # type: ignore
-            model = onnx.load(model_file)
-            input_name = model.graph.input[0].name
 
-            scoring_output = {"predictions": []}
+            if os.path.exists(optimized_model_file):
+                # the graph has been optimized by an earlier cold start
+                options.graph_optimization_level = getattr(
+                    GraphOptimizationLevel, "ORT_DISABLE_ALL"
+                )
+                return InferenceSession(optimized_model_file, sess_options=options)
+
+            options.graph_optimization_level = getattr(
+                GraphOptimizationLevel, optimization_level
+            )
+
+            # the session is created from the file so that the model isn't copied
+            # through a python protobuf, and external data is resolved relative to it
+            if optimization_level == "ORT_DISABLE_ALL":
+                return InferenceSession(model_file, sess_options=options)
+
+            # write to a temporary file and rename so that concurrent workers never
+            # read a partially written graph. Large initializers are kept in an
+            # external data file so that graphs over 2GB can be saved.
+            tmp_file = f"{optimized_model_file}.{os.getpid()}.tmp"
+            options.optimized_model_filepath = tmp_file
+            options.add_session_config_entry(
+                "session.optimized_model_external_initializers_file_name",
+                f"{os.path.basename(optimized_model_file)}.{os.getpid()}.data",
+            )
+            sess = InferenceSession(model_file, sess_options=options)
+
+            try:
+                os.replace(tmp_file, optimized_model_file)
+            except OSError as _:
+                pass
+
+            return sess
+
+        def load():
+            if "session" not in state:
+                with lock:
+                    if "session" not in state:
+                        # the model is downloaded once per host into the cache
+                        with cache_module["load_artifact"](
+                            cache_args=artifact_cache, uri=artifact_uri
+                        ) as artifact_file:
+                            model_file = os.path.join(artifact_file, "model.onnx")
+
+                            if validate_model:
+                                import onnx  # type: ignore
+
+                                # checking the path doesn't keep the protobuf in memory
+                                onnx.checker.check_model(model_file)  # type: ignore
+
+                            sess = create_session(
+                                model_file=model_file,
+                                optimized_model_file=os.path.join(
+                                    artifact_file, optimized_model_name
+                                ),
+                            )
+                            graph_input = graph_metadata["inputs"][0]
+
+                            state["input_name"] = graph_input["name"]
+                            state["input_dtype"] = tensor_dtypes.get(
+                                graph_input["type"]
+                            )
+                            # entries can only be stacked along a dynamic batch
+                            # dimension
+                            shape = graph_input["shape"]
+                            state["batchable"] = len(shape) > 0 and not (
+                                isinstance(shape[0], int)
+                            )
+                            state["session"] = sess
+
+            return state
+
+        def run_entry(model, array):
+            if not (model["batchable"] and array.ndim > 0) or (
+                len(array) <= max_batch_size
+            ):
+                return model["session"].run(None, {model["input_name"]: array})[0]
+
+            # an entry over `max_batch_size` rows is run in slices of that size
+            slices = [
+                array[start : start + max_batch_size]
+                for start in range(0, len(array), max_batch_size)
+            ]
+            outputs = [
+                model["session"].run(None, {model["input_name"]: rows})[0]
+                for rows in slices
+            ]
+
+            if any(
+                output.ndim == 0 or output.shape[0] != len(rows)
+                for output, rows in zip(outputs, slices)
+            ):
+                # the output isn't aligned with the rows, run the entry at once
+                return model["session"].run(None, {model["input_name"]: array})[0]
+
+            return np.concatenate(outputs)
+
+        def run_batch(model, arrays):
+            if len(arrays) == 1:
+                return [run_entry(model, arrays[0])]
+
+            batch = np.concatenate(arrays)
+            predictions = model["session"].run(None, {model["input_name"]: batch})[0]
 
-            sess = InferenceSession(model.SerializeToString())
+            if predictions.ndim == 0 or predictions.shape[0] != batch.shape[0]:
+                # the output isn't aligned with the batch rows, run entries one by one
+                return [run_entry(model, array) for array in arrays]
 
-            for data in payload["input_data"]:
-                values = data.get("values")
-                # fields = data.get("fields")
-                predictions = sess.run(None, {input_name: values})[0]
+            return np.split(predictions, np.cumsum([len(a) for a in arrays])[:-1])
 
-                scoring_output["predictions"].append({"values": predictions.tolist()})
+        def score(payload: dict):
+            model = load()
+
+            # fields = data.get("fields")
+            arrays = [
+                np.ascontiguousarray(data.get("values"), dtype=model["input_dtype"])
+                for data in payload["input_data"]
+            ]
+
+            # group consecutive entries with the same row shape into batches of at
+            # most `max_batch_size` rows and run each batch once
+            batches = []
+            for array in arrays:
+                batch = batches[-1] if len(batches) > 0 else None
+
+                if (
+                    batch is not None
+                    and model["batchable"]
+                    and array.ndim > 0
+                    and batch[0].ndim > 0
+                    and array.shape[1:] == batch[0].shape[1:]
+                    and sum(len(a) for a in batch) + len(array) <= max_batch_size
+                ):
+                    batch.append(array)
+                else:
+                    batches.append([array])
+
+            scoring_output = {"predictions": []}
+
+            for batch in batches:
+                for predictions in run_batch(model, batch):
+                    scoring_output["predictions"].append(
+                        {"values": predictions.tolist()}
+                    )
 
             return scoring_output
 
@@ -236,19 +754,162 @@ def store_onnx_artifact(
         function_name=artifact_name,
         software_spec_uid=software_spec_id,
         function_id=artifact_id,
+        custom={**custom, "onnx_graph": graph_metadata},
     )
 
     return (function_id, rev_id)
 
 
+# keys of the library version in the MLflow flavor configurations
+FLAVOR_VERSION_KEYS = {
+    "sklearn": "sklearn_version",
+    "xgboost": "xgb_version",
+    "lightgbm": "lgb_version",
+    "tensorflow": "keras_version",
+    "pytorch": "pytorch_version",
+}
+# pip packages of the flavors, to read the version of models that don't record it
+FLAVOR_PACKAGES = {
+    "sklearn": "scikit-learn",
+    "xgboost": "xgboost",
+    "lightgbm": "lightgbm",
+    "tensorflow": "tensorflow",
+    "pytorch": "torch",
+}
+
+
+def get_logged_library_version(
+    model_uri: str, flavor: str, model_path: Optional[str] = None
+) -> Optional[str]:
+    """Returns the version of the library a model was logged with, from its flavor
+    configuration or else from its pip requirements
+
+    Parameters
+    ----------
+    model_uri : str
+        model URI
+    flavor : str
+        flavor of the model, one of `FLAVOR_VERSION_KEYS`
+    model_path : Optional[str], optional
+        local copy of the model, by default its files are downloaded
+
+    Returns
+    -------
+    Optional[str]
+        library version, None if the model doesn't record it
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+
+        def get_file(file_name):
+            if model_path is not None:
+                return os.path.join(model_path, file_name)
+
+            return mlflow.artifacts.download_artifacts(
+                artifact_uri=append_to_uri_path(model_uri, file_name),
+                dst_path=tmp_dir,
+            )
+
+        flavor_conf = Model.load(get_file("MLmodel")).flavors.get(flavor, {})
+
+        if FLAVOR_VERSION_KEYS[flavor] in flavor_conf:
+            return str(flavor_conf[FLAVOR_VERSION_KEYS[flavor]])
+
+        try:
+            with open(get_file("requirements.txt"), "r", encoding="utf-8") as f:
+                requirements = f.readlines()
+        except Exception as _:
+            return None
+
+    for requirement in requirements:
+        name, pinned, version = requirement.split("#")[0].partition("==")
+
+        if pinned and name.split("[")[0].strip().lower() == FLAVOR_PACKAGES[flavor]:
+            return version.strip()
+
+    return None
+
+
+def archive_model(path: str, archive: str, arcname: Optional[str] = None) -> str:
+    """Packages a model file or the content of a model directory as a WML model
+    archive. The files are copied in chunks into the archive, which the WML client
+    uploads as a stream.
+
+    Parameters
+    ----------
+    path : str
+        model file or directory
+    archive : str
+        path of the tar.gz archive
+    arcname : Optional[str], optional
+        name of a model file in the archive, by default its file name
+
+    Returns
+    -------
+    str
+        path of the archive
+    """
+    with tarfile.open(archive, mode="w:gz") as tar:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                tar.add(os.path.join(path, name), arcname=name)
+        else:
+            tar.add(path, arcname=arcname or os.path.basename(path))
+
+    return archive
+
+
+# serialization formats of the MLflow sklearn flavor that WML can load as they are
+STREAMABLE_SKLEARN_FORMATS = ("pickle", "cloudpickle")
+
+
+def package_sklearn_model(model_path: str, dst_path: str) -> Optional[str]:
+    """Packages the pickled model of a local MLflow sklearn model as a WML model
+    archive, without deserializing it
+
+    Parameters
+    ----------
+    model_path : str
+        local MLflow model directory
+    dst_path : str
+        directory of the archive
+
+    Returns
+    -------
+    Optional[str]
+        path of the tar.gz archive, or None if the model isn't serialized in a
+        format WML can load
+    """
+    flavor_conf = Model.load(os.path.join(model_path, "MLmodel")).flavors.get(
+        "sklearn", {}
+    )
+
+    if (
+        flavor_conf.get("serialization_format", "pickle")
+        not in STREAMABLE_SKLEARN_FORMATS
+        or "pickled_model" not in flavor_conf
+    ):
+        return None
+
+    return archive_model(
+        path=os.path.join(model_path, flavor_conf["pickled_model"]),
+        archive=os.path.join(dst_path, "scikit_model.tar.gz"),
+        arcname="scikit_model.pkl",
+    )
+
+
 def store_sklearn_artifact(
     client: APIClient,
     model_uri: str,
     artifact_name: str,
     software_spec_id: str,
     artifact_id: Optional[str] = None,
+    scorer_config: Optional[Dict] = None,
 ) -> Tuple[str, str]:
-    """store sklearn artifact in WML
+    """store sklearn artifact in WML. The pickled model is uploaded as it is,
+    unless it is serialized in a format WML can't load or "sklearn_repickle" is set
+    in `scorer_config`, in which case the model is loaded and the WML client
+    pickles it again. The model type is the one of the WML runtime matching the
+    logged scikit-learn version, see `get_native_model_type`.
 
     Parameters
     ----------
@@ -262,22 +923,663 @@ def store_sklearn_artifact(
         id of software specification
     artifact_id : Optional[str], optional
         artifact id of the stored model, by default None
+    scorer_config : Optional[Dict], optional
+        deployment configuration, by default None
 
     Returns
     -------
     Tuple[str, str]
         model id, revision id
     """
-    model_object = mlflow.sklearn.load_model(model_uri=model_uri)
-    model_id, rev_id = store_or_update_model(
-        client=client,
-        model_object=model_object,
-        model_name=artifact_name,
-        model_type="scikit-learn_1.1",
-        software_spec_uid=software_spec_id,
-        model_id=artifact_id,
+    if scorer_config is None:
+        scorer_config = dict()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_object = None
+        model_path = None
+
+        if not get_config_flag(scorer_config, "sklearn_repickle", False):
+            model_path = mlflow.artifacts.download_artifacts(
+                artifact_uri=model_uri, dst_path=os.path.join(tmp_dir, "model")
+            )
+            model_object = package_sklearn_model(
+                model_path=model_path, dst_path=tmp_dir
+            )
+
+        if model_object is None:
+            LOGGER.info(f"Loading model {model_uri} to store it in the repository")
+            model_object = mlflow.sklearn.load_model(model_uri=model_uri)
+
+        model_type, _ = get_native_model_type(
+            flavor="sklearn",
+            version=get_logged_library_version(
+                model_uri=model_uri, flavor="sklearn", model_path=model_path
+            ),
+            config=scorer_config,
+        )
+
+        model_id, rev_id = store_or_update_model(
+            client=client,
+            model_object=model_object,
+            model_name=artifact_name,
+            model_type=model_type,
+            software_spec_uid=software_spec_id,
+            model_id=artifact_id,
+        )
+
+    return (model_id, rev_id)
+
+
+# skl2onnx tensor types of the numpy dtypes of a model signature, also the dtypes
+# a model with a single input tensor can be converted to ONNX with
+SKL2ONNX_TENSOR_TYPES = {
+    "float32": "FloatTensorType",
+    "float64": "DoubleTensorType",
+    "int32": "Int32TensorType",
+    "int64": "Int64TensorType",
+    "bool": "BooleanTensorType",
+    "object": "StringTensorType",
+}
+
+
+def get_onnx_input(
+    signature: Optional[ModelSignature],
+) -> Tuple[str, List[Optional[int]], List[str]]:
+    """Describes the single input tensor of the ONNX graph of a converted model from
+    its signature
+
+    Parameters
+    ----------
+    signature : Optional[ModelSignature]
+        signature of the model
+
+    Returns
+    -------
+    Tuple[str, List[Optional[int]], List[str]]
+        numpy dtype name, shape with None for the dynamic dimensions, and column
+        names of a column based signature else []
+    """
+    if signature is None or signature.inputs is None:
+        raise MlflowException(
+            "Converting a model to ONNX requires a model signature",
+            error_code=INVALID_PARAMETER_VALUE,
+        )
+
+    dtypes = {dtype.name for dtype in signature.inputs.numpy_types()}
+
+    if len(dtypes) != 1 or not dtypes <= set(SKL2ONNX_TENSOR_TYPES):
+        raise MlflowException(
+            "Converting a model to ONNX requires inputs of a single type "
+            f"among {list(SKL2ONNX_TENSOR_TYPES)}, got {sorted(dtypes)}",
+            error_code=INVALID_PARAMETER_VALUE,
+        )
+
+    dtype = dtypes.pop()
+
+    if signature.inputs.is_tensor_spec():
+        if len(signature.inputs.inputs) != 1:
+            raise MlflowException(
+                "Converting a model to ONNX requires a single input tensor",
+                error_code=INVALID_PARAMETER_VALUE,
+            )
+
+        shape = [None if dim == -1 else dim for dim in signature.inputs.inputs[0].shape]
+
+        return (dtype, shape, [])
+
+    columns = (
+        signature.inputs.input_names() if signature.inputs.has_input_names() else []
+    )
+
+    return (dtype, [None, len(signature.inputs.inputs)], columns)
+
+
+def get_onnx_sample(
+    model_path: str, dtype: str, shape: List[Optional[int]], rows: int
+) -> np.ndarray:
+    """Returns the sample an ONNX conversion is traced or checked on: the input
+    example of the model if it was logged with one, else random values drawn from a
+    fixed seed
+
+    Parameters
+    ----------
+    model_path : str
+        local MLflow model directory
+    dtype : str
+        numpy dtype name of the input
+    shape : List[Optional[int]]
+        shape of the input, with None for the dynamic dimensions
+    rows : int
+        number of rows of a random sample
+
+    Returns
+    -------
+    np.ndarray
+        sample input
+    """
+    input_example = Model.load(os.path.join(model_path, "MLmodel")).load_input_example(
+        model_path
+    )
+
+    if isinstance(input_example, (pd.DataFrame, np.ndarray)):
+        return np.asarray(input_example).astype(dtype)
+
+    if dtype == "object" or None in shape[1:]:
+        raise MlflowException(
+            "Converting a model with string or variable size inputs to ONNX "
+            "requires a model logged with an input example",
+            error_code=INVALID_PARAMETER_VALUE,
+        )
+
+    rng = np.random.default_rng(seed=0)
+    size = [rows, *shape[1:]]
+
+    if dtype == "bool":
+        return rng.random(size=size) < 0.5
+
+    if dtype.startswith("int"):
+        return rng.integers(0, 10, size=size).astype(dtype)
+
+    return rng.standard_normal(size=size).astype(dtype)
+
+
+def check_sklearn_onnx_parity(
+    expected: np.ndarray, actual: np.ndarray, rtol: float, atol: float
+) -> Dict:
+    """Compares the predictions of a sklearn model and of its ONNX conversion
+
+    Parameters
+    ----------
+    expected : np.ndarray
+        predictions of the sklearn model
+    actual : np.ndarray
+        first output of the ONNX graph
+    rtol : float
+        relative tolerance of numeric predictions
+    atol : float
+        absolute tolerance of numeric predictions
+
+    Returns
+    -------
+    Dict
+        "rows", "mismatched_rows", "max_abs_diff" (None for non numeric or
+        misshaped predictions), "rtol", "atol" and whether the check "passed"
+    """
+    expected = np.asarray(expected)
+    actual = np.asarray(actual)
+    rows = len(expected)
+    max_abs_diff = None
+
+    if actual.size != expected.size:
+        mismatched_rows = rows
+    else:
+        # regressors return a column where `predict` returns a vector
+        actual = actual.reshape(expected.shape)
+
+        if np.issubdtype(expected.dtype, np.number) and np.issubdtype(
+            actual.dtype, np.number
+        ):
+            close = np.isclose(
+                actual.astype(np.float64),
+                expected.astype(np.float64),
+                rtol=rtol,
+                atol=atol,
+            )
+            max_abs_diff = float(
+                np.max(
+                    np.abs(actual.astype(np.float64) - expected.astype(np.float64)),
+                    initial=0.0,
+                )
+            )
+        else:
+            close = actual.astype(str) == expected.astype(str)
+
+        mismatched_rows = int(np.sum(~close.reshape(rows, -1).all(axis=1)))
+
+    return {
+        "rows": rows,
+        "mismatched_rows": mismatched_rows,
+        "max_abs_diff": max_abs_diff,
+        "rtol": rtol,
+        "atol": atol,
+        "passed": mismatched_rows == 0,
+    }
+
+
+def get_median_latency_ms(predict: Callable[[], Any], runs: int) -> float:
+    """Times a prediction call after a warm up call
+
+    Parameters
+    ----------
+    predict : Callable[[], Any]
+        prediction call
+    runs : int
+        number of timed calls
+
+    Returns
+    -------
+    float
+        median latency in milliseconds
+    """
+    predict()
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        predict()
+        timings.append(time.perf_counter() - start)
+
+    return float(np.median(timings) * 1000)
+
+
+def convert_sklearn_model(
+    model_uri: str, model_path: str, dst_path: str, scorer_config: Dict
+) -> Dict:
+    """Converts a local MLflow sklearn model to ONNX with the input type of its
+    signature, checks the predictions of the conversion on a sample and compares
+    the latency of both models on it
+
+    Parameters
+    ----------
+    model_uri : str
+        model URI
+    model_path : str
+        local MLflow model directory
+    dst_path : str
+        directory the `model.onnx` file is written to
+    scorer_config : Dict
+        deployment configuration. The conversion reads -
+        - "sklearn_onnx_target_opset" : ONNX opset of the converted model
+          (Default: the latest one supported by skl2onnx)
+        - "sklearn_onnx_sample_rows" : number of rows of the random sample, used if
+          the model was logged without an input example (Default: 100)
+        - "sklearn_onnx_rtol", "sklearn_onnx_atol" : tolerances of the parity check
+          on numeric predictions (Default: 1e-4 and 1e-4)
+        - "sklearn_onnx_benchmark_runs" : number of timed predictions of each model
+          (Default: 20)
+
+    Returns
+    -------
+    Dict
+        "parity" report, see `check_sklearn_onnx_parity`, and "latency" report with
+        the median "sklearn_ms" and "onnx_ms" of a prediction on the sample of
+        "rows" over "runs" calls and the "speedup" of the ONNX model
+    """
+    try:
+        import onnxruntime  # type: ignore
+        from skl2onnx import convert_sklearn  # type: ignore
+        from skl2onnx.common import data_types  # type: ignore
+    except ImportError as e:
+        raise MlflowException(
+            "Converting a sklearn model to ONNX requires skl2onnx and onnxruntime. "
+            "Install them with `pip install mlflow-watsonml[onnx]`."
+        ) from e
+
+    dtype, shape, columns = get_onnx_input(
+        Model.load(os.path.join(model_path, "MLmodel")).signature
+    )
+    model = mlflow.sklearn.load_model(model_uri=model_path)
+    target_opset = scorer_config.get("sklearn_onnx_target_opset")
+
+    try:
+        onnx_model = convert_sklearn(
+            model,
+            initial_types=[
+                ("input", getattr(data_types, SKL2ONNX_TENSOR_TYPES[dtype])(shape))
+            ],
+            target_opset=int(target_opset) if target_opset is not None else None,
+            # classifiers return the labels as their first output, like `predict`
+            options={"zipmap": False},
+        )
+    except Exception as e:
+        raise MlflowException(
+            f"Failed to convert sklearn model {model_uri} to ONNX: {e}",
+            error_code=INVALID_PARAMETER_VALUE,
+        ) from e
+
+    model_file = os.path.join(dst_path, "model.onnx")
+    with open(model_file, "wb") as f:
+        f.write(onnx_model.SerializeToString())
+
+    sample = get_onnx_sample(
+        model_path=model_path,
+        dtype=dtype,
+        shape=shape,
+        rows=int(scorer_config.get("sklearn_onnx_sample_rows", 100)),
+    )
+    sklearn_input = pd.DataFrame(sample, columns=columns) if columns else sample
+    sess = onnxruntime.InferenceSession(
+        model_file, providers=["CPUExecutionProvider"]
+    )
+
+    def predict_sklearn():
+        return model.predict(sklearn_input)
+
+    def predict_onnx():
+        return sess.run(None, {"input": sample})[0]
+
+    parity = check_sklearn_onnx_parity(
+        expected=predict_sklearn(),
+        actual=predict_onnx(),
+        rtol=float(scorer_config.get("sklearn_onnx_rtol", 1e-4)),
+        atol=float(scorer_config.get("sklearn_onnx_atol", 1e-4)),
+    )
+
+    if not parity["passed"]:
+        raise MlflowException(
+            f"The ONNX conversion of sklearn model {model_uri} doesn't match its "
+            f"predictions: {parity}",
+            error_code=INVALID_PARAMETER_VALUE,
+        )
+
+    runs = int(scorer_config.get("sklearn_onnx_benchmark_runs", 20))
+    sklearn_ms = get_median_latency_ms(predict_sklearn, runs=runs)
+    onnx_ms = get_median_latency_ms(predict_onnx, runs=runs)
+
+    return {
+        "parity": parity,
+        "latency": {
+            "rows": len(sample),
+            "runs": runs,
+            "sklearn_ms": sklearn_ms,
+            "onnx_ms": onnx_ms,
+            "speedup": sklearn_ms / onnx_ms if onnx_ms > 0 else None,
+        },
+    }
+
+
+def store_sklearn_onnx_artifact(
+    client: APIClient,
+    model_uri: str,
+    artifact_name: str,
+    software_spec_id: str,
+    artifact_id: Optional[str] = None,
+    environment_variables: Optional[Dict] = None,
+    scorer_config: Optional[Dict] = None,
+) -> Tuple[str, str]:
+    """store a sklearn model converted to ONNX in WML. The converted model is
+    bundled in the ONNX scorer, see `store_onnx_artifact`, and the conversion report
+    of `convert_sklearn_model` is stored as the "sklearn_onnx" `custom` metadata of
+    the function.
+
+    Parameters
+    ----------
+    client : APIClient
+        WML client
+    model_uri : str
+        model URI
+    artifact_name : str
+        name of the artifact
+    software_spec_id : str
+        id of software specification
+    artifact_id : Optional[str], optional
+        artifact id of the stored model, by default None
+    environment_variables : Optional[Dict], optional
+        environment variables set when the scorer is initialized, by default None
+    scorer_config : Optional[Dict], optional
+        deployment configuration, see `convert_sklearn_model` and
+        `store_onnx_artifact`, by default None
+
+    Returns
+    -------
+    Tuple[str, str]
+        model id, revision id
+    """
+    if scorer_config is None:
+        scorer_config = dict()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = mlflow.artifacts.download_artifacts(
+            artifact_uri=model_uri, dst_path=os.path.join(tmp_dir, "model")
+        )
+        onnx_model_path = os.path.join(tmp_dir, "onnx_model")
+        os.makedirs(onnx_model_path)
+
+        report = convert_sklearn_model(
+            model_uri=model_uri,
+            model_path=model_path,
+            dst_path=onnx_model_path,
+            scorer_config=scorer_config,
+        )
+        LOGGER.info(f"Converted sklearn model {model_uri} to ONNX: {report}")
+
+        function_id, rev_id = store_onnx_artifact(
+            client=client,
+            model_uri=model_uri,
+            artifact_name=artifact_name,
+            software_spec_id=software_spec_id,
+            artifact_id=artifact_id,
+            environment_variables=environment_variables,
+            scorer_config=scorer_config,
+            model_path=onnx_model_path,
+            custom={"sklearn_onnx": report},
+        )
+
+    return (function_id, rev_id)
+
+
+def package_xgboost_model(model_path: str, dst_path: str, scorer_config: Dict) -> Any:
+    """Loads a local MLflow xgboost model, which the WML client serializes
+
+    Parameters
+    ----------
+    model_path : str
+        local MLflow model directory
+    dst_path : str
+        working directory
+    scorer_config : Dict
+        deployment configuration
+
+    Returns
+    -------
+    Any
+        `xgboost.Booster` or scikit-learn API estimator
+    """
+    import mlflow.xgboost
+
+    return mlflow.xgboost.load_model(model_uri=model_path)
+
+
+def package_lightgbm_model(model_path: str, dst_path: str, scorer_config: Dict) -> Any:
+    """Loads a local MLflow lightgbm model, which the WML client serializes. Only
+    scikit-learn API estimators can be stored natively.
+
+    Parameters
+    ----------
+    model_path : str
+        local MLflow model directory
+    dst_path : str
+        working directory
+    scorer_config : Dict
+        deployment configuration
+
+    Returns
+    -------
+    Any
+        scikit-learn API estimator
+    """
+    import mlflow.lightgbm
+
+    flavor_conf = Model.load(os.path.join(model_path, "MLmodel")).flavors["lightgbm"]
+
+    if not flavor_conf.get("model_class", "").startswith("lightgbm.sklearn."):
+        raise MlflowException(
+            f"LightGBM {flavor_conf.get('model_class')} models have no WML model "
+            "type, log a scikit-learn API estimator or deploy the model with the "
+            "python_function flavor",
+            error_code=INVALID_PARAMETER_VALUE,
+        )
+
+    return mlflow.lightgbm.load_model(model_uri=model_path)
+
+
+def package_tensorflow_model(
+    model_path: str, dst_path: str, scorer_config: Dict
+) -> str:
+    """Packages the SavedModel directory, or the Keras file, of a local MLflow
+    tensorflow model as a WML model archive
+
+    Parameters
+    ----------
+    model_path : str
+        local MLflow model directory
+    dst_path : str
+        directory of the archive
+    scorer_config : Dict
+        deployment configuration
+
+    Returns
+    -------
+    str
+        path of the tar.gz archive
+    """
+    flavor_conf = Model.load(os.path.join(model_path, "MLmodel")).flavors[
+        "tensorflow"
+    ]
+
+    if "saved_model_dir" in flavor_conf:
+        saved_model = os.path.join(model_path, flavor_conf["saved_model_dir"])
+    else:
+        # Keras models are saved as a SavedModel directory or a .h5/.keras file
+        saved_model = os.path.join(model_path, flavor_conf.get("data", "data"), "model")
+        for extension in (".h5", ".keras"):
+            if os.path.isfile(saved_model + extension):
+                saved_model += extension
+
+    return archive_model(
+        path=saved_model, archive=os.path.join(dst_path, "tensorflow_model.tar.gz")
+    )
+
+
+def package_pytorch_model(model_path: str, dst_path: str, scorer_config: Dict) -> str:
+    """Exports a local MLflow pytorch model to ONNX, the format of the pytorch
+    models of WML, and packages it as a WML model archive. The model is traced on
+    its input example, or on a random input of the shape of its signature, with a
+    dynamic batch dimension.
+
+    Parameters
+    ----------
+    model_path : str
+        local MLflow model directory
+    dst_path : str
+        directory of the archive
+    scorer_config : Dict
+        deployment configuration. The export reads -
+        - "pytorch_onnx_opset" : ONNX opset of the exported model
+          (Default: the default one of `torch.onnx.export`)
+
+    Returns
+    -------
+    str
+        path of the tar.gz archive
+    """
+    try:
+        import mlflow.pytorch
+        import torch  # type: ignore
+    except ImportError as e:
+        raise MlflowException(
+            "Storing a pytorch model requires torch to export it to ONNX"
+        ) from e
+
+    dtype, shape, _ = get_onnx_input(
+        Model.load(os.path.join(model_path, "MLmodel")).signature
+    )
+    sample = get_onnx_sample(model_path=model_path, dtype=dtype, shape=shape, rows=2)
+
+    model = mlflow.pytorch.load_model(model_uri=model_path)
+    model.eval()
+
+    opset = scorer_config.get("pytorch_onnx_opset")
+    model_file = os.path.join(dst_path, "model.onnx")
+
+    torch.onnx.export(
+        model,
+        torch.from_numpy(np.ascontiguousarray(sample)),
+        model_file,
+        input_names=["input"],
+        output_names=["output"],
+        dynamic_axes={"input": {0: "batch"}, "output": {0: "batch"}},
+        opset_version=int(opset) if opset is not None else None,
+    )
+
+    return archive_model(
+        path=model_file, archive=os.path.join(dst_path, "pytorch_model.tar.gz")
     )
 
+
+# functions returning the model object, or the path of the model archive, the WML
+# client stores for the native flavors other than sklearn
+NATIVE_MODEL_PACKAGERS = {
+    "xgboost": package_xgboost_model,
+    "lightgbm": package_lightgbm_model,
+    "tensorflow": package_tensorflow_model,
+    "pytorch": package_pytorch_model,
+}
+
+
+def store_native_artifact(
+    client: APIClient,
+    model_uri: str,
+    artifact_name: str,
+    flavor: str,
+    software_spec_id: str,
+    artifact_id: Optional[str] = None,
+    scorer_config: Optional[Dict] = None,
+) -> Tuple[str, str]:
+    """store a model of a flavor WML runs natively, with the model type of the WML
+    runtime matching the logged library version, see `get_native_model_type`
+
+    Parameters
+    ----------
+    client : APIClient
+        WML client
+    model_uri : str
+        model URI
+    artifact_name : str
+        name of the artifact
+    flavor : str
+        flavor of the model, one of `NATIVE_MODEL_PACKAGERS`
+    software_spec_id : str
+        id of software specification
+    artifact_id : Optional[str], optional
+        artifact id of the stored model, by default None
+    scorer_config : Optional[Dict], optional
+        deployment configuration, by default None
+
+    Returns
+    -------
+    Tuple[str, str]
+        model id, revision id
+    """
+    if scorer_config is None:
+        scorer_config = dict()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = mlflow.artifacts.download_artifacts(
+            artifact_uri=model_uri, dst_path=os.path.join(tmp_dir, "model")
+        )
+
+        model_type, _ = get_native_model_type(
+            flavor=flavor,
+            version=get_logged_library_version(
+                model_uri=model_uri, flavor=flavor, model_path=model_path
+            ),
+            config=scorer_config,
+        )
+
+        model_object = NATIVE_MODEL_PACKAGERS[flavor](
+            model_path=model_path, dst_path=tmp_dir, scorer_config=scorer_config
+        )
+
+        model_id, rev_id = store_or_update_model(
+            client=client,
+            model_object=model_object,
+            model_name=artifact_name,
+            model_type=model_type,
+            software_spec_uid=software_spec_id,
+            model_id=artifact_id,
+        )
+
     return (model_id, rev_id)
 
 
@@ -288,6 +1590,7 @@ def store_watson_nlp_artifact(
     software_spec_id: str,
     artifact_id: Optional[str] = None,
     config: Optional[Dict] = None,
+    scorer_config: Optional[Dict] = None,
 ) -> Tuple[str, str]:
     """store watson nlp artifact in WML
 
@@ -303,43 +1606,84 @@ def store_watson_nlp_artifact(
         id of software specification
     artifact_id : Optional[str], optional
         artifact id of the stored model, by default None
+    config : Optional[Dict], optional
+        environment variables set when the scorer is initialized, by default None
+    scorer_config : Optional[Dict], optional
+        deployment configuration, see `get_artifact_cache_args`, by default None
 
     Returns
     -------
     Tuple[str, str]
         model id, revision id
     """
+    if scorer_config is None:
+        scorer_config = dict()
+
+    cache_args = get_artifact_cache_args(
+        model_uri=model_uri, scorer_config=scorer_config
+    )
+
+    config = get_scorer_environment(config)
 
     # the args have to be passed as default value in the scorer
-    def deployable_watson_nlp_scorer(artifact_uri=model_uri, config=config):
-        import os
-        import tempfile
+    def deployable_watson_nlp_scorer(
+        artifact_uri=model_uri, config=config, artifact_cache=cache_args
+    ):
+        import threading
 
-        import mlflow
         import watson_nlp  # type: ignore
 
-        for key, val in config.items():  # type: ignore
-            os.environ[key] = val
+        # the helpers shared by the scorers are loaded from their source
+        cache_module = {}
+        exec(artifact_cache["source"], cache_module)
+        cache_module["export_environment"](config)
+
+        # the model is loaded on the first request and shared by all later requests
+        state = {}
+        lock = threading.Lock()
+
+        def load():
+            if "model" not in state:
+                with lock:
+                    if "model" not in state:
+                        # the model is downloaded once per host into the cache
+                        with cache_module["load_artifact"](
+                            cache_args=artifact_cache, uri=artifact_uri
+                        ) as artifact_file:
+                            state["model"] = watson_nlp.load(artifact_file)
+
+            return state["model"]
 
         def score(payload: dict):
-            artifact_dir = os.path.join(tempfile.gettempdir(), "artifacts")
+            model = load()
 
-            # `download_artifacts` returns the local path if it's already been downloaded
-            artifact_file = mlflow.artifacts.download_artifacts(
-                artifact_uri=artifact_uri, dst_path=artifact_dir
-            )
+            # fields = data.get("fields")
+            entries = [list(data.get("values")) for data in payload["input_data"]]
 
-            model = watson_nlp.load(artifact_file)
+            # run the values of all the entries in a single batch
+            predictions = model.run_batch(
+                [value for values in entries for value in values]
+            )
+            predictions = [prediction.to_dict() for prediction in predictions]
 
             scoring_output = {"predictions": []}
 
-            for data in payload["input_data"]:
-                values = data.get("values")
-                # fields = data.get("fields")
-                predictions = model.run_batch(values)
-                predictions = [prediction.to_dict() for prediction in predictions]
+            if len(predictions) != sum(len(values) for values in entries):
+                # the predictions can't be matched to the entries, run them one by one
+                for values in entries:
+                    predictions = model.run_batch(values)
+                    predictions = [prediction.to_dict() for prediction in predictions]
+
+                    scoring_output["predictions"].append({"values": predictions})
+
+                return scoring_output
 
-                scoring_output["predictions"].append({"values": predictions})
+            start = 0
+            for values in entries:
+                scoring_output["predictions"].append(
+                    {"values": predictions[start : start + len(values)]}
+                )
+                start += len(values)
 
             return scoring_output
 
@@ -354,3 +1698,207 @@ def store_watson_nlp_artifact(
     )
 
     return (function_id, rev_id)
+
+
+def get_pyfunc_input_spec(model_uri: str) -> Dict:
+    """Describes the input of a `python_function` model from its signature
+
+    Parameters
+    ----------
+    model_uri : str
+        model URI
+
+    Returns
+    -------
+    Dict
+        "columns" : input column names of a column based signature, else []
+        "tensor_dtype" : numpy dtype name of a tensor based signature, else ""
+    """
+    signature = mlflow.models.get_model_info(model_uri=model_uri).signature
+
+    if signature is None or signature.inputs is None:
+        return {"columns": [], "tensor_dtype": ""}
+
+    if signature.inputs.is_tensor_spec():
+        return {
+            "columns": [],
+            "tensor_dtype": signature.inputs.numpy_types()[0].name,
+        }
+
+    return {
+        "columns": signature.inputs.input_names()
+        if signature.inputs.has_input_names()
+        else [],
+        "tensor_dtype": "",
+    }
+
+
+def store_pyfunc_artifact(
+    client: APIClient,
+    model_uri: str,
+    artifact_name: str,
+    software_spec_id: str,
+    artifact_id: Optional[str] = None,
+    environment_variables: Optional[Dict] = None,
+    scorer_config: Optional[Dict] = None,
+) -> Tuple[str, str]:
+    """store a generic `python_function` artifact in WML. The scorer loads the
+    model with `mlflow.pyfunc.load_model` once per process and runs a single
+    `predict` over all the `input_data` entries of a request.
+
+    Parameters
+    ----------
+    client : APIClient
+        WML client
+    model_uri : str
+        model URI
+    artifact_name : str
+        name of the artifact
+    software_spec_id : str
+        id of software specification
+    artifact_id : Optional[str], optional
+        artifact id of the stored model, by default None
+    environment_variables : Optional[Dict], optional
+        environment variables set when the scorer is initialized, by default None
+    scorer_config : Optional[Dict], optional
+        deployment configuration, see `get_artifact_cache_args`, by default None
+
+    Returns
+    -------
+    Tuple[str, str]
+        model id, revision id
+    """
+    if scorer_config is None:
+        scorer_config = dict()
+
+    environment_variables = get_scorer_environment(environment_variables)
+
+    input_spec = get_pyfunc_input_spec(model_uri=model_uri)
+    cache_args = get_artifact_cache_args(
+        model_uri=model_uri, scorer_config=scorer_config
+    )
+
+    # the args have to be passed as default value in the scorer
+    def deployable_pyfunc_scorer(
+        artifact_uri=model_uri,
+        config=environment_variables,
+        input_spec=input_spec,
+        artifact_cache=cache_args,
+    ):
+        import threading
+
+        import numpy as np
+        import pandas as pd
+
+        # the helpers shared by the scorers are loaded from their source
+        cache_module = {}
+        exec(artifact_cache["source"], cache_module)
+        cache_module["export_environment"](config)
+
+        # the model is loaded on the first request and shared by all later requests
+        state = {}
+        lock = threading.Lock()
+
+        def load():
+            if "model" not in state:
+                with lock:
+                    if "model" not in state:
+                        import mlflow.pyfunc
+
+                        # the model is downloaded once per host into the cache
+                        with cache_module["load_artifact"](
+                            cache_args=artifact_cache, uri=artifact_uri
+                        ) as artifact_file:
+                            state["model"] = mlflow.pyfunc.load_model(artifact_file)
+
+            return state["model"]
+
+        def to_model_input(data):
+            values = data.get("values")
+
+            if input_spec["tensor_dtype"]:
+                return np.asarray(values, dtype=input_spec["tensor_dtype"])
+
+            frame = pd.DataFrame(values)
+            columns = data.get("fields") or input_spec["columns"]
+
+            if columns and len(columns) == len(frame.columns):
+                frame.columns = columns
+
+            return frame
+
+        def to_scoring_output(predictions):
+            if isinstance(predictions, pd.DataFrame):
+                return {
+                    "fields": [str(column) for column in predictions.columns],
+                    "values": predictions.to_numpy().tolist(),
+                }
+
+            if isinstance(predictions, (pd.Series, np.ndarray)):
+                return {"values": np.asarray(predictions).tolist()}
+
+            return {"values": predictions}
+
+        def split(predictions, sizes):
+            if isinstance(predictions, (pd.DataFrame, pd.Series)):
+                if len(predictions) != sum(sizes):
+                    return None
+
+                bounds = np.cumsum([0] + sizes)
+                return [
+                    predictions.iloc[start:stop]
+                    for start, stop in zip(bounds[:-1], bounds[1:])
+                ]
+
+            if isinstance(predictions, (np.ndarray, list)):
+                if len(predictions) != sum(sizes):
+                    return None
+
+                bounds = np.cumsum([0] + sizes)
+                return [
+                    predictions[start:stop]
+                    for start, stop in zip(bounds[:-1], bounds[1:])
+                ]
+
+            return None
+
+        def score(payload: dict):
+            model = load()
+
+            inputs = [to_model_input(data) for data in payload["input_data"]]
+            sizes = [len(model_input) for model_input in inputs]
+
+            batches = None
+
+            if len(inputs) == 1:
+                batches = [model.predict(inputs[0])]
+            elif input_spec["tensor_dtype"]:
+                # predict all the entries at once and split the predictions back
+                if len({model_input.shape[1:] for model_input in inputs}) == 1:
+                    batches = split(model.predict(np.concatenate(inputs)), sizes)
+            else:
+                batch = pd.concat(inputs, ignore_index=True)
+                batches = split(model.predict(batch), sizes)
+
+            if batches is None:
+                # the entries can't be batched or the predictions can't be matched
+                # to them, predict them one by one
+                batches = [model.predict(model_input) for model_input in inputs]
+
+            return {
+                "predictions": [
+                    to_scoring_output(predictions) for predictions in batches
+                ]
+            }
+
+        return score
+
+    function_id, rev_id = store_or_update_function(
+        client=client,
+        deployable_function=deployable_pyfunc_scorer,
+        function_name=artifact_name,
+        software_spec_uid=software_spec_id,
+        function_id=artifact_id,
+    )
+
+    return (function_id, rev_id)
@@ -1,14 +1,81 @@
+import hashlib
+import json
 import logging
 import os
+import shutil
+import tempfile
 import zipfile
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 import yaml
 from ibm_watson_machine_learning.client import APIClient
 from mlflow.exceptions import ENDPOINT_NOT_FOUND, MlflowException
+from mlflow.protos.databricks_pb2 import INVALID_PARAMETER_VALUE
+from packaging.version import InvalidVersion, Version
 
 LOGGER = logging.getLogger(__name__)
 
+# "request": the MLflow artifact store configuration is kept in the deployment's
+# `custom` block and sent with every scoring request.
+# "deploy": the configuration is embedded in the scorer when it is stored, the
+# deployment has no `custom` block and scoring requests carry only input data.
+ENVIRONMENT_MODES = ("request", "deploy")
+
+# "download": the scorer downloads the model from the MLflow artifact store when it
+# starts.
+# "bundle": the model is embedded in the stored scorer, which reads only local data.
+# "auto": bundle models up to `artifact_bundle_max_bytes`, download larger ones.
+ARTIFACT_PACKAGING_MODES = ("auto", "bundle", "download")
+DEFAULT_ARTIFACT_BUNDLE_MAX_BYTES = 32 * 1024 * 1024
+
+# `onnx_session_options` values mapped to the names of the onnxruntime enum members
+ONNX_GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": "ORT_DISABLE_ALL",
+    "basic": "ORT_ENABLE_BASIC",
+    "extended": "ORT_ENABLE_EXTENDED",
+    "all": "ORT_ENABLE_ALL",
+}
+ONNX_EXECUTION_MODES = {
+    "sequential": "ORT_SEQUENTIAL",
+    "parallel": "ORT_PARALLEL",
+}
+ONNX_THREAD_OPTIONS = ("intra_op_num_threads", "inter_op_num_threads")
+
+# base software specification of the custom software specifications
+DEFAULT_BASE_SOFTWARE_SPEC = "runtime-22.2-py3.10"
+# description of the custom software specifications, followed by the hash of their
+# environment so that deployments with the same environment share them
+SOFTWARE_SPEC_HASH_PREFIX = "mlflow-watsonml environment sha256:"
+# description of the package extensions, followed by the hash of their zip file so
+# that a package is uploaded once and attached to every software specification
+PACKAGE_EXTENSION_HASH_PREFIX = "mlflow-watsonml package sha256:"
+
+# flavors stored as native WML models, with the (major.minor) library version of
+# each WML runtime and the matching model type, newest runtime first. LightGBM has
+# no model type, its scikit-learn estimators run on the scikit-learn one.
+NATIVE_MODEL_TYPES = {
+    "sklearn": [
+        ("1.1", "scikit-learn_1.1", "runtime-23.1-py3.10"),
+        ("1.1", "scikit-learn_1.1", "runtime-22.2-py3.10"),
+    ],
+    "xgboost": [
+        ("1.6", "xgboost_1.6", "runtime-23.1-py3.10"),
+        ("1.5", "xgboost_1.5", "runtime-22.2-py3.10"),
+    ],
+    "lightgbm": [
+        ("3.3", "scikit-learn_1.1", "runtime-23.1-py3.10"),
+        ("3.3", "scikit-learn_1.1", "runtime-22.2-py3.10"),
+    ],
+    "tensorflow": [
+        ("2.12", "tensorflow_2.12", "runtime-23.1-py3.10"),
+        ("2.9", "tensorflow_2.9", "runtime-22.2-py3.10"),
+    ],
+    "pytorch": [
+        ("2.0", "pytorch-onnx_2.0", "runtime-23.1-py3.10"),
+        ("1.12", "pytorch-onnx_1.12", "runtime-22.2-py3.10"),
+    ],
+}
+
 
 def list_artifacts(client: APIClient) -> List[Dict]:
     """lists artifacts in WML repository
@@ -239,6 +306,252 @@ def get_software_spec_from_deployment_name(
     return software_spec_id
 
 
+def get_artifact_custom(client: APIClient, artifact_id: str) -> Dict:
+    """Get the `custom` metadata of a stored model or function
+
+    Parameters
+    ----------
+    client : APIClient
+        WML client
+    artifact_id : str
+        id of the model or function
+
+    Returns
+    -------
+    Dict
+        `custom` metadata, empty if the artifact has none
+    """
+    return (
+        client.repository.get_details(artifact_uid=artifact_id)["entity"].get(
+            "custom"
+        )
+        or {}
+    )
+
+
+def list_software_specs_by_hash(client: APIClient, env_hash: str) -> List[Dict]:
+    """Lists the custom software specifications of an environment, newest first
+
+    Parameters
+    ----------
+    client : APIClient
+        WML client
+    env_hash : str
+        hash of the environment, see `get_software_spec_hash`
+
+    Returns
+    -------
+    List[Dict]
+        list of software specification details dictionary
+    """
+    description = f"{SOFTWARE_SPEC_HASH_PREFIX}{env_hash}"
+
+    sw_specs = [
+        sw_spec
+        for sw_spec in client.software_specifications.get_details()["resources"]
+        if sw_spec["metadata"].get("description") == description
+    ]
+
+    return sorted(
+        sw_specs,
+        key=lambda sw_spec: sw_spec["metadata"].get("created_at", ""),
+        reverse=True,
+    )
+
+
+def find_software_spec_by_hash(client: APIClient, env_hash: str) -> Optional[str]:
+    """Get the id of the newest custom software specification of an environment
+
+    Parameters
+    ----------
+    client : APIClient
+        WML client
+    env_hash : str
+        hash of the environment, see `get_software_spec_hash`
+
+    Returns
+    -------
+    Optional[str]
+        software specification id, None if no software specification has this
+        environment
+    """
+    sw_specs = list_software_specs_by_hash(client=client, env_hash=env_hash)
+
+    if len(sw_specs) == 0:
+        return None
+
+    return sw_specs[0]["metadata"]["asset_id"]
+
+
+def software_spec_in_use(client: APIClient, software_spec_id: str) -> bool:
+    """Checks if any artifact in the repository runs on a software specification,
+    since software specifications are shared between deployments
+
+    Parameters
+    ----------
+    client : APIClient
+        WML client
+    software_spec_id : str
+        software specification id
+
+    Returns
+    -------
+    bool
+        whether an artifact references the software specification
+    """
+    for artifact in list_artifacts(client=client):
+        if artifact["entity"].get("software_spec", {}).get("id") == software_spec_id:
+            return True
+
+    return False
+
+
+def is_custom_software_spec(software_spec_details: Dict) -> bool:
+    """Checks if a software specification was created by this plugin
+
+    Parameters
+    ----------
+    software_spec_details : Dict
+        software specification details dictionary
+
+    Returns
+    -------
+    bool
+        whether the description of the software specification carries an
+        environment hash
+    """
+    description = software_spec_details["metadata"].get("description") or ""
+
+    return description.startswith(SOFTWARE_SPEC_HASH_PREFIX)
+
+
+def get_package_extension_name(package_hash: str) -> str:
+    """Returns the name of the package extension of a custom package, which is
+    derived from its hash so that it can be looked up by name
+
+    Parameters
+    ----------
+    package_hash : str
+        sha256 hex digest of the zip file
+
+    Returns
+    -------
+    str
+        package extension name
+    """
+    return f"mlflow_watsonml_package_{package_hash[:16]}"
+
+
+def find_package_extension_by_hash(
+    client: APIClient, package_hash: str
+) -> Optional[str]:
+    """Get the id of the package extension of a custom package
+
+    Parameters
+    ----------
+    client : APIClient
+        WML client
+    package_hash : str
+        sha256 hex digest of the zip file
+
+    Returns
+    -------
+    Optional[str]
+        package extension id, None if the package hasn't been uploaded
+    """
+    pkg_extn_id = client.package_extensions.get_id_by_name(
+        get_package_extension_name(package_hash)
+    )
+
+    if pkg_extn_id is None or pkg_extn_id == "Not Found":
+        return None
+
+    pkg_extn_details = client.package_extensions.get_details(pkg_extn_id)
+
+    # the name only has a prefix of the hash, the description has all of it
+    if pkg_extn_details["metadata"].get("description") != (
+        f"{PACKAGE_EXTENSION_HASH_PREFIX}{package_hash}"
+    ):
+        return None
+
+    return pkg_extn_id
+
+
+def get_file_hash(file_path: str) -> str:
+    """Returns the sha256 hex digest of a file, read in chunks
+
+    Parameters
+    ----------
+    file_path : str
+        path of the file
+
+    Returns
+    -------
+    str
+        hex digest
+    """
+    digest = hashlib.sha256()
+
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def get_software_spec_hash(
+    base_software_spec_name: str,
+    conda_yaml: Optional[str] = None,
+    custom_packages: Optional[List[str]] = None,
+) -> str:
+    """Returns a canonical hash of the environment of a custom software
+    specification. The order of the dependencies of the conda environment doesn't
+    change the hash, the order of the custom packages, which are installed one
+    after the other, does.
+
+    Parameters
+    ----------
+    base_software_spec_name : str
+        name of the base software specification
+    conda_yaml : Optional[str], optional
+        path of the refined conda.yaml file, by default None
+    custom_packages : Optional[List[str]], optional
+        zip file paths of the custom packages, by default None
+
+    Returns
+    -------
+    str
+        sha256 hex digest
+    """
+    conda_dependencies = []
+    pip_dependencies = []
+
+    if conda_yaml is not None:
+        with open(conda_yaml, "r", encoding="utf-8") as f:
+            env_data = yaml.safe_load(f)
+
+        for dep in env_data.get("dependencies", []):
+            if isinstance(dep, dict):
+                pip_dependencies.extend(
+                    str(pip_dep).strip() for pip_dep in dep.get("pip", [])
+                )
+            else:
+                conda_dependencies.append(str(dep).strip())
+
+    environment = {
+        "base_software_spec": base_software_spec_name,
+        "conda_dependencies": sorted(conda_dependencies),
+        "pip_dependencies": sorted(pip_dependencies),
+        "custom_packages": [
+            get_file_hash(custom_package) for custom_package in custom_packages or []
+        ],
+    }
+
+    return hashlib.sha256(
+        json.dumps(environment, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
 def is_zipfile(file_path: str) -> bool:
     """Utility method to check if the given file path is a valid zip file.
 
@@ -262,7 +575,9 @@ def is_zipfile(file_path: str) -> bool:
         return False
 
 
-def refine_conda_yaml(conda_yaml: str) -> str:
+def refine_conda_yaml(
+    conda_yaml: str, extra_pip_requirements: Optional[List[str]] = None
+) -> str:
     with open(conda_yaml, "r", encoding="utf-8") as f:
         env_data = yaml.safe_load(f)
 
@@ -273,6 +588,13 @@ def refine_conda_yaml(conda_yaml: str) -> str:
             if "pip" in dep.keys():
                 pip_dependencies.extend(dep["pip"])
 
+    # refining a conda.yaml file again leaves it unchanged
+    pip_dependencies.extend(
+        requirement
+        for requirement in extra_pip_requirements or []
+        if requirement not in pip_dependencies
+    )
+
     refined_env = {
         "channels": ["defaults"],
         "dependencies": [
@@ -282,9 +604,15 @@ def refine_conda_yaml(conda_yaml: str) -> str:
         "name": "mlflow-env",
     }
 
-    with open(conda_yaml, "w", encoding="utf-8") as f:
+    # the file is replaced at once, deployments sharing it may be reading it
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", dir=os.path.dirname(conda_yaml) or ".", delete=False
+    ) as f:
         yaml.safe_dump(refined_env, f)
 
+    shutil.copymode(conda_yaml, f.name)
+    os.replace(f.name, conda_yaml)
+
 
 # TODO: implement logic to make sure the environment variables are set
 def get_mlflow_config() -> Dict:
@@ -294,3 +622,204 @@ def get_mlflow_config() -> Dict:
         "AWS_SECRET_ACCESS_KEY": os.environ.get("AWS_SECRET_ACCESS_KEY"),
         "AWS_ACCESS_KEY_ID": os.environ.get("AWS_ACCESS_KEY_ID"),
     }
+
+
+def get_environment_mode(config: Dict) -> str:
+    """Returns the validated `environment_mode` of a deployment configuration
+
+    Parameters
+    ----------
+    config : Dict
+        deployment configuration
+
+    Returns
+    -------
+    str
+        one of `ENVIRONMENT_MODES`, by default "request"
+    """
+    environment_mode = config.get("environment_mode", "request")
+
+    if environment_mode not in ENVIRONMENT_MODES:
+        raise MlflowException(
+            f"Invalid environment_mode {environment_mode}. "
+            f"Valid modes are {', '.join(ENVIRONMENT_MODES)}",
+            error_code=INVALID_PARAMETER_VALUE,
+        )
+
+    return environment_mode
+
+
+def get_config_flag(config: Dict, key: str, default: bool) -> bool:
+    """Returns a boolean option of a deployment configuration. String values, as
+    passed with `-C key=value` on the command line, are parsed.
+
+    Parameters
+    ----------
+    config : Dict
+        deployment configuration
+    key : str
+        option name
+    default : bool
+        value if the option isn't set
+
+    Returns
+    -------
+    bool
+        option value
+    """
+    value = config.get(key, default)
+
+    if isinstance(value, str):
+        if value.lower() in ("true", "1", "yes"):
+            return True
+        if value.lower() in ("false", "0", "no"):
+            return False
+
+        raise MlflowException(
+            f"Invalid value {value} for {key}. Expected a boolean",
+            error_code=INVALID_PARAMETER_VALUE,
+        )
+
+    return bool(value)
+
+
+def get_onnx_session_options(config: Dict) -> Dict:
+    """Returns the validated `onnx_session_options` of a deployment configuration
+
+    Parameters
+    ----------
+    config : Dict
+        deployment configuration
+
+    Returns
+    -------
+    Dict
+        session options with the thread counts as int and the optimization level
+        and execution mode as the names of the onnxruntime enum members
+    """
+    options = config.get("onnx_session_options") or {}
+
+    if isinstance(options, str):
+        options = json.loads(options)
+
+    session_options = {}
+
+    for key, value in options.items():
+        if key in ONNX_THREAD_OPTIONS:
+            session_options[key] = int(value)
+        elif key == "graph_optimization_level":
+            if value not in ONNX_GRAPH_OPTIMIZATION_LEVELS:
+                raise MlflowException(
+                    f"Invalid graph_optimization_level {value}. Valid levels are "
+                    f"{', '.join(ONNX_GRAPH_OPTIMIZATION_LEVELS)}",
+                    error_code=INVALID_PARAMETER_VALUE,
+                )
+            session_options[key] = ONNX_GRAPH_OPTIMIZATION_LEVELS[value]
+        elif key == "execution_mode":
+            if value not in ONNX_EXECUTION_MODES:
+                raise MlflowException(
+                    f"Invalid execution_mode {value}. Valid modes are "
+                    f"{', '.join(ONNX_EXECUTION_MODES)}",
+                    error_code=INVALID_PARAMETER_VALUE,
+                )
+            session_options[key] = ONNX_EXECUTION_MODES[value]
+        else:
+            raise MlflowException(
+                f"Invalid onnx_session_options key {key}",
+                error_code=INVALID_PARAMETER_VALUE,
+            )
+
+    return session_options
+
+
+def get_options_hash(options: Dict) -> str:
+    """Returns a short stable hash of a dictionary of options
+
+    Parameters
+    ----------
+    options : Dict
+        JSON serializable options
+
+    Returns
+    -------
+    str
+        hex digest
+    """
+    return hashlib.sha256(
+        json.dumps(options, sort_keys=True).encode("utf-8")
+    ).hexdigest()[:16]
+
+
+def get_artifact_packaging(config: Dict) -> str:
+    """Returns the validated `artifact_packaging` of a deployment configuration
+
+    Parameters
+    ----------
+    config : Dict
+        deployment configuration
+
+    Returns
+    -------
+    str
+        one of `ARTIFACT_PACKAGING_MODES`, by default "auto"
+    """
+    artifact_packaging = config.get("artifact_packaging", "auto")
+
+    if artifact_packaging not in ARTIFACT_PACKAGING_MODES:
+        raise MlflowException(
+            f"Invalid artifact_packaging {artifact_packaging}. "
+            f"Valid modes are {', '.join(ARTIFACT_PACKAGING_MODES)}",
+            error_code=INVALID_PARAMETER_VALUE,
+        )
+
+    return artifact_packaging
+
+
+def get_native_model_type(
+    flavor: str, version: Optional[str], config: Dict
+) -> Tuple[str, str]:
+    """Returns the WML model type and runtime of a natively stored flavor. The
+    runtime with the same major.minor library version as the logged model is used,
+    else the newest runtime with an older version, or else the oldest runtime.
+
+    Parameters
+    ----------
+    flavor : str
+        flavor of the model, one of `NATIVE_MODEL_TYPES`
+    version : Optional[str]
+        library version the model was logged with, None if it is unknown
+    config : Dict
+        deployment configuration, its "model_type" overrides the model type
+
+    Returns
+    -------
+    Tuple[str, str]
+        model type, name of the runtime software specification
+    """
+    runtimes = NATIVE_MODEL_TYPES[flavor]
+
+    try:
+        release = Version(version).release[:2] if version is not None else None
+    except InvalidVersion as _:
+        release = None
+
+    if release is None:
+        LOGGER.warning(
+            f"Unknown {flavor} version {version}, using the newest WML runtime"
+        )
+        _, model_type, software_spec_name = runtimes[0]
+    else:
+        older_runtimes = [
+            runtime for runtime in runtimes if Version(runtime[0]).release <= release
+        ]
+        runtime_version, model_type, software_spec_name = (
+            older_runtimes[0] if older_runtimes else runtimes[-1]
+        )
+
+        if Version(runtime_version).release != release:
+            LOGGER.warning(
+                f"No WML runtime has {flavor} {version}, using {model_type} on "
+                f"{software_spec_name}"
+            )
+
+    return (config.get("model_type", model_type), software_spec_name)
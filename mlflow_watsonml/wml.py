@@ -1,17 +1,45 @@
+import functools
 import logging
-from typing import Any, Dict, Optional, Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qs, urlparse
 
+import requests
 from ibm_watson_machine_learning.client import APIClient
 from mlflow.exceptions import MlflowException
 from mlflow.protos.databricks_pb2 import NOT_IMPLEMENTED
 
+from mlflow_watsonml.poller import DeploymentHandle, DeploymentPoller
 from mlflow_watsonml.store import *
 from mlflow_watsonml.utils import *
 
 LOGGER = logging.getLogger(__name__)
 
+# maximum number of custom packages uploaded concurrently by a deployment
+MAX_PACKAGE_UPLOAD_WORKERS = 4
 
-def deploy(
+# seconds before a request sent by `send_wml_request` fails, so that a hung request
+# doesn't stall the shared deployment poller
+WML_REQUEST_TIMEOUT = 60.0
+
+# deployments listed per request, the page size of the WML client
+WML_LIST_PAGE_SIZE = 200
+
+# per package hash locks, so that concurrent deployments in this process upload
+# a package once
+_package_locks: Dict[str, threading.Lock] = dict()
+_package_locks_lock = threading.Lock()
+
+# per environment hash locks, so that concurrent deployments in this process create
+# a software specification once
+_software_spec_locks: Dict[str, threading.Lock] = dict()
+_software_spec_locks_lock = threading.Lock()
+# deployments of a batch may share the conda.yaml file refined in place
+_conda_yaml_lock = threading.Lock()
+
+
+def get_deployment_props(
     client: APIClient,
     name: str,
     artifact_id: str,
@@ -20,33 +48,17 @@ def deploy(
     environment_variables: Optional[Dict] = None,
     hardware_spec_id: Optional[str] = None,
 ) -> Dict:
-    """Create a new WML deployment
-
-    Parameters
-    ----------
-    client : APIClient
-        WML client
-    name : str
-        name of the new deployment to create
-    artifact_id : str
-        UID of the model or function stored in WML repository
-    batch : bool, optional
-        whether to use batch or online method of deployment,
-        by default False
+    """Returns the meta props of a new WML deployment, see `deploy`
 
     Returns
     -------
     Dict
-        deployment details dictionary
+        deployment meta props
     """
-    if environment_variables is None:
-        environment_variables = dict()
-
     if batch:
         deployment_props = {
             client.deployments.ConfigurationMetaNames.NAME: name,
             client.deployments.ConfigurationMetaNames.BATCH: {},
-            client.deployments.ConfigurationMetaNames.CUSTOM: environment_variables,
             client.deployments.ConfigurationMetaNames.HARDWARE_SPEC: {
                 "id": hardware_spec_id
             }
@@ -60,7 +72,6 @@ def deploy(
     else:
         deployment_props = {
             client.deployments.ConfigurationMetaNames.NAME: name,
-            client.deployments.ConfigurationMetaNames.CUSTOM: environment_variables,
             client.deployments.ConfigurationMetaNames.HARDWARE_SPEC: {
                 "id": hardware_spec_id
             }
@@ -73,6 +84,55 @@ def deploy(
             },
         }
 
+    if environment_variables:
+        deployment_props[
+            client.deployments.ConfigurationMetaNames.CUSTOM
+        ] = environment_variables
+
+    return deployment_props
+
+
+def deploy(
+    client: APIClient,
+    name: str,
+    artifact_id: str,
+    revision_id: str,
+    batch: bool = False,
+    environment_variables: Optional[Dict] = None,
+    hardware_spec_id: Optional[str] = None,
+) -> Dict:
+    """Create a new WML deployment
+
+    Parameters
+    ----------
+    client : APIClient
+        WML client
+    name : str
+        name of the new deployment to create
+    artifact_id : str
+        UID of the model or function stored in WML repository
+    batch : bool, optional
+        whether to use batch or online method of deployment,
+        by default False
+    environment_variables : Optional[Dict], optional
+        `custom` block of the deployment, sent with every scoring request.
+        The deployment gets no `custom` block if empty, by default None
+
+    Returns
+    -------
+    Dict
+        deployment details dictionary
+    """
+    deployment_props = get_deployment_props(
+        client=client,
+        name=name,
+        artifact_id=artifact_id,
+        revision_id=revision_id,
+        batch=batch,
+        environment_variables=environment_variables,
+        hardware_spec_id=hardware_spec_id,
+    )
+
     try:
         deployment_details = client.deployments.create(
             artifact_uid=artifact_id,
@@ -90,7 +150,220 @@ def deploy(
     return deployment_details
 
 
-def delete_deployment(client: APIClient, name: str):
+def send_wml_request(
+    client: APIClient,
+    method: str,
+    space_id: str,
+    operation: str,
+    expected_status: int = 200,
+    deployment_id: Optional[str] = None,
+    json: Optional[Union[Dict, List]] = None,
+    params: Optional[Dict] = None,
+) -> Dict:
+    """Sends a request to the deployments API of WML in a deployment space, which
+    doesn't depend on the default space of the client nor wait for the
+    deployment like the WML client does
+
+    Parameters
+    ----------
+    client : APIClient
+        WML client
+    method : str
+        HTTP method
+    space_id : str
+        space id of the deployment space
+    operation : str
+        description of the request for the error message
+    expected_status : int, optional
+        status code of a successful response, by default 200
+    deployment_id : Optional[str], optional
+        id of the deployment, by default None for the deployments collection
+    json : Optional[Union[Dict, List]], optional
+        body of the request, by default None
+    params : Optional[Dict], optional
+        extra query parameters, by default None
+
+    Returns
+    -------
+    Dict
+        body of the response
+
+    Raises
+    ------
+    MlflowException
+        if WML doesn't answer with `expected_status` in `WML_REQUEST_TIMEOUT` seconds
+    """
+    # private members of the WML client, checked against
+    # ibm-watson-machine-learning 1.0.327
+    href_definitions = client.service_instance._href_definitions
+    headers = client._get_headers()
+
+    url = (
+        href_definitions.get_deployments_href()
+        if deployment_id is None
+        else href_definitions.get_deployment_href(deployment_id)
+    )
+    params = {**(params or {}), "space_id": space_id}
+    version = getattr(client, "version_param", None)
+
+    if version is not None:
+        params["version"] = version
+
+    try:
+        response = requests.request(
+            method,
+            url,
+            json=json,
+            params=params,
+            headers=headers,
+            timeout=WML_REQUEST_TIMEOUT,
+        )
+    except requests.RequestException as e:
+        raise MlflowException(f"{operation} failed: {e}")
+
+    if response.status_code != expected_status:
+        raise MlflowException(
+            f"{operation} failed with status {response.status_code}: {response.text}"
+        )
+
+    return response.json()
+
+
+def submit_deployment(
+    client: APIClient,
+    space_id: str,
+    name: str,
+    artifact_id: str,
+    revision_id: str,
+    batch: bool = False,
+    environment_variables: Optional[Dict] = None,
+    hardware_spec_id: Optional[str] = None,
+) -> Dict:
+    """Request a new WML deployment without waiting for it to be ready, unlike
+    `deploy` whose `client.deployments.create` polls WML until then
+
+    Parameters
+    ----------
+    client : APIClient
+        WML client
+    space_id : str
+        space id of the deployment space
+    name : str
+        name of the new deployment to create
+    artifact_id : str
+        UID of the model or function stored in WML repository
+    batch : bool, optional
+        whether to use batch or online method of deployment,
+        by default False
+    environment_variables : Optional[Dict], optional
+        `custom` block of the deployment, by default None
+
+    Returns
+    -------
+    Dict
+        details of the initializing deployment
+    """
+    deployment_props = get_deployment_props(
+        client=client,
+        name=name,
+        artifact_id=artifact_id,
+        revision_id=revision_id,
+        batch=batch,
+        environment_variables=environment_variables,
+        hardware_spec_id=hardware_spec_id,
+    )
+
+    deployment_details = send_wml_request(
+        client=client,
+        method="POST",
+        space_id=space_id,
+        operation=f"Creating deployment {name}",
+        expected_status=202,
+        json={**deployment_props, "space_id": space_id},
+    )
+    deployment_details["name"] = deployment_details["metadata"]["name"]
+
+    LOGGER.info(f"Submitted {'batch' if batch else 'online'} deployment - {name}")
+
+    return deployment_details
+
+
+def poll_deployment(client: APIClient, space_id: str, deployment_id: str) -> Dict:
+    """Returns the current details of a deployment, without switching the default
+    space of the client
+
+    Parameters
+    ----------
+    client : APIClient
+        WML client
+    space_id : str
+        space id of the deployment space
+    deployment_id : str
+        id of the deployment
+
+    Returns
+    -------
+    Dict
+        deployment details dictionary
+    """
+    return send_wml_request(
+        client=client,
+        method="GET",
+        space_id=space_id,
+        operation=f"Getting deployment {deployment_id}",
+        deployment_id=deployment_id,
+    )
+
+
+def list_space_deployments(client: APIClient, space_id: str) -> List[Dict]:
+    """Lists the deployments of a deployment space, without switching the default
+    space of the client
+
+    Parameters
+    ----------
+    client : APIClient
+        WML client
+    space_id : str
+        space id of the deployment space
+
+    Returns
+    -------
+    List[Dict]
+        list of deployment details dictionary
+    """
+    deployments = []
+    params = {"limit": WML_LIST_PAGE_SIZE}
+
+    while True:
+        page = send_wml_request(
+            client=client,
+            method="GET",
+            space_id=space_id,
+            operation=f"Listing deployments of space {space_id}",
+            params=params,
+        )
+        deployments.extend(page.get("resources", []))
+
+        # the next page is only given by the `start` token of its href
+        start = parse_qs(urlparse(page.get("next", {}).get("href", "")).query).get(
+            "start"
+        )
+
+        if not start:
+            break
+
+        params = {"limit": WML_LIST_PAGE_SIZE, "start": start[0]}
+
+    # `name` is a required key in each deployment
+    for deployment in deployments:
+        deployment["name"] = deployment["metadata"]["name"]
+
+    return deployments
+
+
+def delete_deployment(
+    client: APIClient, name: str, deployment_details: Optional[Dict] = None
+):
     """Delete an existing deployment from WML.
     This method deletes the deployment and all the artifacts associated with it.
 
@@ -100,9 +373,12 @@ def delete_deployment(client: APIClient, name: str):
         WML client
     name : str
         name of the deployment to delete
+    deployment_details : Optional[Dict], optional
+        details of the deployment if already known, by default None
     """
     try:
-        deployment_details = get_deployment(client=client, name=name)
+        if deployment_details is None:
+            deployment_details = get_deployment(client=client, name=name)
 
         deployment_id = client.deployments.get_id(deployment_details=deployment_details)
         client.deployments.delete(deployment_uid=deployment_id)
@@ -121,7 +397,9 @@ def delete_deployment(client: APIClient, name: str):
         )
         software_spec_name = software_spec_details["metadata"]["name"]
 
-        if software_spec_name == f"{name}_sw_spec":
+        if is_custom_software_spec(
+            software_spec_details
+        ) and not software_spec_in_use(client=client, software_spec_id=software_spec_id):
             client.software_specifications.delete(sw_spec_uid=software_spec_id)
             LOGGER.info(
                 f"Deleted software specification {software_spec_name} with id {software_spec_id} from the repository."
@@ -137,26 +415,118 @@ def update_deployment(
     name: str,
     artifact_id: str,
     revision_id: str,
+    deployment_id: Optional[str] = None,
+    environment_variables: Optional[Dict] = None,
+    poller: Optional[DeploymentPoller] = None,
 ) -> Dict:
-    deployment_id = get_deployment_id_from_deployment_name(
-        client=client, deployment_name=name
-    )
-    metadata = {
-        client.deployments.ConfigurationMetaNames.ASSET: {
-            "id": artifact_id,
-            "rev": revision_id,
-        }
-    }
+    """Update the model of a WML deployment. WML patches the asset of a deployment
+    on its own, so its `custom` block is patched once the deployment runs the new
+    asset.
+
+    Parameters
+    ----------
+    client : APIClient
+        WML client
+    name : str
+        name of the deployment
+    artifact_id : str
+        UID of the model or function stored in WML repository
+    revision_id : str
+        revision of the artifact
+    deployment_id : Optional[str], optional
+        id of the deployment, by default looked up by name
+    environment_variables : Optional[Dict], optional
+        new `custom` block of the deployment, `{}` removes it. The `custom` block
+        is left as it is if None, by default None
+    poller : Optional[DeploymentPoller], optional
+        poller waiting for the asset update before patching the `custom` block,
+        by default a new one
+
+    Returns
+    -------
+    Dict
+        deployment details dictionary
+    """
+    if deployment_id is None:
+        deployment_id = get_deployment_id_from_deployment_name(
+            client=client, deployment_name=name
+        )
 
     updated_deployment = client.deployments.update(
-        deployment_uid=deployment_id, changes=metadata
+        deployment_uid=deployment_id,
+        changes={
+            client.deployments.ConfigurationMetaNames.ASSET: {
+                "id": artifact_id,
+                "rev": revision_id,
+            }
+        },
     )
 
+    if environment_variables is not None:
+        # WML rejects the other fields in the patch of the asset
+        handle = (poller or DeploymentPoller()).watch(
+            handle=DeploymentHandle(
+                name=name, deployment_id=deployment_id, deployment_details={}
+            ),
+            fetch=functools.partial(
+                client.deployments.get_details, deployment_uid=deployment_id
+            ),
+        )
+        handle.result()
+
+        updated_deployment = client.deployments.update(
+            deployment_uid=deployment_id,
+            changes={
+                client.deployments.ConfigurationMetaNames.CUSTOM: environment_variables
+            },
+        )
+
+    if updated_deployment is None:
+        # WML answers the patch of an asset with 202 and no details
+        updated_deployment = client.deployments.get_details(
+            deployment_uid=deployment_id
+        )
+
     LOGGER.info(updated_deployment)
 
     return updated_deployment
 
 
+def patch_deployment_custom(
+    client: APIClient,
+    space_id: str,
+    deployment_id: str,
+    environment_variables: Dict,
+) -> Dict:
+    """Replaces the `custom` block of a deployment, without switching the default
+    space of the client
+
+    Parameters
+    ----------
+    client : APIClient
+        WML client
+    space_id : str
+        space id of the deployment space
+    deployment_id : str
+        id of the deployment
+    environment_variables : Dict
+        new `custom` block of the deployment, `{}` removes it
+
+    Returns
+    -------
+    Dict
+        deployment details dictionary
+    """
+    return send_wml_request(
+        client=client,
+        method="PATCH",
+        space_id=space_id,
+        operation=f"Patching deployment {deployment_id}",
+        deployment_id=deployment_id,
+        json=[{"op": "add", "path": "/custom", "value": environment_variables}],
+    )
+
+
 def store_or_update_artifact(
     client: APIClient,
     model_uri: str,
@@ -165,14 +535,29 @@ def store_or_update_artifact(
     software_spec_id: str,
     artifact_id: Optional[str] = None,
     environment_variables: Optional[Dict] = None,
+    scorer_config: Optional[Dict] = None,
 ) -> Tuple[str, str]:
-    if flavor == "sklearn":
+    if flavor == "sklearn" and get_config_flag(
+        scorer_config or {}, "sklearn_to_onnx", False
+    ):
+        artifact_id, revision_id = store_sklearn_onnx_artifact(
+            client=client,
+            model_uri=model_uri,
+            artifact_name=artifact_name,
+            software_spec_id=software_spec_id,
+            artifact_id=artifact_id,
+            environment_variables=environment_variables,
+            scorer_config=scorer_config,
+        )
+
+    elif flavor == "sklearn":
         artifact_id, revision_id = store_sklearn_artifact(
             client=client,
             model_uri=model_uri,
             artifact_name=artifact_name,
             software_spec_id=software_spec_id,
             artifact_id=artifact_id,
+            scorer_config=scorer_config,
         )
 
     elif flavor == "onnx":
@@ -182,6 +567,19 @@ def store_or_update_artifact(
             artifact_name=artifact_name,
             software_spec_id=software_spec_id,
             artifact_id=artifact_id,
+            environment_variables=environment_variables,
+            scorer_config=scorer_config,
+        )
+
+    elif flavor in NATIVE_MODEL_PACKAGERS:
+        artifact_id, revision_id = store_native_artifact(
+            client=client,
+            model_uri=model_uri,
+            artifact_name=artifact_name,
+            flavor=flavor,
+            software_spec_id=software_spec_id,
+            artifact_id=artifact_id,
+            scorer_config=scorer_config,
         )
 
     elif flavor == "watson_nlp":
@@ -192,6 +590,18 @@ def store_or_update_artifact(
             software_spec_id=software_spec_id,
             artifact_id=artifact_id,
             config=environment_variables,
+            scorer_config=scorer_config,
+        )
+
+    elif flavor == "python_function":
+        artifact_id, revision_id = store_pyfunc_artifact(
+            client=client,
+            model_uri=model_uri,
+            artifact_name=artifact_name,
+            software_spec_id=software_spec_id,
+            artifact_id=artifact_id,
+            environment_variables=environment_variables,
+            scorer_config=scorer_config,
         )
 
     else:
@@ -209,18 +619,166 @@ def create_custom_software_spec(
     custom_packages: Optional[List[str]],
     conda_yaml: Optional[str] = None,
     rewrite: bool = False,
+    extra_pip_requirements: Optional[List[str]] = None,
+    base_software_spec_name: str = DEFAULT_BASE_SOFTWARE_SPEC,
+    software_specs: Optional[Dict[str, str]] = None,
 ) -> str:
-    if software_spec_exists(client=client, name=name):
-        if rewrite:
-            while software_spec_exists(client=client, name=name):
-                software_spec_id = client.software_specifications.get_id_by_name(
-                    sw_spec_name=name
+    """Create a custom software specification, or reuse the one of a deployment
+    with the same environment. Each new software specification makes WML build a
+    runtime image, so the environment is identified by the hash of the refined
+    conda environment, the custom packages and the base software specification,
+    which is stored in the description of the software specification.
+
+    Parameters
+    ----------
+    client : APIClient
+        WML client
+    name : str
+        name prefix of the software specification, the hash of its environment is
+        appended to it
+    custom_packages : Optional[List[str]]
+        zip file paths of the custom packages
+    conda_yaml : Optional[str], optional
+        path of the conda.yaml file, refined in place, by default None
+    rewrite : bool, optional
+        whether to replace the software specifications with the same environment
+        by a new one, those still used by other artifacts are kept, by default False
+    extra_pip_requirements : Optional[List[str]], optional
+        pip requirements added to the conda environment, by default None
+    base_software_spec_name : str, optional
+        name of the base software specification,
+        by default DEFAULT_BASE_SOFTWARE_SPEC
+    software_specs : Optional[Dict[str, str]], optional
+        software specification ids already resolved by a batch of deployments,
+        keyed by environment hash. They are reused even with `rewrite`, and the
+        resolved one is added, by default None
+
+    Returns
+    -------
+    str
+        software specification id
+    """
+    try:
+        if conda_yaml is not None:
+            if not os.path.exists(conda_yaml):
+                raise FileNotFoundError(f"conda.yaml file not found!")
+
+            with _conda_yaml_lock:
+                refine_conda_yaml(
+                    conda_yaml=conda_yaml,
+                    extra_pip_requirements=extra_pip_requirements,
                 )
-                client.software_specifications.delete(sw_spec_uid=software_spec_id)
 
+        for custom_package in custom_packages or []:
+            if not is_zipfile(custom_package):
+                raise MlflowException(f"{custom_package} is not a valid zip file.")
+
+        env_hash = get_software_spec_hash(
+            base_software_spec_name=base_software_spec_name,
+            conda_yaml=conda_yaml,
+            custom_packages=custom_packages,
+        )
+
+    except Exception as e:
+        LOGGER.exception(e)
+
+        raise MlflowException(e)
+
+    with _software_spec_locks_lock:
+        lock = _software_spec_locks.setdefault(env_hash, threading.Lock())
+
+    # deployments with the same environment create its software specification once
+    with lock:
+        if software_specs is not None and env_hash in software_specs:
+            return software_specs[env_hash]
+
+        software_spec_id = store_custom_software_spec(
+            client=client,
+            name=name,
+            env_hash=env_hash,
+            custom_packages=custom_packages,
+            conda_yaml=conda_yaml,
+            rewrite=rewrite,
+            base_software_spec_name=base_software_spec_name,
+        )
+
+        if software_specs is not None:
+            software_specs[env_hash] = software_spec_id
+
+    return software_spec_id
+
+
+def store_custom_software_spec(
+    client: APIClient,
+    name: str,
+    env_hash: str,
+    custom_packages: Optional[List[str]],
+    conda_yaml: Optional[str] = None,
+    rewrite: bool = False,
+    base_software_spec_name: str = DEFAULT_BASE_SOFTWARE_SPEC,
+) -> str:
+    """Store the software specification of an environment, or reuse the one
+    already stored, see `create_custom_software_spec`
+
+    Parameters
+    ----------
+    client : APIClient
+        WML client
+    name : str
+        name prefix of the software specification
+    env_hash : str
+        hash of the environment
+    custom_packages : Optional[List[str]]
+        zip file paths of the custom packages
+    conda_yaml : Optional[str], optional
+        path of the refined conda.yaml file, by default None
+    rewrite : bool, optional
+        whether to replace the software specifications with the same environment,
+        by default False
+    base_software_spec_name : str, optional
+        name of the base software specification,
+        by default DEFAULT_BASE_SOFTWARE_SPEC
+
+    Returns
+    -------
+    str
+        software specification id
+    """
+    if not rewrite:
+        software_spec_id = find_software_spec_by_hash(client=client, env_hash=env_hash)
+
+        if software_spec_id is not None:
+            LOGGER.info(
+                f"Reusing software specification {software_spec_id} with the same "
+                f"environment {env_hash}"
+            )
+            return software_spec_id
+
+    if rewrite:
+        # software specifications are shared, only the unused ones are replaced
+        for sw_spec in list_software_specs_by_hash(client=client, env_hash=env_hash):
+            software_spec_id = sw_spec["metadata"]["asset_id"]
+
+            if software_spec_in_use(client=client, software_spec_id=software_spec_id):
                 LOGGER.info(
-                    f"Deleted software specification {name} with id {software_spec_id}"
+                    f"Keeping software specification {software_spec_id} used by other artifacts"
                 )
+                continue
+
+            client.software_specifications.delete(sw_spec_uid=software_spec_id)
+
+            LOGGER.info(f"Deleted software specification with id {software_spec_id}")
+
+    name = f"{name}_{env_hash[:8]}"
+
+    if software_spec_exists(client=client, name=name):
+        if rewrite:
+            # a software specification kept above still has the name
+            revision = 1
+            while software_spec_exists(client=client, name=f"{name}_{revision}"):
+                revision += 1
+
+            name = f"{name}_{revision}"
         else:
             LOGGER.warn(
                 f"""Software spec {name} already exists."""
@@ -233,11 +791,14 @@ def create_custom_software_spec(
 
     try:
         base_software_spec_id = client.software_specifications.get_id_by_name(
-            "runtime-22.2-py3.10"
+            base_software_spec_name
         )
 
         meta_prop_sw_spec = {
             client.software_specifications.ConfigurationMetaNames.NAME: name,
+            client.software_specifications.ConfigurationMetaNames.DESCRIPTION: (
+                f"{SOFTWARE_SPEC_HASH_PREFIX}{env_hash}"
+            ),
             client.software_specifications.ConfigurationMetaNames.BASE_SOFTWARE_SPECIFICATION: {
                 "guid": base_software_spec_id
             },
@@ -249,11 +810,6 @@ def create_custom_software_spec(
         software_spec_id = client.software_specifications.get_id(sw_spec_details)
 
         if conda_yaml is not None:
-            if not os.path.exists(conda_yaml):
-                raise FileNotFoundError(f"conda.yaml file not found!")
-
-            refine_conda_yaml(conda_yaml=conda_yaml)
-
             pkg_extn_name = f"{name}_conda_env"
             # pkg_extn_id =
 
@@ -275,27 +831,12 @@ def create_custom_software_spec(
                 software_spec_id, pkg_extn_id
             )
 
-        if custom_packages is not None:
-            for custom_package in custom_packages:
-                if not is_zipfile(custom_package):
-                    raise MlflowException(f"{custom_package} is not a valid zip file.")
-
-                pkg_name = os.path.splitext(os.path.basename(custom_package))[0]
-
-                meta_prop_pkg_extn = {
-                    client.package_extensions.ConfigurationMetaNames.NAME: pkg_name,
-                    client.package_extensions.ConfigurationMetaNames.TYPE: "pip_zip",
-                }
-
-                pkg_extn_details = client.package_extensions.store(
-                    meta_props=meta_prop_pkg_extn, file_path=custom_package
-                )
-
-                pkg_extn_id = client.package_extensions.get_id(pkg_extn_details)
-
-                client.software_specifications.add_package_extension(
-                    software_spec_id, pkg_extn_id
-                )
+        for pkg_extn_id in store_package_extensions(
+            client=client, custom_packages=custom_packages or []
+        ):
+            client.software_specifications.add_package_extension(
+                software_spec_id, pkg_extn_id
+            )
 
     except Exception as e:
         LOGGER.exception(e)
@@ -307,3 +848,100 @@ def create_custom_software_spec(
     )
 
     return software_spec_id
+
+
+def store_package_extension(client: APIClient, custom_package: str) -> str:
+    """Upload a custom package as a `pip_zip` package extension, or reuse the
+    package extension of the same zip file uploaded for another deployment. The
+    package extensions are keyed by the sha256 of the zip file, which is stored in
+    their description.
+
+    Parameters
+    ----------
+    client : APIClient
+        WML client
+    custom_package : str
+        zip file path of the custom package
+
+    Returns
+    -------
+    str
+        package extension id
+    """
+    package_hash = get_file_hash(custom_package)
+
+    with _package_locks_lock:
+        lock = _package_locks.setdefault(package_hash, threading.Lock())
+
+    with lock:
+        pkg_extn_id = find_package_extension_by_hash(
+            client=client, package_hash=package_hash
+        )
+
+        if pkg_extn_id is not None:
+            LOGGER.info(
+                f"Reusing package extension {pkg_extn_id} of {custom_package} "
+                f"with hash {package_hash}"
+            )
+            return pkg_extn_id
+
+        meta_prop_pkg_extn = {
+            client.package_extensions.ConfigurationMetaNames.NAME: (
+                get_package_extension_name(package_hash)
+            ),
+            client.package_extensions.ConfigurationMetaNames.DESCRIPTION: (
+                f"{PACKAGE_EXTENSION_HASH_PREFIX}{package_hash}"
+            ),
+            client.package_extensions.ConfigurationMetaNames.TYPE: "pip_zip",
+        }
+
+        pkg_extn_details = client.package_extensions.store(
+            meta_props=meta_prop_pkg_extn, file_path=custom_package
+        )
+
+        pkg_extn_id = client.package_extensions.get_id(pkg_extn_details)
+
+    LOGGER.info(f"Uploaded {custom_package} as package extension {pkg_extn_id}")
+
+    return pkg_extn_id
+
+
+def store_package_extensions(
+    client: APIClient,
+    custom_packages: List[str],
+    max_workers: int = MAX_PACKAGE_UPLOAD_WORKERS,
+) -> List[str]:
+    """Upload or reuse the package extensions of several custom packages
+    concurrently, see `store_package_extension`
+
+    Parameters
+    ----------
+    client : APIClient
+        WML client
+    custom_packages : List[str]
+        zip file paths of the custom packages
+    max_workers : int, optional
+        maximum number of concurrent uploads, by default MAX_PACKAGE_UPLOAD_WORKERS
+
+    Returns
+    -------
+    List[str]
+        package extension ids, in the order of `custom_packages`
+    """
+    if len(custom_packages) == 0:
+        return []
+
+    if len(custom_packages) == 1:
+        return [
+            store_package_extension(client=client, custom_package=custom_packages[0])
+        ]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(custom_packages))) as pool:
+        return list(
+            pool.map(
+                lambda custom_package: store_package_extension(
+                    client=client, custom_package=custom_package
+                ),
+                custom_packages,
+            )
+        )
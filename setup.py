@@ -22,7 +22,8 @@ setup(
     install_requires=install_requires,
     extras_require={
         "dev": ["ipython", "black", "pytest", "build", "wheel", "twine", "pytest-cov"],
-        "onnx": ["onnx", "onnxruntime"],
+        "onnx": ["onnx", "onnxruntime", "skl2onnx"],
+        "async": ["aiohttp"],
         "docs": ["mkdocs", "mkdocstrings-python", "mkdocs-material"],
     },
     entry_points={"mlflow.deployments": "watsonml=mlflow_watsonml.deploy"},
@@ -1,7 +1,13 @@
+import copy
 import logging
 
 from ibm_watson_machine_learning.client import APIClient
 from ibm_watson_machine_learning.deployments import Deployments
+from ibm_watson_machine_learning.metanames import (
+    DeploymentMetaNames,
+    ScoringMetaNames,
+)
+from ibm_watson_machine_learning.pkg_extn import PkgExtn
 from ibm_watson_machine_learning.platform_spaces import PlatformSpaces
 from ibm_watson_machine_learning.repository import Repository
 from ibm_watson_machine_learning.Set import Set
@@ -21,19 +27,48 @@ class MockAPIClient(APIClient):
         self.repository = MockRepository(self)
         self.set = MockSet(self)
         self.software_specifications = MockSwSpec(self)
+        self.package_extensions = MockPkgExtn(self)
         self.spaces = MockPlatformSpaces(self)
+        self.service_instance = MockServiceInstance(self)
+
+    def _get_headers(self):
+        return {"Authorization": "Bearer token"}
+
+
+class MockHrefDefinitions:
+    def __init__(self, url):
+        self._url = url
+
+    def get_deployments_href(self):
+        return f"{self._url}/ml/v4/deployments"
+
+    def get_deployment_href(self, deployment_id):
+        return f"{self._url}/ml/v4/deployments/{deployment_id}"
+
+
+class MockServiceInstance:
+    def __init__(self, client):
+        self._href_definitions = MockHrefDefinitions(client.wml_credentials["url"])
 
 
 class MockDeployments(Deployments):
     def __init__(self, client):
         self._client = client
+        self.ConfigurationMetaNames = DeploymentMetaNames()
+        self.ScoringMetaNames = ScoringMetaNames()
         self._deployments = [
             {
-                "entity": {"asset": {"id": "id_of_artifact_1", "rev": "1"}},
+                "entity": {
+                    "asset": {"id": "id_of_artifact_1", "rev": "1"},
+                    "status": {"state": "ready"},
+                },
                 "metadata": {"name": "deployment_1", "id": "id_of_deployment_1"},
             },
             {
-                "entity": {"asset": {"id": "id_of_artifact_2", "rev": "1"}},
+                "entity": {
+                    "asset": {"id": "id_of_artifact_2", "rev": "1"},
+                    "status": {"state": "ready"},
+                },
                 "metadata": {"name": "deployment_2", "id": "id_of_deployment_2"},
             },
         ]
@@ -43,7 +78,13 @@ class MockDeployments(Deployments):
         return deployment_details["metadata"]["id"]
 
     def score(self, deployment_id, meta_props, transaction_id=None):
-        return {}
+        # echo the input values back as predictions
+        return {
+            "predictions": [
+                {"values": data["values"]}
+                for data in meta_props[self.ScoringMetaNames.INPUT_DATA]
+            ]
+        }
 
     def get_details(
         self,
@@ -58,11 +99,27 @@ class MockDeployments(Deployments):
         if get_all:
             return {"resources": self._deployments}
 
+        for deployment in self._deployments:
+            if deployment["metadata"]["id"] == deployment_uid:
+                return copy.deepcopy(deployment)
+
     def create(self, artifact_uid=None, meta_props=None, rev_id=None, **kwargs):
         return {}
 
     def update(self, deployment_uid, changes):
-        return {}
+        if self.ConfigurationMetaNames.ASSET in changes and len(changes) > 1:
+            # same error as the WML client
+            raise Exception(
+                "When ASSET is being updated/patched, other fields cannot be "
+                "updated. If other fields are to be updated, try without adding "
+                "ASSET update."
+            )
+
+        if self.ConfigurationMetaNames.ASSET in changes:
+            # WML accepts the patch of an asset with 202, the client returns None
+            return None
+
+        return self.get_details(deployment_uid=deployment_uid)
 
     def delete(self, deployment_uid):
         return {}
@@ -156,6 +213,11 @@ class MockRepository(Repository):
         return {}
 
     def delete(self, artifact_uid):
+        self._artifacts = [
+            artifact
+            for artifact in self._artifacts
+            if artifact["metadata"]["id"] != artifact_uid
+        ]
         return {}
 
     def create_artifact_revision(self, artifact_uid):
@@ -216,20 +278,93 @@ class MockSwSpec(SwSpec):
                 "entity": {},
             },
         ]
+        self._n_stored = len(self._sw_specs)
 
     def get_id_by_name(self, sw_spec_name):
         for sw_spec in self._sw_specs:
             if sw_spec["metadata"]["name"] == sw_spec_name:
                 return sw_spec["metadata"]["asset_id"]
 
-        return "Not found"
+        return "Not Found"
 
     def get_details(self, sw_spec_uid=None, state_info=False):
         if sw_spec_uid is None:
             return {"resources": self._sw_specs}
 
+        for sw_spec in self._sw_specs:
+            if sw_spec["metadata"]["asset_id"] == sw_spec_uid:
+                return sw_spec
+
+        raise Exception(f"software specification with id - {sw_spec_uid} not found")
+
+    def store(self, meta_props):
+        self._n_stored += 1
+        sw_spec = {
+            "metadata": {
+                "name": meta_props[self.ConfigurationMetaNames.NAME],
+                "asset_id": f"id_of_sw_spec_{self._n_stored}",
+                "description": meta_props.get(self.ConfigurationMetaNames.DESCRIPTION),
+                "created_at": f"2024-01-01T00:00:{self._n_stored:02d}.000Z",
+            },
+            "entity": {"package_extensions": []},
+        }
+        self._sw_specs.append(sw_spec)
+
+        return sw_spec
+
+    @staticmethod
+    def get_id(sw_spec_details):
+        return sw_spec_details["metadata"]["asset_id"]
+
+    def add_package_extension(self, sw_spec_uid, pkg_extn_id):
+        for sw_spec in self._sw_specs:
+            if sw_spec["metadata"]["asset_id"] == sw_spec_uid:
+                sw_spec["entity"]["package_extensions"].append(pkg_extn_id)
+                return "SUCCESS"
+
     def delete(self, sw_spec_uid):
         for idx, sw_spec in enumerate(self._sw_specs):
             if sw_spec["metadata"]["asset_id"] == sw_spec_uid:
                 self._sw_specs.pop(idx)
                 return "SUCCESS"
+
+
+class MockPkgExtn(PkgExtn):
+    def __init__(self, client):
+        self._client = client
+        self._pkg_extns = []
+
+    def store(self, meta_props, file_path):
+        pkg_extn = {
+            "metadata": {
+                "name": meta_props[self.ConfigurationMetaNames.NAME],
+                "asset_id": f"id_of_pkg_extn_{len(self._pkg_extns) + 1}",
+                "description": meta_props.get(self.ConfigurationMetaNames.DESCRIPTION),
+            },
+            "entity": {"file_path": file_path},
+        }
+        self._pkg_extns.append(pkg_extn)
+
+        return pkg_extn
+
+    def get_id_by_name(self, pkg_extn_name):
+        for pkg_extn in self._pkg_extns:
+            if pkg_extn["metadata"]["name"] == pkg_extn_name:
+                return pkg_extn["metadata"]["asset_id"]
+
+        return "Not Found"
+
+    def get_details(self, pkg_extn_id):
+        for pkg_extn in self._pkg_extns:
+            if pkg_extn["metadata"]["asset_id"] == pkg_extn_id:
+                return pkg_extn
+
+        raise Exception(f"package extension with id - {pkg_extn_id} not found")
+
+    @staticmethod
+    def get_uid(pkg_extn_details):
+        return pkg_extn_details["metadata"]["asset_id"]
+
+    @staticmethod
+    def get_id(pkg_extn_details):
+        return pkg_extn_details["metadata"]["asset_id"]
@@ -0,0 +1,224 @@
+import base64
+import io
+import os
+import shutil
+import tarfile
+import threading
+import time
+
+import pytest
+
+from mlflow_watsonml.artifact_cache import *
+
+
+def make_download(downloads, size=10, delay=0.0):
+    def download(dst_path):
+        downloads.append(dst_path)
+        time.sleep(delay)
+
+        model_dir = os.path.join(dst_path, "model")
+        os.makedirs(model_dir)
+        with open(os.path.join(model_dir, "model.onnx"), "wb") as f:
+            f.write(b"0" * size)
+
+        return model_dir
+
+    return download
+
+
+def test_get_hit_and_miss(tmp_path):
+    cache = ArtifactCache(root=str(tmp_path))
+    downloads = []
+
+    path = cache.get("runs:/1/model", "abc", make_download(downloads))
+    again = cache.get("runs:/1/model", "abc", make_download(downloads))
+
+    assert path == again
+    assert os.path.isfile(os.path.join(path, "model.onnx"))
+    assert len(downloads) == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (1, 1, 0)
+    assert stats["entries"] == 1
+    assert stats["size_bytes"] >= 10
+
+
+def test_get_keys_by_checksum(tmp_path):
+    cache = ArtifactCache(root=str(tmp_path))
+    downloads = []
+
+    first = cache.get("models:/model/Production", "v1", make_download(downloads))
+    second = cache.get("models:/model/Production", "v2", make_download(downloads))
+
+    assert first != second
+    assert len(downloads) == 2
+
+
+def test_get_single_flight(tmp_path):
+    downloads = []
+    paths = []
+
+    def worker():
+        # one cache per worker, as in separate scorer processes
+        cache = ArtifactCache(root=str(tmp_path))
+        paths.append(
+            cache.get("runs:/1/model", "abc", make_download(downloads, delay=0.05))
+        )
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(downloads) == 1
+    assert len(set(paths)) == 1
+
+
+def test_get_failed_download(tmp_path):
+    cache = ArtifactCache(root=str(tmp_path))
+
+    def download(dst_path):
+        open(os.path.join(dst_path, "partial"), "w").close()
+        raise IOError("connection reset")
+
+    with pytest.raises(IOError):
+        cache.get("runs:/1/model", "abc", download)
+
+    assert cache.entries() == []
+    assert os.listdir(os.path.join(tmp_path, ".staging")) == []
+
+    downloads = []
+    cache.get("runs:/1/model", "abc", make_download(downloads))
+    assert len(downloads) == 1
+
+
+def test_get_copies_local_artifacts(tmp_path):
+    local_dir = tmp_path / "local"
+    local_dir.mkdir()
+    (local_dir / "model.onnx").write_bytes(b"model")
+
+    cache = ArtifactCache(root=str(tmp_path / "cache"))
+    path = cache.get("file:///local", "abc", lambda dst_path: str(local_dir))
+
+    assert path.startswith(str(tmp_path / "cache"))
+    assert open(os.path.join(path, "model.onnx"), "rb").read() == b"model"
+
+
+def test_evict_least_recently_used(tmp_path):
+    cache = ArtifactCache(root=str(tmp_path), max_bytes=250)
+    downloads = []
+
+    first = cache.get("runs:/1/model", "abc", make_download(downloads, size=100))
+    second = cache.get("runs:/2/model", "abc", make_download(downloads, size=100))
+
+    # make the first entry the most recently used one
+    os.utime(os.path.join(os.path.dirname(second), LAST_USED_FILE), (0, 0))
+    cache.get("runs:/1/model", "abc", make_download(downloads))
+
+    third = cache.get("runs:/3/model", "abc", make_download(downloads, size=100))
+
+    assert os.path.exists(first)
+    assert not os.path.exists(second)
+    assert os.path.exists(third)
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["entries"] == 2
+
+
+def test_evict_keeps_new_entry(tmp_path):
+    cache = ArtifactCache(root=str(tmp_path), max_bytes=50)
+
+    path = cache.get("runs:/1/model", "abc", make_download([], size=100))
+
+    assert os.path.exists(path)
+    assert cache.stats()["entries"] == 1
+
+
+def test_evict_skips_open_entries(tmp_path):
+    cache = ArtifactCache(root=str(tmp_path), max_bytes=150)
+    downloads = []
+
+    with cache.open("runs:/1/model", "abc", make_download(downloads, size=100)) as path:
+        # the entry being read is over the budget once the second one is cached
+        cache.get("runs:/2/model", "abc", make_download(downloads, size=100))
+
+        assert os.path.exists(path)
+        assert cache.stats()["evictions"] == 0
+
+    cache.evict(keep=get_cache_key("runs:/2/model", "abc"))
+
+    assert not os.path.exists(path)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_open_downloads_evicted_entry(tmp_path):
+    cache = ArtifactCache(root=str(tmp_path))
+    downloads = []
+    download = make_download(downloads)
+
+    path = cache.get("runs:/1/model", "abc", download)
+    shutil.rmtree(os.path.dirname(path))
+
+    with cache.open("runs:/1/model", "abc", download) as again:
+        assert again == path
+        assert os.path.exists(again)
+
+    assert len(downloads) == 2
+
+
+def test_get_replaces_incomplete_entry(tmp_path):
+    cache = ArtifactCache(root=str(tmp_path))
+    downloads = []
+
+    path = cache.get("runs:/1/model", "abc", make_download(downloads))
+    os.remove(os.path.join(os.path.dirname(path), LAST_USED_FILE))
+
+    again = cache.get("runs:/1/model", "abc", make_download(downloads))
+
+    assert again == path
+    assert os.path.exists(os.path.join(os.path.dirname(path), LAST_USED_FILE))
+    assert len(downloads) == 2
+    assert cache.stats()["entries"] == 1
+
+
+def test_get_cache_key():
+    assert get_cache_key("runs:/1/model", "abc") == get_cache_key(
+        "runs:/1/model", "abc"
+    )
+    assert get_cache_key("runs:/1/model", "abc") != get_cache_key(
+        "runs:/1/model", "abd"
+    )
+
+
+def test_load_artifact_from_bundle(tmp_path):
+    model_dir = tmp_path / "src" / "model"
+    model_dir.mkdir(parents=True)
+    (model_dir / "model.onnx").write_bytes(b"model")
+
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+        tar.add(str(model_dir), arcname="model")
+
+    cache_args = {
+        "bundle": base64.b64encode(buffer.getvalue()).decode("ascii"),
+        "checksum": "abc",
+        "dir": str(tmp_path / "cache"),
+        "max_bytes": 0,
+    }
+
+    with load_artifact(cache_args=cache_args, uri="runs:/1/model") as path:
+        with open(os.path.join(path, "model.onnx"), "rb") as f:
+            assert f.read() == b"model"
+
+    with load_artifact(cache_args=cache_args, uri="runs:/1/model") as again:
+        assert path == again
+
+    assert os.path.basename(path) == "model"
+
+
+def test_export_environment(monkeypatch):
+    monkeypatch.delenv("MLFLOW_TRACKING_URI", raising=False)
+
+    export_environment({"MLFLOW_TRACKING_URI": "http://mlflow", "UNSET": None})
+
+    assert os.environ["MLFLOW_TRACKING_URI"] == "http://mlflow"
+    assert "UNSET" not in os.environ
@@ -0,0 +1,44 @@
+from mlflow_watsonml.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache_hit_and_expiry():
+    clock = FakeClock()
+    cache = TTLCache(ttl=10, clock=clock)
+
+    assert cache.get("space_1") is None
+    cache.set("space_1", "id_of_space_1")
+    assert cache.get("space_1") == "id_of_space_1"
+
+    clock.now = 10
+    assert cache.get("space_1") is None
+
+    assert cache.stats() == {"hits": 1, "misses": 2, "size": 0}
+
+
+def test_ttl_cache_invalidate():
+    cache = TTLCache(ttl=10)
+
+    cache.set("space_1", "id_of_space_1")
+    cache.set("space_2", "id_of_space_2")
+
+    cache.invalidate("space_1")
+    assert cache.get("space_1") is None
+    assert cache.get("space_2") == "id_of_space_2"
+
+    cache.invalidate()
+    assert cache.stats()["size"] == 0
+
+
+def test_ttl_cache_disabled():
+    cache = TTLCache(ttl=0)
+
+    cache.set("space_1", "id_of_space_1")
+    assert cache.get("space_1") is None
@@ -1,9 +1,14 @@
+import inspect
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 from mlflow import MlflowException
 from pytest import LogCaptureFixture, MonkeyPatch
 from resources.mock.mock_client import MockAPIClient
 
 import mlflow_watsonml.deploy
+import mlflow_watsonml.store
 from mlflow_watsonml.deploy import WatsonMLDeploymentClient
 
 MOCK_WML_CREDENTIALS = {
@@ -19,6 +24,14 @@ MOCK_WML_CREDENTIALS = {
 def mock_client(monkeypatch: MonkeyPatch):
     # Mock the APIClient
     monkeypatch.setattr(mlflow_watsonml.deploy, "APIClient", MockAPIClient)
+    # the mock deployments are listed through the WML client
+    monkeypatch.setattr(
+        mlflow_watsonml.deploy,
+        "list_space_deployments",
+        lambda client, space_id: mlflow_watsonml.deploy.list_deployments(
+            client=client
+        ),
+    )
 
 
 def test_connect_success():
@@ -59,6 +72,531 @@ def test_get_wml_client_exception(caplog: LogCaptureFixture):
     assert "space space_3 not found" in caplog.text
 
 
+def test_get_wml_client_caches_space_id():
+    client = WatsonMLDeploymentClient(config=MOCK_WML_CREDENTIALS)
+    spaces = client._wml_client.spaces
+
+    calls = []
+    get_details = spaces.get_details
+
+    def counting_get_details(*args, **kwargs):
+        calls.append(kwargs)
+        return get_details(*args, **kwargs)
+
+    spaces.get_details = counting_get_details
+
+    for _ in range(3):
+        client.get_wml_client(endpoint="space_1")
+
+    assert len(calls) == 1
+    assert client.get_cache_stats()["spaces"]["hits"] == 2
+    assert client.get_cache_stats()["spaces"]["misses"] == 1
+
+
+def test_get_wml_client_space_cache_disabled():
+    client = WatsonMLDeploymentClient(config=MOCK_WML_CREDENTIALS, space_cache_ttl=0)
+
+    client.get_wml_client(endpoint="space_1")
+    client.get_wml_client(endpoint="space_1")
+
+    assert client.get_cache_stats()["spaces"]["hits"] == 0
+    assert client.get_cache_stats()["spaces"]["size"] == 0
+
+
+def test_delete_endpoint_invalidates_space_cache():
+    client = WatsonMLDeploymentClient(config=MOCK_WML_CREDENTIALS)
+    client._wml_client.spaces.delete = lambda space_id: None
+
+    client.get_wml_client(endpoint="space_1")
+    assert client.get_cache_stats()["spaces"]["size"] == 1
+
+    client.delete_endpoint(endpoint="space_1")
+    assert client.get_cache_stats()["spaces"]["size"] == 0
+
+
+def test_get_deployment_uses_deployment_index():
+    client = WatsonMLDeploymentClient(config=MOCK_WML_CREDENTIALS)
+    deployments = client._wml_client.deployments
+
+    calls = []
+    get_details = deployments.get_details
+
+    def counting_get_details(*args, **kwargs):
+        calls.append(kwargs)
+        return get_details(*args, **kwargs)
+
+    deployments.get_details = counting_get_details
+
+    for _ in range(3):
+        deployment = client.get_deployment(name="deployment_2", endpoint="space_1")
+        assert deployment["metadata"]["id"] == "id_of_deployment_2"
+
+    assert len(calls) == 1
+
+
+def test_get_deployment_index_exception(caplog: LogCaptureFixture):
+    client = WatsonMLDeploymentClient(config=MOCK_WML_CREDENTIALS)
+
+    with pytest.raises(MlflowException):
+        _ = client.get_deployment(name="deployment_3", endpoint="space_1")
+
+    assert "no deployment by the name deployment_3 exists" in caplog.text
+
+
+def test_predict_cache_hit_only_scores():
+    client = WatsonMLDeploymentClient(config=MOCK_WML_CREDENTIALS)
+    wml_client = client._wml_client
+
+    # warm up the space and deployment caches, and the default space of the client
+    client.predict(deployment_name="deployment_1", inputs=[[1]], endpoint="space_1")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("unexpected WML call")
+
+    wml_client.spaces.get_details = fail
+    wml_client.deployments.get_details = fail
+    wml_client.set.default_space = fail
+
+    predictions = client.predict(
+        deployment_name="deployment_1", inputs=[[1, 2]], endpoint="space_1"
+    )
+
+    assert predictions == [{"values": [[1, 2]]}]
+
+
+def test_lookups_do_not_wait_for_space_lock():
+    client = WatsonMLDeploymentClient(config=MOCK_WML_CREDENTIALS)
+    client.get_wml_client(endpoint="space_1")
+    locked = threading.Event()
+    release = threading.Event()
+
+    def hold_space_lock():
+        # like a deployment being created
+        with client._space_lock:
+            locked.set()
+            release.wait(timeout=10)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        executor.submit(hold_space_lock)
+        locked.wait(timeout=5)
+
+        try:
+            deployment = executor.submit(
+                client.get_deployment, name="deployment_1", endpoint="space_2"
+            ).result(timeout=5)
+            predictions = executor.submit(
+                client.predict,
+                deployment_name="deployment_1",
+                inputs=[[1, 2]],
+                endpoint="space_2",
+            ).result(timeout=5)
+        finally:
+            release.set()
+
+    assert deployment["name"] == "deployment_1"
+    assert predictions == [{"values": [[1, 2]]}]
+
+
+@pytest.mark.parametrize(
+    "custom, sends_environment",
+    [(None, False), ({}, False), ({"AWS_ACCESS_KEY_ID": "key"}, True)],
+)
+def test_predict_environment_variables(custom, sends_environment):
+    client = WatsonMLDeploymentClient(config=MOCK_WML_CREDENTIALS)
+    wml_client = client._wml_client
+
+    if custom is not None:
+        wml_client.deployments._deployments[0]["entity"]["custom"] = custom
+
+    payloads = []
+    score = wml_client.deployments.score
+
+    def recording_score(deployment_id, meta_props, transaction_id=None):
+        payloads.append(meta_props)
+        return score(deployment_id, meta_props, transaction_id)
+
+    wml_client.deployments.score = recording_score
+
+    client.predict(deployment_name="deployment_1", inputs=[[1]], endpoint="space_1")
+
+    environment_key = wml_client.deployments.ScoringMetaNames.ENVIRONMENT_VARIABLES
+    assert (environment_key in payloads[0]) == sends_environment
+
+
+def test_delete_deployment_updates_deployment_index(monkeypatch: MonkeyPatch):
+    client = WatsonMLDeploymentClient(config=MOCK_WML_CREDENTIALS)
+    monkeypatch.setattr(
+        mlflow_watsonml.deploy, "delete_deployment", lambda **kwargs: None
+    )
+
+    client.get_deployment(name="deployment_1", endpoint="space_1")
+    client.delete_deployment(name="deployment_1", endpoint="space_1")
+
+    index = client._deployment_cache.get("id_of_space_1")
+    assert "deployment_1" not in index
+    assert "deployment_2" in index
+
+
+@pytest.mark.parametrize(
+    "config, scorer_config",
+    [
+        ({}, {}),
+        ({"environment_mode": "request"}, {}),
+        ({"environment_mode": "deploy"}, {"AWS_ACCESS_KEY_ID": "key"}),
+    ],
+)
+def test_create_deployment_embeds_environment(
+    monkeypatch: MonkeyPatch, config, scorer_config
+):
+    client = WatsonMLDeploymentClient(config=MOCK_WML_CREDENTIALS)
+    stored = {}
+
+    def store_function(client, deployable_function, **kwargs):
+        stored["function"] = deployable_function
+        return ("function_id", "1")
+
+    monkeypatch.setattr(
+        mlflow_watsonml.store, "store_or_update_function", store_function
+    )
+    monkeypatch.setattr(
+        mlflow_watsonml.store.mlflow.artifacts,
+        "download_artifacts",
+        lambda artifact_uri, dst_path=None: dst_path,
+    )
+    monkeypatch.setattr(
+        mlflow_watsonml.store, "inspect_onnx_model", lambda **kwargs: {}
+    )
+    monkeypatch.setattr(
+        mlflow_watsonml.store, "get_artifact_cache_args", lambda **kwargs: {}
+    )
+    monkeypatch.setattr(
+        mlflow_watsonml.deploy,
+        "get_mlflow_config",
+        lambda: {"AWS_ACCESS_KEY_ID": "key", "MLFLOW_S3_ENDPOINT_URL": None},
+    )
+    monkeypatch.setattr(
+        WatsonMLDeploymentClient, "_get_software_spec_id", lambda *args, **kwargs: "id"
+    )
+    monkeypatch.setattr(mlflow_watsonml.deploy, "deploy", lambda **kwargs: {})
+    client._wml_client.hardware_specifications = type(
+        "MockHwSpec", (), {"get_id_by_name": staticmethod(lambda name: "hw_spec_id")}
+    )()
+
+    client.create_deployment(
+        name="deployment_3",
+        model_uri="runs:/run_id/model",
+        flavor="onnx",
+        config=config,
+        endpoint="space_1",
+    )
+
+    parameters = inspect.signature(stored["function"]).parameters
+    assert parameters["config"].default == scorer_config
+
+
+@pytest.fixture
+def pipeline_client(monkeypatch: MonkeyPatch):
+    """Returns a client whose create and update stages don't reach MLflow, and the
+    list of the artifacts it stores"""
+    client = WatsonMLDeploymentClient(config=MOCK_WML_CREDENTIALS)
+    stored = []
+
+    def store_or_update_artifact(**kwargs):
+        stored.append(kwargs["artifact_name"])
+        return ("id_of_artifact_4", "1")
+
+    monkeypatch.setattr(
+        mlflow_watsonml.deploy, "store_or_update_artifact", store_or_update_artifact
+    )
+    monkeypatch.setattr(mlflow_watsonml.deploy, "get_mlflow_config", lambda: {})
+    monkeypatch.setattr(
+        WatsonMLDeploymentClient, "_get_software_spec_id", lambda *args, **kwargs: "id"
+    )
+    monkeypatch.setattr(
+        WatsonMLDeploymentClient, "_get_hardware_spec_id", lambda *args, **kwargs: None
+    )
+    monkeypatch.setattr(mlflow_watsonml.deploy, "deploy", lambda **kwargs: {})
+    monkeypatch.setattr(
+        mlflow_watsonml.deploy, "update_deployment", lambda **kwargs: {}
+    )
+
+    return client, stored
+
+
+def test_create_deployment_stage_timings(pipeline_client):
+    client, stored = pipeline_client
+
+    deployment_details = client.create_deployment(
+        name="deployment_3",
+        model_uri="runs:/run_id/model",
+        flavor="onnx",
+        config={},
+        endpoint="space_1",
+    )
+
+    assert stored == ["deployment_3_v1"]
+    assert set(deployment_details["stage_timings"]) == {
+        "check_name",
+        "software_spec",
+        "mlflow_config",
+        "hardware_spec",
+        "artifact",
+        "deploy",
+        "total",
+    }
+
+
+def test_create_deployment_existing_name(pipeline_client, monkeypatch: MonkeyPatch):
+    client, stored = pipeline_client
+    specs = []
+    monkeypatch.setattr(
+        WatsonMLDeploymentClient,
+        "_get_software_spec_id",
+        lambda *args, **kwargs: specs.append("software_spec"),
+    )
+    monkeypatch.setattr(
+        WatsonMLDeploymentClient,
+        "_get_hardware_spec_id",
+        lambda *args, **kwargs: specs.append("hardware_spec"),
+    )
+
+    with pytest.raises(MlflowException, match="already exists"):
+        client.create_deployment(
+            name="deployment_1",
+            model_uri="runs:/run_id/model",
+            flavor="onnx",
+            config={},
+            endpoint="space_1",
+        )
+
+    assert stored == []
+    assert specs == []
+
+
+def test_update_deployment_stage_timings(pipeline_client):
+    client, stored = pipeline_client
+
+    deployment_details = client.update_deployment(
+        name="deployment_1",
+        model_uri="runs:/run_id/model",
+        flavor="onnx",
+        config={},
+        endpoint="space_1",
+    )
+
+    assert stored == ["deployment_1_v2"]
+    assert set(deployment_details["stage_timings"]) == {
+        "current_deployment",
+        "software_spec",
+        "mlflow_config",
+        "artifact",
+        "update",
+        "total",
+    }
+
+
+def test_create_deployment_asynchronous(pipeline_client, monkeypatch: MonkeyPatch):
+    client, _ = pipeline_client
+    client._deployment_poller.initial_interval = 0.01
+    states = ["initializing", "ready"]
+    submitted = []
+
+    def submit_deployment(**kwargs):
+        submitted.append(kwargs)
+        return {
+            "metadata": {"name": "deployment_3", "id": "id_of_deployment_3"},
+            "entity": {"status": {"state": "initializing"}},
+        }
+
+    def poll_deployment(client, space_id, deployment_id):
+        assert (space_id, deployment_id) == ("id_of_space_1", "id_of_deployment_3")
+        return {
+            "metadata": {"name": "deployment_3", "id": "id_of_deployment_3"},
+            "entity": {"status": {"state": states.pop(0)}},
+        }
+
+    monkeypatch.setattr(mlflow_watsonml.deploy, "submit_deployment", submit_deployment)
+    monkeypatch.setattr(mlflow_watsonml.deploy, "poll_deployment", poll_deployment)
+
+    deployment_details = client.create_deployment(
+        name="deployment_3",
+        model_uri="runs:/run_id/model",
+        flavor="onnx",
+        config={"asynchronous": "true"},
+        endpoint="space_1",
+    )
+    handle = deployment_details["handle"]
+
+    assert submitted[0]["space_id"] == "id_of_space_1"
+    assert deployment_details["entity"]["status"]["state"] == "initializing"
+    assert handle.result(timeout=5)["entity"]["status"]["state"] == "ready"
+    assert handle.status() == "ready"
+    # the ready deployment replaces the initializing one in the cache
+    assert (
+        client.get_deployment(name="deployment_3", endpoint="space_1")["entity"][
+            "status"
+        ]["state"]
+        == "ready"
+    )
+
+
+def test_update_deployment_asynchronous(pipeline_client, monkeypatch: MonkeyPatch):
+    client, _ = pipeline_client
+    client._deployment_poller.initial_interval = 0.01
+    states = ["updating", "failed"]
+
+    def poll_deployment(client, space_id, deployment_id):
+        assert (space_id, deployment_id) == ("id_of_space_1", "id_of_deployment_1")
+        return {"entity": {"status": {"state": states.pop(0)}}}
+
+    monkeypatch.setattr(mlflow_watsonml.deploy, "poll_deployment", poll_deployment)
+
+    deployment_details = client.update_deployment(
+        name="deployment_1",
+        model_uri="runs:/run_id/model",
+        flavor="onnx",
+        config={"asynchronous": True},
+        endpoint="space_1",
+    )
+
+    with pytest.raises(MlflowException, match="failed with state failed"):
+        deployment_details["handle"].result(timeout=5)
+
+
+def test_update_deployment_refetches_patched_asset(monkeypatch: MonkeyPatch):
+    client = WatsonMLDeploymentClient(config=MOCK_WML_CREDENTIALS)
+    monkeypatch.setattr(
+        mlflow_watsonml.deploy,
+        "store_or_update_artifact",
+        lambda **kwargs: ("id_of_artifact_4", "1"),
+    )
+    monkeypatch.setattr(mlflow_watsonml.deploy, "get_mlflow_config", lambda: {})
+    monkeypatch.setattr(
+        WatsonMLDeploymentClient, "_get_software_spec_id", lambda *args, **kwargs: "id"
+    )
+
+    # the WML client returns None for the patch of the asset
+    deployment_details = client.update_deployment(
+        name="deployment_1",
+        model_uri="runs:/run_id/model",
+        flavor="onnx",
+        config={},
+        endpoint="space_1",
+    )
+
+    assert deployment_details["metadata"]["id"] == "id_of_deployment_1"
+    assert deployment_details["name"] == "deployment_1"
+    assert "stage_timings" in deployment_details
+
+
+def test_update_deployment_asynchronous_patches_custom(
+    pipeline_client, monkeypatch: MonkeyPatch
+):
+    client, _ = pipeline_client
+    client._deployment_poller.initial_interval = 0.01
+    updates = []
+    patched = []
+
+    def update_deployment(**kwargs):
+        updates.append(kwargs["environment_variables"])
+        return {}
+
+    def poll_deployment(client, space_id, deployment_id):
+        return {
+            "metadata": {"name": "deployment_1", "id": deployment_id},
+            "entity": {"status": {"state": "ready"}},
+        }
+
+    def patch_deployment_custom(client, space_id, deployment_id, environment_variables):
+        patched.append((space_id, deployment_id, environment_variables))
+        return {
+            "metadata": {"name": "deployment_1", "id": deployment_id},
+            "entity": {"status": {"state": "ready"}, "custom": environment_variables},
+        }
+
+    monkeypatch.setattr(mlflow_watsonml.deploy, "update_deployment", update_deployment)
+    monkeypatch.setattr(mlflow_watsonml.deploy, "poll_deployment", poll_deployment)
+    monkeypatch.setattr(
+        mlflow_watsonml.deploy, "patch_deployment_custom", patch_deployment_custom
+    )
+
+    deployment_details = client.update_deployment(
+        name="deployment_1",
+        model_uri="runs:/run_id/model",
+        flavor="onnx",
+        config={"asynchronous": True, "environment_mode": "deploy"},
+        endpoint="space_1",
+    )
+    details = deployment_details["handle"].result(timeout=5)
+
+    # the asset update doesn't carry the `custom` block
+    assert updates == [None]
+    assert patched == [("id_of_space_1", "id_of_deployment_1", {})]
+    assert details["entity"]["custom"] == {}
+
+
+def test_create_deployments(pipeline_client, monkeypatch: MonkeyPatch):
+    client, stored = pipeline_client
+    deployments = client._wml_client.deployments
+    list_calls = []
+    get_details = deployments.get_details
+
+    def counting_get_details(**kwargs):
+        list_calls.append(kwargs)
+        return get_details(**kwargs)
+
+    monkeypatch.setattr(deployments, "get_details", counting_get_details)
+
+    def failing_store(**kwargs):
+        if kwargs["artifact_name"] == "deployment_4_v1":
+            raise MlflowException("upload failed")
+
+        stored.append(kwargs["artifact_name"])
+        return ("id_of_artifact", "1")
+
+    monkeypatch.setattr(
+        mlflow_watsonml.deploy, "store_or_update_artifact", failing_store
+    )
+
+    results = client.create_deployments(
+        [
+            ("deployment_3", "runs:/run_id/model", "onnx", None, "space_1"),
+            ("deployment_4", "runs:/run_id/model", "onnx", None, "space_1"),
+            ("deployment_1", "runs:/run_id/model", "onnx", None, "space_1"),
+            ("deployment_3", "runs:/run_id/model", "onnx", None, "space_1"),
+            ("deployment_3", "runs:/run_id/model", "onnx", {}, "space_2"),
+            ("deployment_5", "runs:/run_id/model", "onnx", {}, "space_3"),
+        ],
+        max_workers=2,
+    )
+
+    assert [(result["name"], result["endpoint"]) for result in results] == [
+        ("deployment_3", "space_1"),
+        ("deployment_4", "space_1"),
+        ("deployment_1", "space_1"),
+        ("deployment_3", "space_1"),
+        ("deployment_3", "space_2"),
+        ("deployment_5", "space_3"),
+    ]
+    assert [result["error"] is None for result in results] == [
+        True,
+        False,
+        False,
+        False,
+        True,
+        False,
+    ]
+    assert "upload failed" in str(results[1]["error"])
+    assert "already exists" in str(results[2]["error"])
+    assert "more than once" in str(results[3]["error"])
+    assert "space_3" in str(results[5]["error"])
+    assert "stage_timings" in results[0]["deployment"]
+    assert all(result["seconds"] >= 0 for result in results)
+    assert sorted(stored) == ["deployment_3_v1", "deployment_3_v1"]
+    # the deployments are listed once per space
+    assert len(list_calls) == 2
+
+
 def test_create_deployment_success(monkeypatch: MonkeyPatch):
     ...
 
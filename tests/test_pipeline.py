@@ -0,0 +1,70 @@
+import threading
+import time
+
+import pytest
+from mlflow import MlflowException
+
+from mlflow_watsonml.pipeline import Pipeline
+
+
+def test_pipeline_passes_results():
+    pipeline = Pipeline()
+    pipeline.add("a", lambda results: 1)
+    pipeline.add("b", lambda results: 2)
+    pipeline.add("c", lambda results: results["a"] + results["b"], requires=("a", "b"))
+
+    results, timings = pipeline.run()
+
+    assert results == {"a": 1, "b": 2, "c": 3}
+    assert set(timings) == {"a", "b", "c", "total"}
+    assert all(seconds >= 0 for seconds in timings.values())
+
+
+def test_pipeline_runs_independent_stages_concurrently():
+    barrier = threading.Barrier(2, timeout=5)
+    pipeline = Pipeline()
+    pipeline.add("a", lambda results: barrier.wait())
+    pipeline.add("b", lambda results: barrier.wait())
+
+    # both stages only return once they run at the same time
+    results, _ = pipeline.run()
+
+    assert set(results) == {"a", "b"}
+
+
+def test_pipeline_skips_stages_after_failure():
+    started = []
+
+    def fail(results):
+        raise MlflowException("stage failed")
+
+    def slow(results):
+        time.sleep(0.05)
+        started.append("slow")
+
+    pipeline = Pipeline()
+    pipeline.add("fail", fail)
+    pipeline.add("slow", slow)
+    pipeline.add("after", lambda results: started.append("after"), requires=("fail",))
+
+    with pytest.raises(MlflowException, match="stage failed"):
+        pipeline.run()
+
+    # the running stage completes, the dependent one never starts
+    assert started == ["slow"]
+
+
+def test_pipeline_unknown_stage():
+    pipeline = Pipeline()
+    pipeline.add("a", lambda results: 1, requires=("b",))
+
+    with pytest.raises(MlflowException, match="requires unknown stages"):
+        pipeline.run()
+
+
+def test_pipeline_duplicate_stage():
+    pipeline = Pipeline()
+    pipeline.add("a", lambda results: 1)
+
+    with pytest.raises(MlflowException, match="already exists"):
+        pipeline.add("a", lambda results: 2)
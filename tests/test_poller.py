@@ -0,0 +1,141 @@
+import threading
+
+import pytest
+from mlflow import MlflowException
+
+from mlflow_watsonml.poller import DeploymentHandle, DeploymentPoller
+
+
+def deployment(state):
+    return {
+        "metadata": {"name": "deployment", "id": "id_of_deployment"},
+        "entity": {"status": {"state": state}},
+    }
+
+
+def states(*values):
+    """Returns a fetch function going through `values`, then repeating the last"""
+    values = list(values)
+
+    def fetch():
+        state = values.pop(0) if len(values) > 1 else values[0]
+
+        if isinstance(state, Exception):
+            raise state
+
+        return deployment(state)
+
+    return fetch
+
+
+@pytest.fixture
+def poller():
+    return DeploymentPoller(initial_interval=0.01, max_interval=0.02)
+
+
+def test_handle_ready(poller):
+    ready = []
+    handle = DeploymentHandle(
+        name="deployment",
+        deployment_id="id_of_deployment",
+        deployment_details=deployment("initializing"),
+        on_ready=ready.append,
+    )
+
+    assert handle.status() == "initializing"
+    assert not handle.done()
+
+    poller.watch(handle=handle, fetch=states("initializing", "ready"))
+
+    assert handle.result(timeout=5)["entity"]["status"]["state"] == "ready"
+    assert handle.status() == "ready"
+    assert handle.done()
+    assert ready == [handle.result()]
+
+
+def test_handle_failed(poller):
+    handle = DeploymentHandle(
+        name="deployment",
+        deployment_id="id_of_deployment",
+        deployment_details=deployment("initializing"),
+    )
+    poller.watch(handle=handle, fetch=states("initializing", "failed"))
+
+    assert handle.wait(timeout=5)
+
+    with pytest.raises(MlflowException, match="failed with state failed"):
+        handle.result()
+
+
+def test_handle_timeout():
+    poller = DeploymentPoller(initial_interval=0.01, max_interval=0.02)
+    handle = DeploymentHandle(
+        name="deployment",
+        deployment_id="id_of_deployment",
+        deployment_details=deployment("initializing"),
+    )
+    poller.watch(handle=handle, fetch=states("initializing"))
+
+    assert not handle.wait(timeout=0.05)
+
+    with pytest.raises(MlflowException, match="is not ready after"):
+        handle.result(timeout=0.01)
+
+    handle._fail(MlflowException("stop polling"))
+
+
+def test_poller_retries_failed_polls(poller):
+    handle = DeploymentHandle(
+        name="deployment",
+        deployment_id="id_of_deployment",
+        deployment_details=deployment("initializing"),
+    )
+    poller.watch(
+        handle=handle, fetch=states(Exception("timeout"), Exception("timeout"), "ready")
+    )
+
+    assert handle.result(timeout=5)["entity"]["status"]["state"] == "ready"
+
+    failing = DeploymentHandle(
+        name="deployment",
+        deployment_id="id_of_deployment",
+        deployment_details=deployment("initializing"),
+    )
+    poller.watch(handle=failing, fetch=states(Exception("timeout")))
+
+    with pytest.raises(MlflowException, match="Polling deployment"):
+        failing.result(timeout=5)
+
+
+def test_poller_shares_one_thread():
+    # the deployments are all watched before the first poll
+    poller = DeploymentPoller(initial_interval=0.5)
+    threads = set()
+    handles = []
+
+    def fetch():
+        threads.add(threading.get_ident())
+        return deployment("ready")
+
+    for idx in range(10):
+        handle = DeploymentHandle(
+            name=f"deployment_{idx}",
+            deployment_id=f"id_of_deployment_{idx}",
+            deployment_details=deployment("initializing"),
+        )
+        handles.append(poller.watch(handle=handle, fetch=fetch))
+
+    for handle in handles:
+        handle.result(timeout=5)
+
+    assert len(threads) == 1
+
+
+def test_poller_backoff_with_jitter():
+    poller = DeploymentPoller(initial_interval=1.0, max_interval=8.0, multiplier=2.0)
+
+    for attempt, interval in enumerate([1.0, 2.0, 4.0, 8.0, 8.0]):
+        delays = [poller._delay(attempt) for _ in range(50)]
+
+        assert all(interval / 2 <= delay <= interval for delay in delays)
+        assert len(set(delays)) > 1
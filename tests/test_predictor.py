@@ -0,0 +1,312 @@
+import asyncio
+from json import loads
+
+import numpy as np
+import pandas as pd
+import pytest
+from mlflow import MlflowException
+from pytest import MonkeyPatch
+from resources.mock.mock_client import MockAPIClient
+
+import mlflow_watsonml.deploy
+from mlflow_watsonml.deploy import WatsonMLDeploymentClient
+from mlflow_watsonml.predictor import AsyncTransport
+from mlflow_watsonml.scoring import STREAM_BATCH_ROWS
+
+MOCK_WML_CREDENTIALS = {
+    "username": "user",
+    "apikey": "correct_api_key",
+    "url": "https://url",
+    "instance_id": "wml",
+    "version": "1.0",
+}
+
+
+class MockResponse:
+    def __init__(self, status_code, payload):
+        self.status_code = status_code
+        self._payload = payload
+        self.text = str(payload)
+
+    def json(self):
+        return self._payload
+
+
+class MockSession:
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+        self.requests = []
+        self.closed = False
+
+    def post(self, url, json=None, data=None, params=None, headers=None):
+        if data is not None:
+            json = loads(b"".join(data))
+
+        self.requests.append(
+            {"url": url, "json": json, "params": params, "streamed": data is not None}
+        )
+
+        predictions = [
+            {"fields": ["prediction"], "values": data["values"]}
+            for data in json["input_data"]
+        ]
+        return MockResponse(self.status_code, {"predictions": predictions})
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def mock_client(monkeypatch: MonkeyPatch):
+    # Mock the APIClient
+    monkeypatch.setattr(mlflow_watsonml.deploy, "APIClient", MockAPIClient)
+    # the mock deployments are listed through the WML client
+    monkeypatch.setattr(
+        mlflow_watsonml.deploy,
+        "list_space_deployments",
+        lambda client, space_id: mlflow_watsonml.deploy.list_deployments(
+            client=client
+        ),
+    )
+
+
+def test_get_predictor_pins_deployment():
+    client = WatsonMLDeploymentClient(config=MOCK_WML_CREDENTIALS)
+    session = MockSession()
+
+    predictor = client.get_predictor(
+        deployment_name="deployment_1", endpoint="space_1", session=session
+    )
+
+    assert predictor.space_id == "id_of_space_1"
+    assert predictor.deployment_id == "id_of_deployment_1"
+    assert predictor.scoring_url.endswith(
+        "/ml/v4/deployments/id_of_deployment_1/predictions"
+    )
+
+
+def test_predictor_predict_skips_resolution():
+    client = WatsonMLDeploymentClient(config=MOCK_WML_CREDENTIALS)
+    session = MockSession()
+
+    predictor = client.get_predictor(
+        deployment_name="deployment_1", endpoint="space_1", session=session
+    )
+
+    def fail(*args, **kwargs):
+        raise AssertionError("unexpected WML call")
+
+    client._wml_client.spaces.get_details = fail
+    client._wml_client.deployments.get_details = fail
+    client._wml_client.set.default_space = fail
+
+    predictions = predictor.predict([[1], [2]])
+
+    assert predictions["prediction"].tolist() == [1, 2]
+    assert len(session.requests) == 1
+    assert session.requests[0]["params"]["space_id"] == "id_of_space_1"
+
+
+def test_predictor_predict_many():
+    client = WatsonMLDeploymentClient(config=MOCK_WML_CREDENTIALS)
+    session = MockSession()
+
+    with client.get_predictor(
+        deployment_name="deployment_1", endpoint="space_1", session=session
+    ) as predictor:
+        predictions = predictor.predict_many([[[1]], [[2], [3]]])
+
+    assert len(session.requests) == 1
+    assert [len(prediction) for prediction in predictions] == [1, 2]
+    assert session.closed
+
+
+def test_predictor_streams_large_payloads():
+    client = WatsonMLDeploymentClient(config=MOCK_WML_CREDENTIALS)
+    session = MockSession()
+
+    predictor = client.get_predictor(
+        deployment_name="deployment_1", endpoint="space_1", session=session
+    )
+
+    n_rows = STREAM_BATCH_ROWS + 5
+    inputs = pd.DataFrame({"x": np.arange(n_rows, dtype=float)})
+    inputs.loc[3, "x"] = np.nan
+
+    predictions = predictor.predict(inputs)
+
+    assert session.requests[0]["streamed"]
+    assert session.requests[0]["json"]["input_data"][0]["fields"] == ["x"]
+    assert session.requests[0]["json"]["input_data"][0]["values"][3] == [None]
+    assert len(predictions) == n_rows
+
+
+def test_predictor_predict_exception():
+    client = WatsonMLDeploymentClient(config=MOCK_WML_CREDENTIALS)
+
+    predictor = client.get_predictor(
+        deployment_name="deployment_1",
+        endpoint="space_1",
+        session=MockSession(status_code=500),
+    )
+
+    with pytest.raises(MlflowException):
+        _ = predictor.predict([[1]])
+
+
+class MockAsyncResponse:
+    def __init__(self, status, payload):
+        self.status = status
+        self._payload = payload
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return None
+
+    async def json(self, content_type=None):
+        return self._payload
+
+    async def text(self):
+        return str(self._payload)
+
+
+class MockAsyncSession:
+    def __init__(self):
+        self.requests = []
+        self.closed = False
+
+    def post(self, url, json=None, params=None, headers=None):
+        self.requests.append({"url": url, "json": json, "params": params})
+
+        predictions = [{"values": data["values"]} for data in json["input_data"]]
+        return MockAsyncResponse(200, {"predictions": predictions})
+
+    async def close(self):
+        self.closed = True
+
+
+def test_apredict_shares_transport():
+    client = WatsonMLDeploymentClient(
+        config=MOCK_WML_CREDENTIALS, max_inflight_requests=2
+    )
+    session = MockAsyncSession()
+    client._async_transport = AsyncTransport(
+        max_inflight=2, session_factory=lambda: session
+    )
+
+    async def run():
+        results = await asyncio.gather(
+            *[
+                client.apredict(
+                    deployment_name="deployment_1", inputs=[[i]], endpoint="space_1"
+                )
+                for i in range(10)
+            ]
+        )
+        predictors = len(client._async_predictors)
+        await client.aclose()
+        return results, predictors
+
+    results, predictors = asyncio.run(run())
+
+    assert [result[0]["values"] for result in results] == [[[i]] for i in range(10)]
+    assert len(session.requests) == 10
+    assert predictors == 1
+    assert len(client._async_predictors) == 0
+
+
+def test_transport_closes_session_of_previous_loop():
+    sessions = []
+
+    def session_factory():
+        sessions.append(MockAsyncSession())
+        return sessions[-1]
+
+    transport = AsyncTransport(max_inflight=2, session_factory=session_factory)
+    payload = {"input_data": [{"values": [[1]]}]}
+
+    for _ in range(2):
+        # each `asyncio.run` has its own event loop
+        asyncio.run(transport.post_json("https://url", payload, {}, {}))
+
+    assert [session.closed for session in sessions] == [True, False]
+
+    asyncio.run(transport.close())
+
+    assert sessions[1].closed
+
+
+def test_apredict_many():
+    client = WatsonMLDeploymentClient(config=MOCK_WML_CREDENTIALS)
+    session = MockAsyncSession()
+    client._async_transport = AsyncTransport(session_factory=lambda: session)
+
+    results = asyncio.run(
+        client.apredict_many(
+            deployment_name="deployment_2", inputs=[[[1]], [[2]]], endpoint="space_1"
+        )
+    )
+
+    assert results == [[{"values": [[1]]}], [{"values": [[2]]}]]
+    assert len(session.requests) == 1
+
+
+def test_aget_deployment_exception():
+    client = WatsonMLDeploymentClient(config=MOCK_WML_CREDENTIALS)
+
+    with pytest.raises(MlflowException):
+        _ = asyncio.run(client.aget_deployment(name="deployment_3", endpoint="space_1"))
+
+
+def test_aget_deployment_keeps_default_space():
+    client = WatsonMLDeploymentClient(config=MOCK_WML_CREDENTIALS)
+    client.get_wml_client(endpoint="space_1")
+    client.get_deployment(name="deployment_1", endpoint="space_1")
+
+    async def run():
+        return await asyncio.gather(
+            client.aget_deployment(name="deployment_1", endpoint="space_1"),
+            client.aget_deployment(name="deployment_2", endpoint="space_2"),
+        )
+
+    deployments = asyncio.run(run())
+
+    assert [deployment["name"] for deployment in deployments] == [
+        "deployment_1",
+        "deployment_2",
+    ]
+    # each index is keyed by the space it was listed in
+    assert client._deployment_cache.get("id_of_space_1") is not None
+    assert client._deployment_cache.get("id_of_space_2") is not None
+
+
+def test_cache_deployment_drops_async_predictor():
+    client = WatsonMLDeploymentClient(config=MOCK_WML_CREDENTIALS)
+    session = MockAsyncSession()
+    client._async_transport = AsyncTransport(session_factory=lambda: session)
+
+    asyncio.run(
+        client.apredict(
+            deployment_name="deployment_1", inputs=[[1]], endpoint="space_1"
+        )
+    )
+    assert len(client._async_predictors) == 1
+
+    client._cache_deployment(
+        space_uid="id_of_space_1",
+        name="deployment_1",
+        deployment_details=client.get_deployment(
+            name="deployment_1", endpoint="space_1"
+        ),
+    )
+    assert len(client._async_predictors) == 0
+
+    asyncio.run(
+        client.apredict(
+            deployment_name="deployment_1", inputs=[[1]], endpoint="space_1"
+        )
+    )
+    client._uncache_deployment(space_uid="id_of_space_1", name="deployment_1")
+    assert len(client._async_predictors) == 0
@@ -0,0 +1,186 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mlflow_watsonml.scoring import *
+
+
+def echo_score(data):
+    # mimics a deployment that returns the input rows as `fields`/`values`
+    if isinstance(data, pd.DataFrame):
+        return decode_predictions(
+            [{"fields": list(data.columns), "values": data.values.tolist()}]
+        )
+    return [{"values": np.asarray(data).tolist()}]
+
+
+def test_encode_inputs_dataframe():
+    inputs = pd.DataFrame(
+        {
+            "i": [1, 2, 3],
+            "f": [0.5, np.nan, 1.5],
+            "c": pd.Categorical(["a", None, "b"]),
+            "t": pd.to_datetime(["2023-01-01", None, "2023-01-03"]),
+            "s": ["x", None, "z"],
+        }
+    )
+
+    entry = encode_inputs(inputs)
+
+    assert entry["fields"] == ["i", "f", "c", "t", "s"]
+    assert [row[:3] + row[4:] for row in entry["values"]] == [
+        [1, 0.5, "a", "x"],
+        [2, None, None, None],
+        [3, 1.5, "b", "z"],
+    ]
+    assert pd.Timestamp(entry["values"][0][3]) == pd.Timestamp("2023-01-01")
+    assert entry["values"][1][3] is None
+    assert isinstance(entry["values"][0][0], int)
+    json.dumps(entry, allow_nan=False)
+
+
+def test_encode_inputs_ndarray():
+    assert encode_inputs(np.array([[1.0, np.nan]])) == {"values": [[1.0, None]]}
+    assert encode_inputs(np.array([[1, 2]])) == {"values": [[1, 2]]}
+
+
+def test_encode_inputs_record_array():
+    inputs = np.array([(1, 2.5), (2, 3.5)], dtype=[("a", "i8"), ("b", "f8")])
+
+    assert encode_inputs(inputs) == {
+        "fields": ["a", "b"],
+        "values": [[1, 2.5], [2, 3.5]],
+    }
+
+
+def test_encode_inputs_dict_of_arrays():
+    entry = encode_inputs({"a": np.array([1, 2]), "b": ["x", "y"]})
+
+    assert entry == {"fields": ["a", "b"], "values": [[1, "x"], [2, "y"]]}
+
+
+def test_encode_inputs_list_unchanged():
+    inputs = [[1, "a"], [2, "b"]]
+
+    assert encode_inputs(inputs) == {"values": inputs}
+
+
+def test_iter_json_payload_matches_json_dumps():
+    inputs = pd.DataFrame({"a": range(25), "b": np.linspace(0, 1, 25)})
+    payload = {
+        "input_data": [encode_inputs(inputs, tolist=False)],
+        "environment_variables": {"KEY": "value"},
+    }
+
+    streamed = b"".join(iter_json_payload(payload, batch_rows=7))
+
+    assert json.loads(streamed) == {
+        "input_data": [encode_inputs(inputs)],
+        "environment_variables": {"KEY": "value"},
+    }
+
+
+def test_decode_predictions_numeric_fast_path():
+    predictions = [{"fields": ["a", "b"], "values": [[1.0, 2.0], [3.0, 4.0]]}]
+
+    frame = decode_predictions(predictions)
+
+    assert list(frame.columns) == ["a", "b"]
+    assert frame.dtypes.tolist() == [np.float64, np.float64]
+    np.testing.assert_array_equal(
+        decode_predictions(predictions, output_format="numpy"), [[1, 2], [3, 4]]
+    )
+
+
+def test_decode_predictions_mixed_columns():
+    predictions = [
+        {"fields": ["label", "score", "probs"], "values": [[1, 0.5, [0.5, 0.5]]]},
+        {"fields": ["label", "score", "probs"], "values": [[0, None, [0.9, 0.1]]]},
+    ]
+
+    frame = decode_predictions(predictions)
+
+    assert frame["label"].dtype == np.int64
+    assert frame["score"].dtype == np.float64
+    assert np.isnan(frame["score"][1])
+    assert frame["probs"][1] == [0.9, 0.1]
+
+
+def test_decode_predictions_schema_dtypes():
+    predictions = [{"fields": ["label"], "values": [[1], [0]]}]
+
+    frame = decode_predictions(predictions, schema={"label": "int32"})
+
+    assert frame["label"].dtype == np.int32
+
+
+def test_decode_predictions_invalid_format():
+    with pytest.raises(MlflowException):
+        _ = decode_predictions([], output_format="csv")
+
+
+def test_decode_predictions_without_fields():
+    predictions = [{"values": [1, 2]}]
+
+    assert decode_predictions(predictions, output_format="numpy") == predictions
+
+
+def test_get_chunk_bounds_rows():
+    assert get_chunk_bounds(list(range(5)), chunk_rows=2) == [(0, 2), (2, 4), (4, 5)]
+
+
+def test_get_chunk_bounds_bytes():
+    inputs = np.zeros((100, 10))
+
+    bounds = get_chunk_bounds(inputs, chunk_bytes=estimate_row_size(inputs) * 30)
+
+    assert bounds[0] == (0, 30)
+    assert bounds[-1][1] == 100
+
+
+def test_get_chunk_bounds_exception():
+    with pytest.raises(MlflowException):
+        _ = get_chunk_bounds("not rows", chunk_rows=2)
+
+
+def test_score_in_chunks_dataframe_order():
+    inputs = pd.DataFrame({"a": range(10), "b": range(10, 20)})
+
+    predictions = score_in_chunks(echo_score, inputs, chunk_rows=3, max_workers=3)
+
+    pd.testing.assert_frame_equal(predictions, inputs)
+
+
+def test_score_in_chunks_list_shape():
+    inputs = [[i] for i in range(7)]
+
+    predictions = score_in_chunks(echo_score, inputs, chunk_rows=2)
+
+    assert predictions == echo_score(inputs)
+
+
+def test_merge_predictions_values():
+    results = [[{"values": [[0], [1]]}], [{"values": [[2]]}]]
+
+    assert merge_predictions(results) == [{"values": [[0], [1], [2]]}]
+
+
+def test_merge_predictions_without_values():
+    results = [[{"label": 0}], [{"label": 1}]]
+
+    assert merge_predictions(results) == [{"label": 0}, {"label": 1}]
+
+
+def test_score_in_chunks_reports_failed_chunks():
+    def failing_score(data):
+        if data[0][0] >= 4:
+            raise ValueError("boom")
+        return echo_score(data)
+
+    with pytest.raises(ChunkedScoringError) as e:
+        _ = score_in_chunks(failing_score, [[i] for i in range(6)], chunk_rows=2)
+
+    assert list(e.value.errors.keys()) == [(4, 6)]
+    assert "rows 4-5" in e.value.message
@@ -0,0 +1,1028 @@
+import base64
+import gzip
+import io
+import os
+import pathlib
+import shutil
+import sys
+import tarfile
+import threading
+import types
+
+import mlflow
+import mlflow.pyfunc
+import mlflow.sklearn
+import numpy as np
+import pandas as pd
+import pytest
+from ibm_watson_machine_learning.functions import Functions
+from mlflow import MlflowException
+from mlflow.entities import FileInfo
+from mlflow.models import ModelSignature
+from mlflow.types import ColSpec, Schema, TensorSpec
+from pytest import MonkeyPatch
+
+import mlflow_watsonml.store
+from mlflow_watsonml.store import *
+
+
+def serialize_scorer(deployable_function):
+    """Serializes a deployable function the way the WML client uploads it and
+    returns the `score` function of the uploaded code"""
+    archive = Functions._prepare_function_content(deployable_function)[0]
+
+    try:
+        with gzip.open(archive, "rt") as f:
+            code = f.read()
+    finally:
+        os.remove(archive)
+
+    namespace = {}
+    exec(code, namespace)
+
+    return namespace["score"]
+
+
+class MockInferenceSession:
+    instances = 0
+    inputs = []
+    sessions = []
+
+    def __init__(self, model, sess_options=None, **kwargs):
+        MockInferenceSession.instances += 1
+        self.model = model
+        self.sess_options = sess_options
+        MockInferenceSession.sessions.append(self)
+
+        optimized_file = getattr(sess_options, "optimized_model_filepath", None)
+        if optimized_file is not None:
+            with open(optimized_file, "wb") as f:
+                f.write(b"optimized model")
+
+    def get_inputs(self):
+        return [
+            types.SimpleNamespace(name="input", type="tensor(float)", shape=["N", 2])
+        ]
+
+    def run(self, output_names, input_feed):
+        (values,) = input_feed.values()
+        MockInferenceSession.inputs.append(values)
+        return [np.asarray(values) * 2]
+
+
+class MockSessionOptions:
+    def __init__(self):
+        self.config_entries = {}
+
+    def add_session_config_entry(self, key, value):
+        self.config_entries[key] = value
+
+
+@pytest.fixture
+def artifact_store(monkeypatch: MonkeyPatch, tmp_path):
+    """Fakes `mlflow.artifacts.download_artifacts` with a local model directory and
+    returns the model directory, a cache directory and the list of downloads"""
+    model_dir = tmp_path / "model"
+    model_dir.mkdir()
+    (model_dir / "MLmodel").write_text("model_uuid: 1234")
+    (model_dir / "model.onnx").write_bytes(b"model")
+
+    downloads = []
+
+    def download_artifacts(artifact_uri, dst_path=None):
+        if artifact_uri.endswith("/MLmodel"):
+            return str(model_dir / "MLmodel")
+
+        downloads.append(artifact_uri)
+        if dst_path is None:
+            return str(model_dir)
+
+        return shutil.copytree(model_dir, os.path.join(dst_path, "model"))
+
+    def list_artifacts(artifact_uri):
+        return [
+            FileInfo(path=path.name, is_dir=False, file_size=path.stat().st_size)
+            for path in model_dir.iterdir()
+        ]
+
+    monkeypatch.setattr(mlflow.artifacts, "download_artifacts", download_artifacts)
+    monkeypatch.setattr(mlflow.artifacts, "list_artifacts", list_artifacts)
+
+    return types.SimpleNamespace(
+        model_dir=model_dir, cache_dir=str(tmp_path / "cache"), downloads=downloads
+    )
+
+
+@pytest.fixture
+def onnx_scorer(request, monkeypatch: MonkeyPatch, artifact_store):
+    """Builds the deployable ONNX scorer against fake onnx/onnxruntime modules and
+    returns it with a counter of model downloads"""
+    MockInferenceSession.instances = 0
+    MockInferenceSession.inputs = []
+    MockInferenceSession.sessions = []
+    downloads = artifact_store.downloads
+
+    def value_info(name, elem_type, dims):
+        dims = [
+            types.SimpleNamespace(
+                dim_value=dim if isinstance(dim, int) else 0,
+                dim_param=dim if isinstance(dim, str) else "",
+                HasField=lambda field, dim=dim: isinstance(dim, int),
+            )
+            for dim in dims
+        ]
+        tensor_type = types.SimpleNamespace(
+            elem_type=elem_type, shape=types.SimpleNamespace(dim=dims)
+        )
+        return types.SimpleNamespace(
+            name=name, type=types.SimpleNamespace(tensor_type=tensor_type)
+        )
+
+    graph = types.SimpleNamespace(
+        input=[value_info("input", 1, ["", 2]), value_info("weight", 1, [2])],
+        output=[value_info("output", 1, ["N", 2])],
+        initializer=[types.SimpleNamespace(name="weight")],
+    )
+    model = types.SimpleNamespace(graph=graph)
+
+    onnx = types.ModuleType("onnx")
+    onnx.TensorProto = types.SimpleNamespace(
+        DataType=types.SimpleNamespace(Name={1: "FLOAT"}.get)
+    )
+    onnx.checker = types.SimpleNamespace(check_model=lambda model_file: None)
+    onnx.load = lambda model_file, **kwargs: model
+    onnxruntime = types.ModuleType("onnxruntime")
+    onnxruntime.InferenceSession = MockInferenceSession
+    onnxruntime.SessionOptions = MockSessionOptions
+    onnxruntime.GraphOptimizationLevel = types.SimpleNamespace(
+        ORT_DISABLE_ALL=0, ORT_ENABLE_BASIC=1, ORT_ENABLE_EXTENDED=2, ORT_ENABLE_ALL=99
+    )
+    onnxruntime.ExecutionMode = types.SimpleNamespace(ORT_SEQUENTIAL=0, ORT_PARALLEL=1)
+
+    monkeypatch.setitem(sys.modules, "onnx", onnx)
+    monkeypatch.setitem(sys.modules, "onnxruntime", onnxruntime)
+
+    stored = {}
+
+    def store_function(client, deployable_function, **kwargs):
+        stored["function"] = deployable_function
+        stored["custom"] = kwargs.get("custom")
+        return ("function_id", "1")
+
+    monkeypatch.setattr(
+        mlflow_watsonml.store, "store_or_update_function", store_function
+    )
+
+    store_onnx_artifact(
+        client=None,
+        model_uri="runs:/run_id/model",
+        artifact_name="artifact",
+        software_spec_id="sw_spec_id",
+        scorer_config={
+            "artifact_cache_dir": artifact_store.cache_dir,
+            "artifact_packaging": "download",
+            **getattr(request, "param", {}),
+        },
+    )
+
+    assert stored["custom"] == {
+        "onnx_graph": {
+            "inputs": [{"name": "input", "type": "tensor(float)", "shape": ["", 2]}],
+            "outputs": [
+                {"name": "output", "type": "tensor(float)", "shape": ["N", 2]}
+            ],
+        }
+    }
+
+    # only count the downloads of the scorer, not the one of the store time check
+    downloads.clear()
+
+    return stored["function"], downloads
+
+
+def test_onnx_scorer_loads_model_once(onnx_scorer):
+    scorer, downloads = onnx_scorer
+    score = scorer()
+
+    for _ in range(3):
+        output = score({"input_data": [{"values": [[1.0, 2.0]]}]})
+
+    assert output == {"predictions": [{"values": [[2.0, 4.0]]}]}
+    assert downloads == ["runs:/run_id/model"]
+    assert MockInferenceSession.instances == 1
+
+
+def test_onnx_scorer_concurrent_first_requests(onnx_scorer):
+    scorer, downloads = onnx_scorer
+    score = scorer()
+
+    threads = [
+        threading.Thread(target=score, args=({"input_data": [{"values": [[1.0]]}]},))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(downloads) == 1
+    assert MockInferenceSession.instances == 1
+
+
+def test_onnx_scorer_batches_entries(onnx_scorer):
+    scorer, _ = onnx_scorer
+    score = scorer()
+
+    output = score(
+        {
+            "input_data": [
+                {"values": [[1, 2]]},
+                {"values": [[3, 4], [5, 6]]},
+            ]
+        }
+    )
+
+    assert output == {
+        "predictions": [
+            {"values": [[2.0, 4.0]]},
+            {"values": [[6.0, 8.0], [10.0, 12.0]]},
+        ]
+    }
+    assert len(MockInferenceSession.inputs) == 1
+    (batch,) = MockInferenceSession.inputs
+    assert batch.dtype == np.float32
+    assert batch.shape == (3, 2)
+    assert batch.flags["C_CONTIGUOUS"]
+
+
+@pytest.mark.parametrize(
+    "onnx_scorer", [{"onnx_max_batch_size": 2}], indirect=True
+)
+def test_onnx_scorer_max_batch_size(onnx_scorer):
+    scorer, _ = onnx_scorer
+    score = scorer()
+
+    output = score(
+        {
+            "input_data": [
+                {"values": [[1, 2]]},
+                {"values": [[3, 4]]},
+                {"values": [[5, 6]]},
+            ]
+        }
+    )
+
+    assert [len(p["values"]) for p in output["predictions"]] == [1, 1, 1]
+    assert [len(batch) for batch in MockInferenceSession.inputs] == [2, 1]
+
+
+@pytest.mark.parametrize(
+    "onnx_scorer", [{"onnx_max_batch_size": 2}], indirect=True
+)
+def test_onnx_scorer_splits_large_entry(onnx_scorer):
+    scorer, _ = onnx_scorer
+    score = scorer()
+
+    output = score(
+        {
+            "input_data": [
+                {"values": [[1, 2], [3, 4], [5, 6], [7, 8], [9, 10]]},
+            ]
+        }
+    )
+
+    assert output == {
+        "predictions": [
+            {
+                "values": [
+                    [2.0, 4.0],
+                    [6.0, 8.0],
+                    [10.0, 12.0],
+                    [14.0, 16.0],
+                    [18.0, 20.0],
+                ]
+            }
+        ]
+    }
+    assert [len(batch) for batch in MockInferenceSession.inputs] == [2, 2, 1]
+
+
+@pytest.mark.parametrize(
+    "onnx_scorer",
+    [
+        {
+            "onnx_session_options": {
+                "intra_op_num_threads": 2,
+                "graph_optimization_level": "extended",
+                "execution_mode": "parallel",
+            }
+        }
+    ],
+    indirect=True,
+)
+def test_onnx_scorer_session_options(onnx_scorer, artifact_store):
+    scorer, _ = onnx_scorer
+    cache_dir = pathlib.Path(artifact_store.cache_dir)
+
+    output = scorer()({"input_data": [{"values": [[1, 2]]}]})
+    (optimized_model_file,) = cache_dir.glob("*/model/model.*.optimized.onnx")
+
+    # a cold start of another worker reuses the optimized graph
+    scorer()({"input_data": [{"values": [[1, 2]]}]})
+
+    first, second = MockInferenceSession.sessions
+
+    assert output == {"predictions": [{"values": [[2.0, 4.0]]}]}
+    assert optimized_model_file.read_bytes() == b"optimized model"
+    assert not list(cache_dir.glob("*/model/*.tmp"))
+
+    assert first.sess_options.intra_op_num_threads == 2
+    assert first.sess_options.execution_mode == 1
+    assert first.sess_options.graph_optimization_level == 2
+
+    assert second.model == str(optimized_model_file)
+    assert second.sess_options.graph_optimization_level == 0
+
+
+def test_onnx_scorer_loads_session_from_file(onnx_scorer, monkeypatch):
+    scorer, _ = onnx_scorer
+
+    def fail(*args, **kwargs):
+        raise AssertionError("the model protobuf must not be loaded")
+
+    monkeypatch.setattr(sys.modules["onnx"], "load", fail)
+
+    scorer()({"input_data": [{"values": [[1, 2]]}]})
+
+    (sess,) = MockInferenceSession.sessions
+    assert sess.model.endswith(os.path.join("model", "model.onnx"))
+    assert open(sess.model, "rb").read() == b"model"
+
+
+@pytest.mark.parametrize(
+    "onnx_scorer,checks",
+    [({}, 0), ({"onnx_validate_model": "true"}, 1)],
+    indirect=["onnx_scorer"],
+)
+def test_onnx_scorer_validation(onnx_scorer, checks, monkeypatch):
+    scorer, _ = onnx_scorer
+    checked = []
+
+    monkeypatch.setattr(sys.modules["onnx"].checker, "check_model", checked.append)
+
+    score = scorer()
+    score({"input_data": [{"values": [[1, 2]]}]})
+    score({"input_data": [{"values": [[1, 2]]}]})
+
+    assert len(checked) == checks
+
+
+def test_inspect_onnx_model(monkeypatch: MonkeyPatch, tmp_path):
+    onnx = pytest.importorskip("onnx")
+    from onnx import TensorProto, helper
+
+    graph = helper.make_graph(
+        [helper.make_node("Add", ["input", "bias"], ["output"])],
+        "graph",
+        [helper.make_tensor_value_info("input", TensorProto.DOUBLE, ["batch", 3])],
+        [helper.make_tensor_value_info("output", TensorProto.DOUBLE, ["batch", 3])],
+        initializer=[helper.make_tensor("bias", TensorProto.DOUBLE, [3], [1, 2, 3])],
+    )
+    onnx.save(helper.make_model(graph), str(tmp_path / "model.onnx"))
+
+    monkeypatch.setattr(
+        mlflow.artifacts,
+        "download_artifacts",
+        lambda artifact_uri, dst_path=None: str(tmp_path),
+    )
+
+    assert inspect_onnx_model(model_uri="runs:/run_id/model") == {
+        "inputs": [{"name": "input", "type": "tensor(double)", "shape": ["batch", 3]}],
+        "outputs": [
+            {"name": "output", "type": "tensor(double)", "shape": ["batch", 3]}
+        ],
+    }
+
+
+def test_inspect_onnx_model_invalid(monkeypatch: MonkeyPatch, tmp_path):
+    pytest.importorskip("onnx")
+
+    (tmp_path / "model.onnx").write_bytes(b"not a model")
+
+    monkeypatch.setattr(
+        mlflow.artifacts,
+        "download_artifacts",
+        lambda artifact_uri, dst_path=None: str(tmp_path),
+    )
+
+    with pytest.raises(MlflowException):
+        inspect_onnx_model(model_uri="runs:/run_id/model")
+
+
+class MockPrediction:
+    def __init__(self, value):
+        self.value = value
+
+    def to_dict(self):
+        return {"text": self.value}
+
+
+class MockWatsonNLPModel:
+    def __init__(self):
+        self.batches = []
+
+    def run_batch(self, values):
+        self.batches.append(list(values))
+        return [MockPrediction(value) for value in values]
+
+
+@pytest.fixture
+def watson_nlp_scorer(monkeypatch: MonkeyPatch, artifact_store):
+    """Builds the deployable Watson NLP scorer against a fake watson_nlp module and
+    returns it with the list of loaded models"""
+    models = []
+
+    def load(artifact_file):
+        models.append(MockWatsonNLPModel())
+        return models[-1]
+
+    watson_nlp = types.ModuleType("watson_nlp")
+    watson_nlp.load = load
+    monkeypatch.setitem(sys.modules, "watson_nlp", watson_nlp)
+
+    stored = {}
+
+    def store_function(client, deployable_function, **kwargs):
+        stored["function"] = deployable_function
+        return ("function_id", "1")
+
+    monkeypatch.setattr(
+        mlflow_watsonml.store, "store_or_update_function", store_function
+    )
+
+    store_watson_nlp_artifact(
+        client=None,
+        model_uri="runs:/run_id/model",
+        artifact_name="artifact",
+        software_spec_id="sw_spec_id",
+        scorer_config={
+            "artifact_cache_dir": artifact_store.cache_dir,
+            "artifact_packaging": "download",
+        },
+    )
+
+    return stored["function"](), models
+
+
+def test_watson_nlp_scorer_loads_model_once(watson_nlp_scorer):
+    score, models = watson_nlp_scorer
+
+    for _ in range(3):
+        output = score({"input_data": [{"values": ["a"]}]})
+
+    assert output == {"predictions": [{"values": [{"text": "a"}]}]}
+    assert len(models) == 1
+
+
+def test_watson_nlp_scorer_batches_entries(watson_nlp_scorer):
+    score, models = watson_nlp_scorer
+
+    output = score(
+        {"input_data": [{"values": ["a", "b"]}, {"values": []}, {"values": ["c"]}]}
+    )
+
+    assert output == {
+        "predictions": [
+            {"values": [{"text": "a"}, {"text": "b"}]},
+            {"values": []},
+            {"values": [{"text": "c"}]},
+        ]
+    }
+    assert models[0].batches == [["a", "b", "c"]]
+
+
+@pytest.mark.parametrize(
+    "onnx_scorer", [{"onnx_session_options": {"intra_op_num_threads": 1}}], indirect=True
+)
+def test_onnx_scorer_is_serializable(onnx_scorer):
+    scorer, _ = onnx_scorer
+
+    score = serialize_scorer(scorer)
+
+    assert score({"input_data": [{"values": [[1, 2]]}]}) == {
+        "predictions": [{"values": [[2.0, 4.0]]}]
+    }
+
+
+def test_scorers_share_artifact_cache(onnx_scorer, artifact_store):
+    scorer, downloads = onnx_scorer
+
+    # cold starts of several workers on the same host download the model once
+    for _ in range(3):
+        scorer()({"input_data": [{"values": [[1, 2]]}]})
+
+    assert downloads == ["runs:/run_id/model"]
+    assert MockInferenceSession.instances == 3
+
+
+@pytest.mark.parametrize(
+    "onnx_scorer",
+    [{"artifact_packaging": "auto"}, {"artifact_packaging": "bundle"}],
+    indirect=True,
+)
+def test_onnx_scorer_bundles_model(onnx_scorer, monkeypatch):
+    scorer, downloads = onnx_scorer
+
+    def fail(*args, **kwargs):
+        raise AssertionError("a bundled model must not be downloaded")
+
+    monkeypatch.setattr(mlflow.artifacts, "download_artifacts", fail)
+
+    score = serialize_scorer(scorer)
+    score({"input_data": [{"values": [[1, 2]]}]})
+
+    (sess,) = MockInferenceSession.sessions
+    assert open(sess.model, "rb").read() == b"model"
+    assert downloads == []
+
+
+@pytest.mark.parametrize(
+    "onnx_scorer",
+    [{"artifact_packaging": "auto", "artifact_bundle_max_bytes": 4}],
+    indirect=True,
+)
+def test_onnx_scorer_downloads_large_model(onnx_scorer):
+    scorer, downloads = onnx_scorer
+
+    scorer()({"input_data": [{"values": [[1, 2]]}]})
+
+    assert downloads == ["runs:/run_id/model"]
+
+
+def test_get_model_size(monkeypatch: MonkeyPatch):
+    listing = {
+        "runs:/run_id/model": [
+            FileInfo(path="model/MLmodel", is_dir=False, file_size=10),
+            FileInfo(path="model/data", is_dir=True, file_size=None),
+        ],
+        "runs:/run_id/model/data": [
+            FileInfo(path="model/data/weights.bin", is_dir=False, file_size=100),
+        ],
+    }
+    monkeypatch.setattr(
+        mlflow.artifacts, "list_artifacts", lambda artifact_uri: listing[artifact_uri]
+    )
+
+    assert get_model_size(model_uri="runs:/run_id/model") == 110
+
+
+def test_get_artifact_cache_args_skips_large_model_download(artifact_store):
+    cache_args = get_artifact_cache_args(
+        model_uri="runs:/run_id/model",
+        scorer_config={"artifact_packaging": "auto", "artifact_bundle_max_bytes": 4},
+    )
+
+    assert cache_args["bundle"] == ""
+    assert artifact_store.downloads == []
+
+
+def test_bundle_model(tmp_path):
+    model_dir = tmp_path / "artifacts"
+    (model_dir / "data").mkdir(parents=True)
+    (model_dir / "data" / "weights.bin").write_bytes(b"weights")
+
+    bundle = bundle_model(model_path=str(model_dir))
+
+    with tarfile.open(fileobj=io.BytesIO(base64.b64decode(bundle))) as tar:
+        tar.extractall(tmp_path / "extracted")
+
+    extracted = tmp_path / "extracted" / "model" / "data" / "weights.bin"
+    assert extracted.read_bytes() == b"weights"
+
+
+class MockPyfuncModel:
+    def __init__(self):
+        self.inputs = []
+
+    def predict(self, data):
+        self.inputs.append(data)
+
+        if isinstance(data, np.ndarray):
+            return data.sum(axis=1)
+
+        return pd.DataFrame({"prediction": data["a"] + data["b"]})
+
+
+@pytest.fixture
+def pyfunc_scorer(request, monkeypatch: MonkeyPatch, artifact_store):
+    """Builds the deployable python_function scorer against a fake pyfunc model and
+    returns it with the list of loaded models"""
+    signature = getattr(request, "param", None)
+    models = []
+
+    def load_model(model_uri):
+        models.append(MockPyfuncModel())
+        return models[-1]
+
+    monkeypatch.setattr(mlflow.pyfunc, "load_model", load_model)
+    monkeypatch.setattr(
+        mlflow.models,
+        "get_model_info",
+        lambda model_uri: types.SimpleNamespace(signature=signature),
+    )
+
+    stored = {}
+
+    def store_function(client, deployable_function, **kwargs):
+        stored["function"] = deployable_function
+        return ("function_id", "1")
+
+    monkeypatch.setattr(
+        mlflow_watsonml.store, "store_or_update_function", store_function
+    )
+
+    store_pyfunc_artifact(
+        client=None,
+        model_uri="runs:/run_id/model",
+        artifact_name="artifact",
+        software_spec_id="sw_spec_id",
+        scorer_config={"artifact_cache_dir": artifact_store.cache_dir},
+    )
+
+    return serialize_scorer(stored["function"]), models
+
+
+@pytest.mark.parametrize(
+    "pyfunc_scorer",
+    [ModelSignature(inputs=Schema([ColSpec("long", "a"), ColSpec("long", "b")]))],
+    indirect=True,
+)
+def test_pyfunc_scorer_batches_entries(pyfunc_scorer):
+    score, models = pyfunc_scorer
+
+    output = score(
+        {
+            "input_data": [
+                {"fields": ["a", "b"], "values": [[1, 2]]},
+                # without fields, the columns are named after the signature
+                {"values": [[3, 4], [5, 6]]},
+            ]
+        }
+    )
+    score({"input_data": [{"values": [[1, 1]]}]})
+
+    assert output == {
+        "predictions": [
+            {"fields": ["prediction"], "values": [[3]]},
+            {"fields": ["prediction"], "values": [[7], [11]]},
+        ]
+    }
+    assert len(models) == 1
+    assert len(models[0].inputs) == 2
+    assert models[0].inputs[0].shape == (3, 2)
+
+
+@pytest.mark.parametrize(
+    "pyfunc_scorer",
+    [ModelSignature(inputs=Schema([TensorSpec(np.dtype("float32"), (-1, 2))]))],
+    indirect=True,
+)
+def test_pyfunc_scorer_tensor_input(pyfunc_scorer):
+    score, models = pyfunc_scorer
+
+    output = score(
+        {"input_data": [{"values": [[1, 2]]}, {"values": [[3, 4], [5, 6]]}]}
+    )
+
+    assert output == {
+        "predictions": [{"values": [3.0]}, {"values": [7.0, 11.0]}]
+    }
+    (batch,) = models[0].inputs
+    assert batch.dtype == np.float32
+
+
+@pytest.fixture
+def sklearn_model(monkeypatch: MonkeyPatch, tmp_path):
+    """Fakes a downloaded MLflow sklearn model and captures the stored model"""
+    model_dir = tmp_path / "sklearn_model"
+    model_dir.mkdir()
+    (model_dir / "model.pkl").write_bytes(b"pickled model")
+
+    def write_mlmodel(serialization_format):
+        (model_dir / "MLmodel").write_text(
+            "flavors:\n"
+            "  sklearn:\n"
+            "    pickled_model: model.pkl\n"
+            f"    serialization_format: {serialization_format}\n"
+            "    sklearn_version: 1.1.3\n"
+        )
+
+    write_mlmodel("cloudpickle")
+
+    def download_artifacts(artifact_uri, dst_path=None):
+        if artifact_uri.endswith("/MLmodel"):
+            return str(model_dir / "MLmodel")
+
+        return shutil.copytree(model_dir, dst_path)
+
+    monkeypatch.setattr(mlflow.artifacts, "download_artifacts", download_artifacts)
+
+    loaded = []
+    estimator = object()
+
+    def load_model(model_uri):
+        loaded.append(model_uri)
+        return estimator
+
+    monkeypatch.setattr(mlflow.sklearn, "load_model", load_model)
+
+    stored = {}
+
+    def store_model(client, model_object, **kwargs):
+        stored["model_type"] = kwargs["model_type"]
+        if isinstance(model_object, str):
+            with tarfile.open(model_object) as tar:
+                stored["content"] = {
+                    member.name: tar.extractfile(member).read()
+                    for member in tar.getmembers()
+                }
+        else:
+            stored["content"] = model_object
+        return ("model_id", "1")
+
+    monkeypatch.setattr(mlflow_watsonml.store, "store_or_update_model", store_model)
+
+    return types.SimpleNamespace(
+        write_mlmodel=write_mlmodel, estimator=estimator, loaded=loaded, stored=stored
+    )
+
+
+def test_store_sklearn_artifact_streams_pickle(sklearn_model):
+    store_sklearn_artifact(
+        client=None,
+        model_uri="runs:/run_id/model",
+        artifact_name="artifact",
+        software_spec_id="sw_spec_id",
+    )
+
+    assert sklearn_model.stored["content"] == {"scikit_model.pkl": b"pickled model"}
+    assert sklearn_model.stored["model_type"] == "scikit-learn_1.1"
+    assert sklearn_model.loaded == []
+
+
+@pytest.mark.parametrize(
+    "serialization_format,scorer_config",
+    [("skops", {}), ("cloudpickle", {"sklearn_repickle": True})],
+)
+def test_store_sklearn_artifact_repickles(
+    sklearn_model, serialization_format, scorer_config
+):
+    sklearn_model.write_mlmodel(serialization_format)
+
+    store_sklearn_artifact(
+        client=None,
+        model_uri="runs:/run_id/model",
+        artifact_name="artifact",
+        software_spec_id="sw_spec_id",
+        scorer_config=scorer_config,
+    )
+
+    assert sklearn_model.stored["content"] is sklearn_model.estimator
+    assert sklearn_model.loaded == ["runs:/run_id/model"]
+
+
+@pytest.fixture
+def sklearn_onnx_model(monkeypatch: MonkeyPatch, tmp_path):
+    """Saves a real MLflow sklearn model behind a fake artifact store and captures
+    the stored function"""
+    pytest.importorskip("skl2onnx")
+    pytest.importorskip("onnxruntime")
+    from sklearn.linear_model import LogisticRegression
+
+    rng = np.random.default_rng(seed=0)
+    X = pd.DataFrame(rng.standard_normal(size=(50, 3)), columns=["a", "b", "c"])
+    y = (X["a"] + X["b"] > 0).astype(int)
+    estimator = LogisticRegression().fit(X, y)
+
+    model_dir = str(tmp_path / "sklearn_model")
+    mlflow.sklearn.save_model(
+        estimator,
+        model_dir,
+        signature=mlflow.models.infer_signature(X, estimator.predict(X)),
+        pip_requirements=["scikit-learn"],
+    )
+
+    monkeypatch.setattr(
+        mlflow.artifacts,
+        "download_artifacts",
+        lambda artifact_uri, dst_path=None: shutil.copytree(model_dir, dst_path),
+    )
+
+    stored = {}
+
+    def store_function(client, deployable_function, **kwargs):
+        stored["function"] = deployable_function
+        stored["custom"] = kwargs.get("custom")
+        return ("function_id", "1")
+
+    monkeypatch.setattr(
+        mlflow_watsonml.store, "store_or_update_function", store_function
+    )
+
+    return types.SimpleNamespace(
+        model_dir=model_dir, estimator=estimator, X=X, stored=stored
+    )
+
+
+def test_store_sklearn_onnx_artifact(sklearn_onnx_model, tmp_path):
+    store_sklearn_onnx_artifact(
+        client=None,
+        model_uri="runs:/run_id/model",
+        artifact_name="artifact",
+        software_spec_id="sw_spec_id",
+        scorer_config={
+            "artifact_cache_dir": str(tmp_path / "cache"),
+            "sklearn_onnx_benchmark_runs": 2,
+        },
+    )
+
+    custom = sklearn_onnx_model.stored["custom"]
+    assert custom["onnx_graph"]["inputs"] == [
+        {"name": "input", "type": "tensor(double)", "shape": ["", 3]}
+    ]
+    assert custom["sklearn_onnx"]["parity"]["passed"]
+    assert custom["sklearn_onnx"]["parity"]["rows"] == 100
+    assert custom["sklearn_onnx"]["latency"]["runs"] == 2
+    assert custom["sklearn_onnx"]["latency"]["onnx_ms"] > 0
+
+    score = serialize_scorer(sklearn_onnx_model.stored["function"])
+    output = score({"input_data": [{"values": sklearn_onnx_model.X.values.tolist()}]})
+
+    assert output["predictions"][0]["values"] == (
+        sklearn_onnx_model.estimator.predict(sklearn_onnx_model.X).tolist()
+    )
+
+
+def test_convert_sklearn_model_parity_failure(sklearn_onnx_model, tmp_path):
+    with pytest.raises(MlflowException, match="doesn't match"):
+        convert_sklearn_model(
+            model_uri="runs:/run_id/model",
+            model_path=sklearn_onnx_model.model_dir,
+            dst_path=str(tmp_path),
+            # a negative tolerance fails the check even on identical predictions
+            scorer_config={"sklearn_onnx_rtol": -1, "sklearn_onnx_atol": -1},
+        )
+
+
+def test_get_onnx_input():
+    columns = Schema([ColSpec("double", "a"), ColSpec("double", "b")])
+    tensor = Schema([TensorSpec(np.dtype("float32"), (-1, 4))])
+    mixed = Schema([ColSpec("double", "a"), ColSpec("string", "b")])
+
+    assert get_onnx_input(ModelSignature(inputs=columns)) == (
+        "float64",
+        [None, 2],
+        ["a", "b"],
+    )
+    assert get_onnx_input(ModelSignature(inputs=tensor)) == (
+        "float32",
+        [None, 4],
+        [],
+    )
+
+    with pytest.raises(MlflowException, match="single type"):
+        get_onnx_input(ModelSignature(inputs=mixed))
+
+    with pytest.raises(MlflowException, match="signature"):
+        get_onnx_input(None)
+
+
+def test_check_sklearn_onnx_parity():
+    report = check_sklearn_onnx_parity(
+        expected=np.array([1.0, 2.0, 3.0]),
+        actual=np.array([[1.0], [2.5], [3.0]], dtype=np.float32),
+        rtol=1e-4,
+        atol=1e-4,
+    )
+
+    assert report["mismatched_rows"] == 1
+    assert report["max_abs_diff"] == 0.5
+    assert not report["passed"]
+
+    report = check_sklearn_onnx_parity(
+        expected=np.array(["cat", "dog"]),
+        actual=np.array(["cat", "dog"], dtype=object),
+        rtol=1e-4,
+        atol=1e-4,
+    )
+
+    assert report["passed"]
+    assert report["max_abs_diff"] is None
+
+
+@pytest.fixture
+def native_model(monkeypatch: MonkeyPatch, tmp_path):
+    """Fakes a downloaded MLflow model of a native flavor and captures the stored
+    model"""
+    model_dir = tmp_path / "native_model"
+    model_dir.mkdir()
+
+    monkeypatch.setattr(
+        mlflow.artifacts,
+        "download_artifacts",
+        lambda artifact_uri, dst_path=None: shutil.copytree(model_dir, dst_path),
+    )
+
+    stored = {}
+
+    def store_model(client, model_object, **kwargs):
+        stored["model_type"] = kwargs["model_type"]
+        with tarfile.open(model_object) as tar:
+            stored["content"] = sorted(tar.getnames())
+        return ("model_id", "1")
+
+    monkeypatch.setattr(mlflow_watsonml.store, "store_or_update_model", store_model)
+
+    return types.SimpleNamespace(model_dir=model_dir, stored=stored)
+
+
+@pytest.mark.parametrize(
+    "flavor_conf,files,content",
+    [
+        (
+            "    saved_model_dir: tf2model\n",
+            ["tf2model/saved_model.pb", "tf2model/variables/variables.index"],
+            ["saved_model.pb", "variables", "variables/variables.index"],
+        ),
+        (
+            "    data: data\n    keras_version: 2.12.0\n    save_format: h5\n",
+            ["data/model.h5"],
+            ["model.h5"],
+        ),
+    ],
+)
+def test_store_native_artifact_tensorflow(native_model, flavor_conf, files, content):
+    (native_model.model_dir / "MLmodel").write_text(
+        "flavors:\n  tensorflow:\n" + flavor_conf
+    )
+    (native_model.model_dir / "requirements.txt").write_text("tensorflow==2.9.1\n")
+    for file in files:
+        path = native_model.model_dir / file
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"model")
+
+    store_native_artifact(
+        client=None,
+        model_uri="runs:/run_id/model",
+        artifact_name="artifact",
+        flavor="tensorflow",
+        software_spec_id="sw_spec_id",
+    )
+
+    assert native_model.stored["content"] == content
+    # the h5 model records its version in the flavor, the other one is read from
+    # the requirements
+    assert native_model.stored["model_type"] == (
+        "tensorflow_2.12" if "keras_version" in flavor_conf else "tensorflow_2.9"
+    )
+
+
+def test_package_lightgbm_model_rejects_booster(native_model, tmp_path):
+    (native_model.model_dir / "MLmodel").write_text(
+        "flavors:\n  lightgbm:\n    model_class: lightgbm.basic.Booster\n"
+    )
+
+    with pytest.raises(MlflowException, match="python_function"):
+        package_lightgbm_model(
+            model_path=str(native_model.model_dir),
+            dst_path=str(tmp_path),
+            scorer_config={},
+        )
+
+
+def test_get_logged_library_version(tmp_path):
+    (tmp_path / "MLmodel").write_text("flavors:\n  xgboost:\n    xgb_version: 1.6.2\n")
+    (tmp_path / "requirements.txt").write_text(
+        "mlflow==2.9.2\ntorch[cpu]==2.0.1+cpu  # pinned\n"
+    )
+
+    assert (
+        get_logged_library_version(
+            model_uri="runs:/run_id/model", flavor="xgboost", model_path=str(tmp_path)
+        )
+        == "1.6.2"
+    )
+    assert (
+        get_logged_library_version(
+            model_uri="runs:/run_id/model", flavor="pytorch", model_path=str(tmp_path)
+        )
+        == "2.0.1+cpu"
+    )
+    assert (
+        get_logged_library_version(
+            model_uri="runs:/run_id/model",
+            flavor="lightgbm",
+            model_path=str(tmp_path),
+        )
+        is None
+    )
@@ -22,6 +22,14 @@ MOCK_WML_CREDENTIALS = {
 def mock_client(monkeypatch: MonkeyPatch):
     # Mock the APIClient
     monkeypatch.setattr(mlflow_watsonml.deploy, "APIClient", MockAPIClient)
+    # the mock deployments are listed through the WML client
+    monkeypatch.setattr(
+        mlflow_watsonml.deploy,
+        "list_space_deployments",
+        lambda client, space_id: mlflow_watsonml.deploy.list_deployments(
+            client=client
+        ),
+    )
 
 
 def test_list_artifacts():
@@ -215,3 +223,109 @@ def test_get_software_spec_from_deployment_name_exception(caplog: LogCaptureFixt
         )
 
     assert f"no deployment by the name deployment_3 exists"
+
+
+def test_get_environment_mode():
+    assert get_environment_mode({}) == "request"
+    assert get_environment_mode({"environment_mode": "deploy"}) == "deploy"
+
+    with pytest.raises(MlflowException):
+        _ = get_environment_mode({"environment_mode": "always"})
+
+
+def test_get_onnx_session_options():
+    assert get_onnx_session_options({}) == {}
+    assert get_onnx_session_options(
+        {
+            "onnx_session_options": {
+                "intra_op_num_threads": "2",
+                "graph_optimization_level": "basic",
+                "execution_mode": "sequential",
+            }
+        }
+    ) == {
+        "intra_op_num_threads": 2,
+        "graph_optimization_level": "ORT_ENABLE_BASIC",
+        "execution_mode": "ORT_SEQUENTIAL",
+    }
+
+    with pytest.raises(MlflowException):
+        get_onnx_session_options(
+            {"onnx_session_options": {"graph_optimization_level": "max"}}
+        )
+
+    with pytest.raises(MlflowException):
+        get_onnx_session_options({"onnx_session_options": {"providers": ["CPU"]}})
+
+
+def test_get_options_hash():
+    assert get_options_hash({"a": 1, "b": 2}) == get_options_hash({"b": 2, "a": 1})
+    assert get_options_hash({"a": 1}) != get_options_hash({"a": 2})
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [(True, True), (False, False), ("true", True), ("False", False), ("0", False)],
+)
+def test_get_config_flag(value, expected):
+    assert get_config_flag({"flag": value}, "flag", not expected) == expected
+    assert get_config_flag({}, "flag", expected) == expected
+
+
+def test_get_config_flag_invalid():
+    with pytest.raises(MlflowException):
+        get_config_flag({"flag": "maybe"}, "flag", True)
+
+
+def test_get_artifact_packaging():
+    assert get_artifact_packaging({}) == "auto"
+    assert get_artifact_packaging({"artifact_packaging": "bundle"}) == "bundle"
+
+    with pytest.raises(MlflowException):
+        get_artifact_packaging({"artifact_packaging": "inline"})
+
+
+def test_get_native_model_type():
+    assert get_native_model_type("xgboost", "1.5.2", {}) == (
+        "xgboost_1.5",
+        "runtime-22.2-py3.10",
+    )
+    assert get_native_model_type("tensorflow", "2.12.0", {}) == (
+        "tensorflow_2.12",
+        "runtime-23.1-py3.10",
+    )
+    # other versions run on the newest runtime with an older version
+    assert get_native_model_type("xgboost", "2.0.3", {}) == (
+        "xgboost_1.6",
+        "runtime-23.1-py3.10",
+    )
+    assert get_native_model_type("pytorch", "1.13.1", {}) == (
+        "pytorch-onnx_1.12",
+        "runtime-22.2-py3.10",
+    )
+    assert get_native_model_type("sklearn", None, {}) == (
+        "scikit-learn_1.1",
+        "runtime-23.1-py3.10",
+    )
+    assert get_native_model_type(
+        "sklearn", "1.1.3", {"model_type": "scikit-learn_1.3"}
+    ) == ("scikit-learn_1.3", "runtime-23.1-py3.10")
+
+
+def test_refine_conda_yaml_is_idempotent(tmp_path):
+    conda_yaml = tmp_path / "conda.yaml"
+    conda_yaml.write_text(
+        "name: env\n"
+        "dependencies:\n"
+        "  - python=3.10\n"
+        "  - pip:\n"
+        "    - scikit-learn==1.1.3\n"
+    )
+
+    refine_conda_yaml(str(conda_yaml), extra_pip_requirements=["onnxruntime"])
+    refined = conda_yaml.read_text()
+    refine_conda_yaml(str(conda_yaml), extra_pip_requirements=["onnxruntime"])
+
+    assert conda_yaml.read_text() == refined
+    assert refined.count("onnxruntime") == 1
+    assert list(tmp_path.iterdir()) == [conda_yaml]
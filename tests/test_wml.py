@@ -0,0 +1,542 @@
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from mlflow import MlflowException
+from resources.mock.mock_client import MockAPIClient
+
+from mlflow_watsonml.wml import *
+
+MOCK_WML_CREDENTIALS = {
+    "username": "user",
+    "apikey": "correct_api_key",
+    "url": "https://url",
+    "instance_id": "wml",
+    "version": "1.0",
+}
+
+
+@pytest.fixture
+def environment(tmp_path):
+    """Writes a conda.yaml file and a custom package, and returns a function that
+    writes them again since `create_custom_software_spec` refines the conda.yaml
+    file in place"""
+
+    def write(pip_dependencies):
+        conda_yaml = tmp_path / "conda.yaml"
+        conda_yaml.write_text(
+            "name: env\n"
+            "channels: [conda-forge]\n"
+            "dependencies:\n"
+            "  - python=3.10\n"
+            "  - pip:\n" + "".join(f"    - {dep}\n" for dep in pip_dependencies)
+        )
+
+        return str(conda_yaml)
+
+    custom_package = tmp_path / "package.zip"
+    with zipfile.ZipFile(custom_package, "w") as f:
+        f.writestr("package/__init__.py", "")
+
+    return write, str(custom_package)
+
+
+def test_create_custom_software_spec_reuses_environment(environment):
+    write, custom_package = environment
+    client = MockAPIClient(MOCK_WML_CREDENTIALS)
+    n_sw_specs = len(client.software_specifications._sw_specs)
+
+    first = create_custom_software_spec(
+        client=client,
+        name="deployment_1_sw_spec",
+        custom_packages=[custom_package],
+        conda_yaml=write(["mlflow==2.9.2", "scikit-learn==1.1.3"]),
+    )
+    # same dependencies in another order
+    second = create_custom_software_spec(
+        client=client,
+        name="deployment_2_sw_spec",
+        custom_packages=[custom_package],
+        conda_yaml=write(["scikit-learn==1.1.3", "mlflow==2.9.2"]),
+    )
+
+    assert first == second
+    assert len(client.software_specifications._sw_specs) == n_sw_specs + 1
+    assert client.software_specifications._sw_specs[-1]["metadata"][
+        "description"
+    ].startswith(SOFTWARE_SPEC_HASH_PREFIX)
+    assert len(client.package_extensions._pkg_extns) == 2
+
+
+def test_create_custom_software_spec_new_environment(environment):
+    write, custom_package = environment
+    client = MockAPIClient(MOCK_WML_CREDENTIALS)
+
+    first = create_custom_software_spec(
+        client=client,
+        name="deployment_sw_spec",
+        custom_packages=None,
+        conda_yaml=write(["scikit-learn==1.1.3"]),
+    )
+    second = create_custom_software_spec(
+        client=client,
+        name="deployment_sw_spec",
+        custom_packages=None,
+        conda_yaml=write(["scikit-learn==1.1.3"]),
+        extra_pip_requirements=["onnxruntime"],
+    )
+    third = create_custom_software_spec(
+        client=client,
+        name="deployment_sw_spec",
+        custom_packages=None,
+        conda_yaml=write(["scikit-learn==1.1.3"]),
+        base_software_spec_name="runtime-23.1-py3.10",
+    )
+
+    assert len({first, second, third}) == 3
+
+
+def test_create_custom_software_spec_rewrite(environment):
+    write, _ = environment
+    client = MockAPIClient(MOCK_WML_CREDENTIALS)
+
+    first = create_custom_software_spec(
+        client=client,
+        name="deployment_sw_spec",
+        custom_packages=None,
+        conda_yaml=write(["scikit-learn==1.1.3"]),
+    )
+    second = create_custom_software_spec(
+        client=client,
+        name="deployment_sw_spec",
+        custom_packages=None,
+        conda_yaml=write(["scikit-learn==1.1.3"]),
+        rewrite=True,
+    )
+
+    assert first != second
+    assert first not in [
+        sw_spec["metadata"]["asset_id"]
+        for sw_spec in client.software_specifications._sw_specs
+    ]
+
+
+def test_create_custom_software_spec_invalid_package(environment, tmp_path):
+    invalid_package = tmp_path / "package.txt"
+    invalid_package.write_text("not a zip file")
+
+    with pytest.raises(MlflowException, match="not a valid zip file"):
+        create_custom_software_spec(
+            client=MockAPIClient(MOCK_WML_CREDENTIALS),
+            name="deployment_sw_spec",
+            custom_packages=[str(invalid_package)],
+        )
+
+
+def test_create_custom_software_spec_rewrite_keeps_used_spec(environment):
+    write, _ = environment
+    client = MockAPIClient(MOCK_WML_CREDENTIALS)
+
+    first = create_custom_software_spec(
+        client=client,
+        name="deployment_sw_spec",
+        custom_packages=None,
+        conda_yaml=write(["scikit-learn==1.1.3"]),
+    )
+    client.repository._artifacts[0]["entity"]["software_spec"]["id"] = first
+
+    second = create_custom_software_spec(
+        client=client,
+        name="deployment_sw_spec",
+        custom_packages=None,
+        conda_yaml=write(["scikit-learn==1.1.3"]),
+        rewrite=True,
+    )
+    third = create_custom_software_spec(
+        client=client,
+        name="deployment_sw_spec",
+        custom_packages=None,
+        conda_yaml=write(["scikit-learn==1.1.3"]),
+    )
+
+    sw_spec_names = [
+        sw_spec["metadata"]["name"]
+        for sw_spec in client.software_specifications._sw_specs
+    ]
+
+    assert first != second
+    assert third == second
+    assert first in [
+        sw_spec["metadata"]["asset_id"]
+        for sw_spec in client.software_specifications._sw_specs
+    ]
+    assert len(sw_spec_names) == len(set(sw_spec_names))
+
+
+def test_delete_deployment_deletes_unused_software_spec(environment):
+    write, _ = environment
+    client = MockAPIClient(MOCK_WML_CREDENTIALS)
+
+    software_spec_id = create_custom_software_spec(
+        client=client,
+        name="deployment_sw_spec",
+        custom_packages=None,
+        conda_yaml=write(["scikit-learn==1.1.3"]),
+    )
+    for artifact in client.repository._artifacts[:2]:
+        artifact["entity"]["software_spec"]["id"] = software_spec_id
+
+    sw_spec_ids = lambda: [
+        sw_spec["metadata"]["asset_id"]
+        for sw_spec in client.software_specifications._sw_specs
+    ]
+
+    delete_deployment(client=client, name="deployment_1")
+    assert software_spec_id in sw_spec_ids()
+
+    delete_deployment(client=client, name="deployment_2")
+    assert software_spec_id not in sw_spec_ids()
+
+
+def test_create_custom_software_spec_reuses_package_extension(environment):
+    write, custom_package = environment
+    client = MockAPIClient(MOCK_WML_CREDENTIALS)
+
+    first = create_custom_software_spec(
+        client=client,
+        name="deployment_1_sw_spec",
+        custom_packages=[custom_package],
+        conda_yaml=write(["scikit-learn==1.1.3"]),
+    )
+    second = create_custom_software_spec(
+        client=client,
+        name="deployment_2_sw_spec",
+        custom_packages=[custom_package],
+        conda_yaml=write(["scikit-learn==1.2.2"]),
+    )
+
+    pip_zips = [
+        pkg_extn
+        for pkg_extn in client.package_extensions._pkg_extns
+        if pkg_extn["metadata"]["description"] is not None
+    ]
+    sw_specs = {
+        sw_spec["metadata"]["asset_id"]: sw_spec
+        for sw_spec in client.software_specifications._sw_specs
+    }
+
+    assert first != second
+    assert len(pip_zips) == 1
+    assert pip_zips[0]["metadata"]["description"] == (
+        f"{PACKAGE_EXTENSION_HASH_PREFIX}{get_file_hash(custom_package)}"
+    )
+    assert (
+        pip_zips[0]["metadata"]["asset_id"]
+        in sw_specs[first]["entity"]["package_extensions"]
+    )
+    assert (
+        pip_zips[0]["metadata"]["asset_id"]
+        in sw_specs[second]["entity"]["package_extensions"]
+    )
+
+
+def test_store_package_extensions_concurrently(tmp_path):
+    client = MockAPIClient(MOCK_WML_CREDENTIALS)
+    custom_packages = []
+
+    for idx in range(3):
+        custom_package = tmp_path / f"package_{idx}.zip"
+        with zipfile.ZipFile(custom_package, "w") as f:
+            f.writestr(f"package_{idx}/__init__.py", "")
+        custom_packages.append(str(custom_package))
+
+    threads = set()
+    store = client.package_extensions.store
+
+    def recording_store(meta_props, file_path):
+        threads.add(threading.get_ident())
+        time.sleep(0.05)
+        return store(meta_props=meta_props, file_path=file_path)
+
+    client.package_extensions.store = recording_store
+
+    # the same package listed twice is uploaded once
+    pkg_extn_ids = store_package_extensions(
+        client=client, custom_packages=custom_packages + custom_packages[:1]
+    )
+
+    file_paths = {
+        pkg_extn["metadata"]["asset_id"]: pkg_extn["entity"]["file_path"]
+        for pkg_extn in client.package_extensions._pkg_extns
+    }
+
+    assert [file_paths[pkg_extn_id] for pkg_extn_id in pkg_extn_ids] == (
+        custom_packages + custom_packages[:1]
+    )
+    assert len(client.package_extensions._pkg_extns) == 3
+    assert len(threads) > 1
+
+
+def test_create_custom_software_spec_concurrently(environment):
+    write, _ = environment
+    client = MockAPIClient(MOCK_WML_CREDENTIALS)
+    n_sw_specs = len(client.software_specifications._sw_specs)
+    conda_yaml = write(["scikit-learn==1.1.3"])
+    store = client.software_specifications.store
+
+    def slow_store(meta_props):
+        time.sleep(0.05)
+        return store(meta_props=meta_props)
+
+    client.software_specifications.store = slow_store
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        software_spec_ids = list(
+            pool.map(
+                lambda idx: create_custom_software_spec(
+                    client=client,
+                    name=f"deployment_{idx}_sw_spec",
+                    custom_packages=None,
+                    conda_yaml=conda_yaml,
+                ),
+                range(4),
+            )
+        )
+
+    assert len(set(software_spec_ids)) == 1
+    assert len(client.software_specifications._sw_specs) == n_sw_specs + 1
+
+
+def test_create_custom_software_spec_batch_rewrites_once(environment):
+    write, _ = environment
+    client = MockAPIClient(MOCK_WML_CREDENTIALS)
+    software_specs = dict()
+
+    software_spec_ids = [
+        create_custom_software_spec(
+            client=client,
+            name=f"deployment_{idx}_sw_spec",
+            custom_packages=None,
+            conda_yaml=write(["scikit-learn==1.1.3"]),
+            rewrite=True,
+            software_specs=software_specs,
+        )
+        for idx in range(3)
+    ]
+
+    assert len(set(software_spec_ids)) == 1
+    assert list(software_specs.values()) == software_spec_ids[:1]
+
+
+class MockResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self._body = body
+        self.text = str(body)
+
+    def json(self):
+        return self._body
+
+
+@pytest.fixture
+def wml_requests(monkeypatch):
+    """Records the requests sent with `requests.request` and answers them with the
+    responses appended to the returned list"""
+    sent = []
+    responses = []
+
+    def request(method, url, json, params, headers, timeout):
+        sent.append(
+            {
+                "method": method,
+                "url": url,
+                "json": json,
+                "params": params,
+                "timeout": timeout,
+            }
+        )
+        response = responses.pop(0)
+
+        if isinstance(response, Exception):
+            raise response
+
+        return response
+
+    monkeypatch.setattr(requests, "request", request)
+
+    return sent, responses
+
+
+def test_submit_deployment_does_not_wait(wml_requests, monkeypatch):
+    sent, responses = wml_requests
+    client = MockAPIClient(MOCK_WML_CREDENTIALS)
+    responses.append(
+        MockResponse(
+            202,
+            {
+                "metadata": {"name": "deployment_3", "id": "id_of_deployment_3"},
+                "entity": {"status": {"state": "initializing"}},
+            },
+        )
+    )
+    monkeypatch.setattr(
+        client.deployments,
+        "create",
+        lambda **kwargs: pytest.fail("deployments.create polls WML"),
+    )
+
+    deployment_details = submit_deployment(
+        client=client,
+        space_id="id_of_space_1",
+        name="deployment_3",
+        artifact_id="id_of_artifact_3",
+        revision_id="1",
+        environment_variables={"MLFLOW_TRACKING_URI": "uri"},
+    )
+
+    meta_props = sent[0]["json"]
+
+    assert deployment_details["name"] == "deployment_3"
+    assert sent[0]["method"] == "POST"
+    assert sent[0]["url"] == "https://url/ml/v4/deployments"
+    assert sent[0]["params"] == {"space_id": "id_of_space_1"}
+    assert sent[0]["timeout"] == WML_REQUEST_TIMEOUT
+    assert meta_props["name"] == "deployment_3"
+    assert meta_props["space_id"] == "id_of_space_1"
+    assert meta_props["asset"] == {"id": "id_of_artifact_3", "rev": "1"}
+    assert meta_props["custom"] == {"MLFLOW_TRACKING_URI": "uri"}
+    assert "online" in meta_props
+
+
+def test_submit_deployment_rejected(wml_requests):
+    _, responses = wml_requests
+    responses.append(MockResponse(400, "bad request"))
+
+    with pytest.raises(MlflowException, match="failed with status 400"):
+        submit_deployment(
+            client=MockAPIClient(MOCK_WML_CREDENTIALS),
+            space_id="id_of_space_1",
+            name="deployment_3",
+            artifact_id="id_of_artifact_3",
+            revision_id="1",
+        )
+
+
+def test_poll_deployment_uses_space(wml_requests):
+    sent, responses = wml_requests
+    responses.append(MockResponse(200, {"entity": {"status": {"state": "ready"}}}))
+
+    deployment_details = poll_deployment(
+        client=MockAPIClient(MOCK_WML_CREDENTIALS),
+        space_id="id_of_space_2",
+        deployment_id="id_of_deployment_3",
+    )
+
+    assert deployment_details["entity"]["status"]["state"] == "ready"
+    assert sent[0]["method"] == "GET"
+    assert sent[0]["url"] == "https://url/ml/v4/deployments/id_of_deployment_3"
+    assert sent[0]["params"] == {"space_id": "id_of_space_2"}
+
+
+def test_poll_deployment_timeout(wml_requests):
+    _, responses = wml_requests
+    responses.append(requests.Timeout("read timed out"))
+
+    with pytest.raises(MlflowException, match="read timed out"):
+        poll_deployment(
+            client=MockAPIClient(MOCK_WML_CREDENTIALS),
+            space_id="id_of_space_2",
+            deployment_id="id_of_deployment_3",
+        )
+
+
+def test_update_deployment_patches_custom_after_asset(monkeypatch):
+    client = MockAPIClient(MOCK_WML_CREDENTIALS)
+    deployments = client.deployments
+    changes = []
+    update = deployments.update
+
+    def recording_update(deployment_uid, changes_):
+        changes.append(changes_)
+        return update(deployment_uid, changes_)
+
+    monkeypatch.setattr(
+        deployments,
+        "update",
+        lambda deployment_uid, changes: recording_update(deployment_uid, changes),
+    )
+
+    update_deployment(
+        client=client,
+        name="deployment_1",
+        artifact_id="id_of_artifact_3",
+        revision_id="1",
+        deployment_id="id_of_deployment_1",
+        environment_variables={"MLFLOW_TRACKING_URI": "uri"},
+        poller=DeploymentPoller(initial_interval=0.01),
+    )
+
+    assert changes == [
+        {
+            deployments.ConfigurationMetaNames.ASSET: {
+                "id": "id_of_artifact_3",
+                "rev": "1",
+            }
+        },
+        {deployments.ConfigurationMetaNames.CUSTOM: {"MLFLOW_TRACKING_URI": "uri"}},
+    ]
+
+
+def test_patch_deployment_custom(wml_requests):
+    sent, responses = wml_requests
+    responses.append(MockResponse(200, {"entity": {"custom": {}}}))
+
+    patch_deployment_custom(
+        client=MockAPIClient(MOCK_WML_CREDENTIALS),
+        space_id="id_of_space_1",
+        deployment_id="id_of_deployment_1",
+        environment_variables={},
+    )
+
+    assert sent[0]["method"] == "PATCH"
+    assert sent[0]["url"] == "https://url/ml/v4/deployments/id_of_deployment_1"
+    assert sent[0]["json"] == [{"op": "add", "path": "/custom", "value": {}}]
+
+
+def test_list_space_deployments_pages(wml_requests):
+    sent, responses = wml_requests
+    responses.append(
+        MockResponse(
+            200,
+            {
+                "resources": [{"metadata": {"name": "deployment_1"}}],
+                "next": {
+                    "href": "/ml/v4/deployments?space_id=id_of_space_2&start=token"
+                },
+            },
+        )
+    )
+    responses.append(
+        MockResponse(200, {"resources": [{"metadata": {"name": "deployment_2"}}]})
+    )
+
+    deployments = list_space_deployments(
+        client=MockAPIClient(MOCK_WML_CREDENTIALS), space_id="id_of_space_2"
+    )
+
+    assert [deployment["name"] for deployment in deployments] == [
+        "deployment_1",
+        "deployment_2",
+    ]
+    assert sent[0]["url"] == "https://url/ml/v4/deployments"
+    assert sent[0]["params"] == {
+        "limit": WML_LIST_PAGE_SIZE,
+        "space_id": "id_of_space_2",
+    }
+    assert sent[1]["params"] == {
+        "limit": WML_LIST_PAGE_SIZE,
+        "start": "token",
+        "space_id": "id_of_space_2",
+    }